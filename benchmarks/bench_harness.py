@@ -0,0 +1,271 @@
+"""Throughput benchmark for the harness against a local mock agent server.
+
+Serves the mock agent API (``mock_agent.py``) with uvicorn in its own process
+and runs ``run_csv_tests`` on a synthetic suite with the fake judge at each
+worker count, every run in a fresh process. Reports tests/sec, event loop lag
+(p99 and max), CPU use of the harness process and its peak RSS, and appends
+the results with the git commit to ``benchmarks/results/bench_harness.jsonl``
+so runs can be compared across commits.
+
+Usage
+$ uv run --group bench python benchmarks/bench_harness.py
+$ uv run --group bench python benchmarks/bench_harness.py --workers 10 50 --tests 500
+
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import httpx
+from bench_loader import generate_suite
+
+DEFAULT_WORKERS = [1, 10, 50, 200]
+
+RESULTS_FILE = Path(__file__).parent / "results" / "bench_harness.jsonl"
+
+# Seconds between event loop lag probes
+LAG_PROBE_INTERVAL = 0.01
+
+
+def _free_port() -> int:
+    """Return a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _serve(port: int, app_options: dict[str, Any]) -> None:
+    """Serve the mock agent (runs in its own process)."""
+    import uvicorn
+    from mock_agent import create_app
+
+    uvicorn.run(
+        create_app(**app_options),
+        host="127.0.0.1",
+        port=port,
+        log_level="warning",
+        backlog=4096,
+    )
+
+
+def _wait_until_up(base_url: str, timeout: float = 15.0) -> None:
+    """Wait for the mock agent server to accept requests."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            httpx.get(f"{base_url}/health")
+            return
+        except httpx.TransportError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def _run_config(
+    base_url: str,
+    suite_path: str,
+    tests: int,
+    workers: int,
+    judge_backend: str,
+    output_dir: str,
+) -> dict[str, Any]:
+    """Run the harness once and measure it (runs in a fresh process)."""
+    from gnw_evals.core import build_config, run_csv_tests
+    from gnw_evals.data_handlers import result_exporter
+
+    # Artifacts of benchmark runs stay out of outputs/
+    result_exporter.OUTPUT_DIR = Path(output_dir)
+
+    # Built as run_evals builds it, so derived fields can't drift from the CLI
+    config = build_config(
+        api_base_url=base_url,
+        api_token="bench",
+        test_file=suite_path,
+        sample_size=tests,
+        num_workers=workers,
+        judge_backend=judge_backend,
+        record_history=False,
+        output_filename=f"bench_{workers}",
+    )
+
+    # langchain's beta warning on state decoding would be printed every test
+    warnings.simplefilter("ignore")
+    lags: list[float] = []
+
+    async def probe_loop_lag() -> None:
+        while True:
+            expected = time.perf_counter() + LAG_PROBE_INTERVAL
+            await asyncio.sleep(LAG_PROBE_INTERVAL)
+            lags.append(max(0.0, time.perf_counter() - expected))
+
+    async def main() -> list:
+        probe = asyncio.create_task(probe_loop_lag())
+        try:
+            return await run_csv_tests(config)
+        finally:
+            probe.cancel()
+
+    usage_start = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = asyncio.run(main())
+    wall = time.perf_counter() - start
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+
+    cpu = (usage.ru_utime - usage_start.ru_utime) + (
+        usage.ru_stime - usage_start.ru_stime
+    )
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    rss_unit = 1 if sys.platform == "darwin" else 1024
+    lags.sort()
+    return {
+        "workers": workers,
+        "tests": len(results),
+        "errors": sum(1 for r in results if r.error),
+        "wall_seconds": round(wall, 3),
+        "tests_per_second": round(len(results) / wall, 2),
+        "loop_lag_p99_ms": round(lags[int(0.99 * (len(lags) - 1))] * 1000, 2)
+        if lags
+        else None,
+        "loop_lag_max_ms": round(lags[-1] * 1000, 2) if lags else None,
+        "cpu_seconds": round(cpu, 3),
+        "cpu_percent": round(100 * cpu / wall, 1),
+        "peak_rss_mib": round(usage.ru_maxrss * rss_unit / 2**20, 1),
+    }
+
+
+def _git_commit() -> str | None:
+    """Return the current git commit, if run from a checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _previous_record(params: dict[str, Any]) -> dict[str, Any] | None:
+    """Return the latest stored record with the same benchmark parameters."""
+    if not RESULTS_FILE.exists():
+        return None
+    previous = None
+    for line in RESULTS_FILE.read_text(encoding="utf-8").splitlines():
+        record = json.loads(line)
+        if record["params"] == params:
+            previous = record
+    return previous
+
+
+def main() -> None:
+    """Run the benchmark, print a table and store the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=DEFAULT_WORKERS)
+    parser.add_argument("--tests", type=int, default=200)
+    parser.add_argument("--node-latency", type=float, default=0.02)
+    parser.add_argument("--nodes", type=int, default=5)
+    parser.add_argument("--update-bytes", type=int, default=512)
+    parser.add_argument("--state-rows", type=int, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--judge-backend", default="fake:latency=0.05,jitter=0.01")
+    parser.add_argument(
+        "--no-store",
+        action="store_true",
+        help="Don't append the results to benchmarks/results",
+    )
+    args = parser.parse_args()
+
+    app_options = {
+        "node_latency": args.node_latency,
+        "nodes": args.nodes,
+        "update_bytes": args.update_bytes,
+        "state_rows": args.state_rows,
+        "error_rate": args.error_rate,
+    }
+    params = {**app_options, "tests": args.tests, "judge_backend": args.judge_backend}
+
+    spawn = multiprocessing.get_context("spawn")
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = spawn.Process(target=_serve, args=(port, app_options), daemon=True)
+    server.start()
+    runs = []
+    try:
+        _wait_until_up(base_url)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            suite_path = Path(tmp_dir) / "suite.csv"
+            generate_suite(args.tests, suite_path)
+
+            print(
+                f"{'workers':>8} {'tests/s':>8} {'lag p99':>8} {'lag max':>8} "
+                f"{'cpu %':>6} {'rss MiB':>8} {'errors':>7}",
+            )
+            for workers in args.workers:
+                # A fresh process per run, so peak RSS is the run's own
+                with ProcessPoolExecutor(1, mp_context=spawn) as pool:
+                    run = pool.submit(
+                        _run_config,
+                        base_url,
+                        str(suite_path),
+                        args.tests,
+                        workers,
+                        args.judge_backend,
+                        tmp_dir,
+                    ).result()
+                runs.append(run)
+                print(
+                    f"{workers:>8} {run['tests_per_second']:>8.2f} "
+                    f"{run['loop_lag_p99_ms']:>6.1f}ms {run['loop_lag_max_ms']:>6.1f}ms "
+                    f"{run['cpu_percent']:>6.1f} {run['peak_rss_mib']:>8.1f} "
+                    f"{run['errors']:>7}",
+                )
+    finally:
+        server.terminate()
+        server.join()
+
+    previous = _previous_record(params)
+    if previous is not None:
+        before = {run["workers"]: run for run in previous["runs"]}
+        print(f"\nvs {previous['commit'] or 'previous run'} ({previous['timestamp']}):")
+        for run in runs:
+            if run["workers"] in before:
+                old = before[run["workers"]]["tests_per_second"]
+                change = run["tests_per_second"] / old - 1 if old else 0.0
+                print(f"{run['workers']:>8} workers: {change:+.1%} tests/s")
+
+    if not args.no_store:
+        RESULTS_FILE.parent.mkdir(exist_ok=True)
+        record = {
+            "commit": _git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "params": params,
+            "runs": runs,
+        }
+        with open(RESULTS_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"\nResults appended to: {RESULTS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Load-time benchmark for the test suite loader on CSV files.
+
+Generates synthetic test suites and times ``SuiteLoader.load_test_data`` against
+the previous per-row construction (``iterrows`` + ``ExpectedData(**row)``).
+
+Usage
+$ uv run python benchmarks/bench_loader.py
+$ uv run python benchmarks/bench_loader.py --rows 1000 10000
+
+"""
+
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from gnw_evals.data_handlers import SuiteLoader
+from gnw_evals.utils.eval_types import ExpectedData
+
+DEFAULT_ROWS = [1_000, 10_000, 100_000]
+
+
+def generate_suite(rows: int, path: Path) -> None:
+    """Write a synthetic test suite with the columns of the gold sheet."""
+    groups = ["rel-accuracy", "dataset", "aoi", "clarification"]
+    df = pd.DataFrame(
+        {
+            "query": [
+                f"What was the tree cover loss in region {i}?" for i in range(rows)
+            ],
+            "expected_aoi_ids": [f"BRA.{i % 27};BRA.{i % 13}" for i in range(rows)],
+            "expected_subregion": ["state"] * rows,
+            "expected_aoi_source": ["gadm"] * rows,
+            "expected_dataset_id": [str(i % 8) for i in range(rows)],
+            "expected_dataset_name": ["Tree cover loss"] * rows,
+            "expected_context_layer": [" driver "] * rows,
+            "expected_start_date": ["2015-01-01"] * rows,
+            "expected_end_date": ["2023-12-31"] * rows,
+            "expected_answer": [f"{i * 1.5:.1f} hectares" for i in range(rows)],
+            "expected_clarification": ["FALSE"] * rows,
+            "test_group": [groups[i % len(groups)] for i in range(rows)],
+            "status": ["ready"] * rows,
+            "notes": ["null"] * rows,
+        },
+    )
+    df.to_csv(path, index=False)
+
+
+def legacy_construction(path: Path) -> list[ExpectedData]:
+    """Previous loader body: per-column cleanup and per-row model construction."""
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    df = df.fillna("")
+    for col in df.columns:
+        df[col] = df[col].astype(str).str.strip()
+        df[col] = df[col].replace(["nan", "NaN", "null", "NULL", "None"], "")
+    return [ExpectedData(**row.to_dict()) for _, row in df.iterrows()]
+
+
+def time_call(func, *args) -> float:
+    """Return the wall time of a call in seconds, with its output suppressed."""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func(*args)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    """Run the benchmark and print a timing table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'legacy (s)':>11} {'loader (s)':>11} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for rows in args.rows:
+            path = Path(tmp_dir) / f"suite_{rows}.csv"
+            generate_suite(rows, path)
+
+            legacy = time_call(legacy_construction, path)
+            loader = time_call(SuiteLoader().load_test_data, str(path), -1)
+            print(f"{rows:>8} {legacy:>11.3f} {loader:>11.3f} {legacy / loader:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Local ASGI stand-in for the agent API, for benchmarking the harness.
+
+Serves the two endpoints ``APITestRunner`` calls:
+
+- ``POST /api/chat`` streams NDJSON node updates, one every ``node_latency``
+  seconds, padded to ``update_bytes``, ending with a ``trace_info`` node. A
+  share ``error_rate`` of the requests fails with a 500 instead.
+- ``GET /api/threads/{thread_id}/state`` returns a serialized agent state with
+  an AOI, a dataset, ``state_rows`` rows of raw data, chart insights and the
+  message history, as the real API does.
+
+The app is plain ASGI with no framework, so the measured cost is the harness's.
+
+Usage
+$ uv run --group bench uvicorn --factory mock_agent:create_app --app-dir benchmarks
+
+"""
+
+import asyncio
+import json
+import random
+from typing import Any
+
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, HumanMessage
+
+AGENT_NODES = ["pick_aoi", "pick_dataset", "pull_data", "generate_insights", "agent"]
+
+
+def build_state(state_rows: int = 50) -> str:
+    """Return a serialized agent state like the state endpoint's."""
+    return dumps(
+        {
+            "aoi": {
+                "src_id": "BRA.12_1",
+                "name": "Mato Grosso",
+                "subtype": "state-province",
+                "source": "gadm",
+            },
+            "subregion": "municipality",
+            "dataset": {
+                "dataset_id": "4",
+                "dataset_name": "Tree cover loss",
+                "context_layer": "driver",
+            },
+            "raw_data": [
+                {"date": f"{2001 + i % 23}-01-01", "value": i * 1.5}
+                for i in range(state_rows)
+            ],
+            "start_date": "2015-01-01",
+            "end_date": "2023-12-31",
+            "charts_data": [{"insight": "Tree cover loss peaked in 2016."}],
+            "messages": [
+                HumanMessage("What was the tree cover loss in Mato Grosso?"),
+                AIMessage("Mato Grosso lost 1.2 Mha of tree cover, peaking in 2016."),
+            ],
+        },
+    )
+
+
+async def _read_body(receive) -> bytes:
+    """Read a complete request body."""
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def _respond(send, status: int, body: bytes, content_type: str) -> None:
+    """Send a complete response."""
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", content_type.encode()),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        },
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+def create_app(
+    node_latency: float = 0.02,
+    nodes: int = 5,
+    update_bytes: int = 512,
+    state_rows: int = 50,
+    error_rate: float = 0.0,
+    seed: int = 0,
+) -> Any:
+    """Create the mock agent ASGI app.
+
+    Args:
+        node_latency: Seconds before each streamed node update
+        nodes: Node updates streamed per chat request (before trace_info)
+        update_bytes: Approximate size of each node update
+        state_rows: Raw data rows in the agent state
+        error_rate: Share of chat requests answered with a 500
+        seed: Random seed of the injected errors
+
+    Returns:
+        ASGI application
+
+    """
+    rng = random.Random(seed)
+    state_body = json.dumps({"state": build_state(state_rows)}).encode()
+    padding = "x" * update_bytes
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while (message := await receive())["type"] != "lifespan.shutdown":
+                await send({"type": f"{message['type']}.complete"})
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+        path = scope["path"]
+        if scope["method"] == "POST" and path == "/api/chat":
+            payload = json.loads(await _read_body(receive))
+            if rng.random() < error_rate:
+                await _respond(send, 500, b"mock agent error", "text/plain")
+                return
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [(b"content-type", b"application/x-ndjson")],
+                },
+            )
+            for i in range(nodes):
+                await asyncio.sleep(node_latency)
+                node = AGENT_NODES[i % len(AGENT_NODES)]
+                update = json.dumps({"node": node, "update": padding}) + "\n"
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": update.encode(),
+                        "more_body": True,
+                    },
+                )
+            trace = {
+                "trace_id": payload["thread_id"],
+                "trace_url": f"http://mock/trace/{payload['thread_id']}",
+            }
+            line = json.dumps({"node": "trace_info", "update": json.dumps(trace)})
+            await send({"type": "http.response.body", "body": f"{line}\n".encode()})
+        elif scope["method"] == "GET" and path.startswith("/api/threads/"):
+            await _read_body(receive)
+            await _respond(send, 200, state_body, "application/json")
+        else:
+            await _respond(send, 404, b"not found", "text/plain")
+
+    return app
@@ -1,12 +1,55 @@
 import asyncio
+import csv
+import json
+import os
 import time
+from collections.abc import AsyncIterator
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
 
 import click
 import dotenv
 
-from gnw_evals.data_handlers import CSVLoader, ResultExporter
+from gnw_evals.data_handlers import (
+    AOIIndex,
+    RemoteFileCache,
+    ResultExporter,
+    Shard,
+    StateArchive,
+    SuiteLoader,
+    compute_test_id,
+    load_durations,
+    load_results_csv,
+)
+from gnw_evals.data_handlers.remote_cache import DEFAULT_CACHE_DIR
+from gnw_evals.data_handlers.result_exporter import default_history_path
+from gnw_evals.evaluators.clarification_classifier import (
+    ClarificationClassifier,
+    calibrate_thresholds,
+    load_clarification_verdicts,
+)
+from gnw_evals.evaluators.judge_backends import create_judge_backend
+from gnw_evals.evaluators.judge_batch import (
+    JudgeBatchQueue,
+    MessageBatchClient,
+    run_deferred_judging,
+)
+from gnw_evals.evaluators.judge_usage import (
+    judge_usage,
+    merge_summary_rows,
+    parse_judge_budget,
+)
 from gnw_evals.runners import APITestRunner
+from gnw_evals.runners.archive import rescore_results, score_diff
+from gnw_evals.runners.load import PROFILES, arrival_times, run_load, summarize_load
 from gnw_evals.utils.eval_types import ExpectedData, TestResult
+from gnw_evals.utils.live_metrics import MetricsServer, print_live_status, run_metrics
+from gnw_evals.utils.profiling import HarnessProfiler
+from gnw_evals.utils.run_diff import diff_runs, load_run
+from gnw_evals.utils.slo import SLOGate, print_slo_report
+from gnw_evals.utils.summary import print_summary, summarize_results
+from gnw_evals.utils.tracing import current_track, tracer
 
 dotenv.load_dotenv()
 
@@ -16,9 +59,21 @@ async def run_single_test(
     test_case,
     test_index,
     total_tests,
+    queued_at: float | None = None,
 ) -> TestResult:
-    """Run a single test case."""
+    """Run a single test case (total_tests is None if not known up front).
+
+    ``queued_at`` is the ``time.perf_counter`` time the test was dispatched,
+    traced as the wait for a worker.
+    """
     start_time = time.time()
+    # Each test gets its own track in the run trace
+    current_track.set(test_index + 1)
+    tracer.name_track(test_index + 1, f"test {test_index + 1}: {test_case.query[:40]}")
+    if queued_at is not None:
+        tracer.add_span("dispatch_wait", queued_at, time.perf_counter(), "dispatch")
+    if total_tests is None:
+        total_tests = "?"
     print(
         f"[STARTED] Test {test_index + 1}/{total_tests}: {test_case.query[:60]}...",
     )
@@ -28,10 +83,20 @@ async def run_single_test(
     expected_data = ExpectedData(
         **{k: v for k, v in test_dict.items() if k != "query"},
     )
-    result = await runner.run_test(test_case.query, expected_data)
+    expected_data.matchers = test_case.matchers
+    run_metrics.test_started()
+    try:
+        with tracer.span("test", test_group=test_case.test_group):
+            result = await runner.run_test(test_case.query, expected_data)
+    except BaseException:
+        run_metrics.test_finished(time.time() - start_time, error=True)
+        raise
 
     # Print completion with timing
     duration = time.time() - start_time
+    run_metrics.test_finished(duration, error=bool(result.error))
+    result.test_id = compute_test_id(test_case.query, test_dict)
+    result.duration_seconds = round(duration, 2)
     score = result.overall_score
     print(
         f"[COMPLETED] Test {test_index + 1}/{total_tests}: Score {score:.2f} ({duration:.1f}s)",
@@ -46,195 +111,465 @@ async def run_single_test(
     return result
 
 
+async def run_streaming_tests(
+    runner,
+    test_cases: AsyncIterator,
+    num_workers: int,
+    results: dict[int, TestResult] | None = None,
+) -> list[TestResult]:
+    """Run test cases from an async source with a bounded worker pool.
+
+    Tests start as soon as the first test cases are parsed. At most
+    ``num_workers`` test cases are buffered ahead of the workers, so memory
+    stays flat regardless of the suite size. Finished tests are added to
+    ``results`` by test index as they complete, if given.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=num_workers)
+    results = {} if results is None else results
+    run_metrics.watch_queue("stream_buffer", queue.qsize)
+
+    async def produce():
+        test_index = 0
+        async for test_case in test_cases:
+            run_metrics.test_queued()
+            runner.register_test(test_case.query, test_case)
+            await queue.put((test_index, test_case, time.perf_counter()))
+            test_index += 1
+        for _ in range(num_workers):
+            await queue.put(None)
+
+    async def work():
+        while (item := await queue.get()) is not None:
+            test_index, test_case, queued_at = item
+            results[test_index] = await run_single_test(
+                runner,
+                test_case,
+                test_index,
+                None,
+                queued_at,
+            )
+
+    async with asyncio.TaskGroup() as tasks:
+        tasks.create_task(produce())
+        for _ in range(num_workers):
+            tasks.create_task(work())
+
+    return [results[i] for i in sorted(results)]
+
+
 async def run_csv_tests(config) -> list[TestResult]:
     """Run E2E tests using CSV data files with parallel execution."""
+    exporter = ResultExporter()
+    if not config.profile:
+        return await _run_suite(config, exporter)
+
+    # The profile covers the whole run, and is saved even if the run aborts
+    profiler = HarnessProfiler(run_metrics, config.profile_snapshot_every)
+    profiler.start()
+    try:
+        return await _run_suite(config, exporter)
+    finally:
+        profiler.stop()
+        exporter.save_profile(
+            profiler.folded(),
+            profiler.report,
+            config.output_filename,
+        )
+
+
+async def _run_suite(config, exporter: ResultExporter) -> list[TestResult]:
+    """Load, run, export and summarize a test suite (see ``run_csv_tests``)."""
     print(f"Loading test data from: {config.test_file}")
 
-    # Load test data
-    loader = CSVLoader()
-    test_cases = loader.load_test_data(
-        config.test_file,
-        config.sample_size,
-        config.test_group_filter,
-        config.status_filter,
-        config.random_seed,
-        config.offset,
+    aoi_index = None
+    if config.aoi_index:
+        aoi_index = AOIIndex.load(config.aoi_index)
+        print(f"Loaded {len(aoi_index)} AOI IDs from: {config.aoi_index}")
+
+    loader = SuiteLoader(
+        cache=RemoteFileCache(config.test_file_cache_dir, offline=config.offline),
+        passthrough_columns=config.passthrough_columns,
+        shard=config.shard,
+        aoi_index=aoi_index,
     )
-    print(
-        f"Running {len(test_cases)} tests with {config.num_workers} workers...",
+    test_cases = []
+    if not config.stream:
+        # Load test data
+        test_cases = loader.load_test_data(
+            config.test_file,
+            config.sample_size,
+            config.test_group_filter,
+            config.status_filter,
+            config.random_seed,
+            config.offset,
+        )
+        print(
+            f"Running {len(test_cases)} tests with {config.num_workers} workers...",
+        )
+
+    # Judge accounting starts fresh for every run
+    judge_usage.reset()
+    judge_usage.configure_budget(
+        config.judge_budget_tokens,
+        config.judge_budget_usd,
+        config.judge_budget_action,
     )
 
     # Setup test runner
+    judge_backend = create_judge_backend(config.judge_backend, config.judge_cache)
+    judge_queue = JudgeBatchQueue() if config.judge_mode == "batch" else None
+    clarification_classifier = (
+        ClarificationClassifier(*config.clarification_thresholds)
+        if config.clarification_heuristic
+        else None
+    )
+    state_archive = None
+    if config.archive_states:
+        state_archive = StateArchive(exporter.states_dir(config.output_filename))
+        print(f"Archiving agent states to: {state_archive.root.name}")
+
     runner = APITestRunner(
         api_base_url=config.api_base_url,
         api_token=config.api_token,
+        judge_queue=judge_queue,
+        judge_backend=judge_backend,
+        clarification_classifier=clarification_classifier,
+        judge_samples=config.judge_samples,
+        dedupe_queries=config.dedupe_queries,
+        aoi_index=aoi_index,
+        state_archive=state_archive,
     )
+    print(f"Using judge backend: {config.judge_backend}")
     print(f"Using API endpoint: {config.api_base_url}")
 
+    # Live metrics start fresh for every run
+    run_metrics.reset()
+    run_metrics.test_queued(len(test_cases))
+    for test_case in test_cases:
+        runner.register_test(test_case.query, test_case)
+    if judge_queue is not None:
+        run_metrics.watch_queue("deferred_judgements", judge_queue.__len__)
+    metrics_server = None
+    if config.metrics_port is not None:
+        metrics_server = MetricsServer(run_metrics, config.metrics_port)
+        metrics_server.start()
+        print(
+            f"Serving live metrics at: http://127.0.0.1:{metrics_server.port}/metrics",
+        )
+    if config.trace:
+        tracer.start()
+    live_status = None
+    if config.live_status_interval > 0:
+        live_status = asyncio.create_task(
+            print_live_status(run_metrics, config.live_status_interval),
+        )
+
     # Run tests in parallel
     start_time = time.time()
 
-    if config.num_workers == 1:
-        # Sequential execution for single worker
-        results = []
-        for i, test_case in enumerate(test_cases):
-            result = await run_single_test(
+    # Finished results by test index, so an aborted run still exports them
+    completed: dict[int, TestResult] = {}
+    total_duration = None
+    aborted_by = None
+    try:
+        if config.stream:
+            # Dispatch tests while the test file is still being read
+            print(f"Streaming tests with {config.num_workers} workers...")
+            await run_streaming_tests(
                 runner,
-                test_case,
-                i,
-                len(test_cases),
+                loader.iter_test_data(
+                    config.test_file,
+                    config.sample_size,
+                    config.test_group_filter,
+                    config.status_filter,
+                    config.random_seed,
+                    config.offset,
+                ),
+                config.num_workers,
+                completed,
             )
-            results.append(result)
-    else:
-        # Parallel execution with semaphore
-        semaphore = asyncio.Semaphore(config.num_workers)
-
-        async def run_test_with_semaphore(test_case, test_index):
-            async with semaphore:
-                return await run_single_test(
+        elif config.num_workers == 1:
+            # Sequential execution for single worker
+            for i, test_case in enumerate(test_cases):
+                completed[i] = await run_single_test(
                     runner,
                     test_case,
-                    test_index,
+                    i,
                     len(test_cases),
                 )
+        else:
+            # Parallel execution with semaphore
+            semaphore = asyncio.Semaphore(config.num_workers)
 
-        # Create tasks for all tests
-        tasks = [
-            run_test_with_semaphore(test_case, i)
-            for i, test_case in enumerate(test_cases)
-        ]
+            async def run_test_with_semaphore(test_case, test_index):
+                queued_at = time.perf_counter()
+                async with semaphore:
+                    completed[test_index] = await run_single_test(
+                        runner,
+                        test_case,
+                        test_index,
+                        len(test_cases),
+                        queued_at,
+                    )
 
-        # Execute all tasks concurrently
-        results = await asyncio.gather(*tasks)
+            # Create tasks for all tests
+            tasks = [
+                run_test_with_semaphore(test_case, i)
+                for i, test_case in enumerate(test_cases)
+            ]
 
-    total_duration = time.time() - start_time
-    print(f"\nAll tests completed in {total_duration:.1f} seconds")
+            # Execute all tasks concurrently
+            await asyncio.gather(*tasks)
 
-    # Save results
-    exporter = ResultExporter()
-    exporter.save_results_to_csv(results, config.output_filename)
+        results = [completed[i] for i in sorted(completed)]
+        total_duration = time.time() - start_time
+        print(f"\nAll tests completed in {total_duration:.1f} seconds")
+        if config.dedupe_queries:
+            print(
+                f"Agent calls: {runner.agent_calls} ({runner.agent_calls_saved} saved by query dedupe)",
+            )
+
+        # Resolve deferred answer judgements before exporting
+        if judge_queue is not None:
+            await run_deferred_judging(
+                results,
+                judge_queue,
+                runner,
+                MessageBatchClient(
+                    poll_interval=config.batch_poll_interval,
+                    max_wait=config.batch_timeout,
+                ),
+                model=judge_backend.model,
+            )
+    except BaseException as e:
+        aborted_by = type(e).__name__
+        raise
+    finally:
+        if live_status is not None:
+            live_status.cancel()
+            print(run_metrics.status_line())
+        if metrics_server is not None:
+            metrics_server.stop()
+        if config.trace:
+            tracer.stop()
+            exporter.save_trace(tracer.events, config.output_filename)
+        results = [completed[i] for i in sorted(completed)]
+        if total_duration is None:
+            total_duration = time.time() - start_time
+        if aborted_by:
+            print(
+                f"\nRun aborted by {aborted_by}; saving the {len(results)} completed tests",
+            )
+
+        # Save results (deferred judgements that did not resolve stay unscored)
+        exporter.save_results_to_csv(results, config.output_filename)
+        exporter.save_judge_usage(judge_usage.summary_rows(), config.output_filename)
+        metadata = {
+            "test_file": config.test_file,
+            "suite": loader.suite_info,
+            "load": loader.load_stats,
+            "sample_size": config.sample_size,
+            "test_group_filter": config.test_group_filter,
+            "status_filter": config.status_filter,
+            "random_seed": config.random_seed,
+            "offset": config.offset,
+            "shard": str(config.shard) if config.shard else None,
+            "shard_weighted": bool(config.shard and config.shard.weighted),
+            "test_count": len(results),
+            "judge_backend": config.judge_backend,
+            "judge_mode": config.judge_mode,
+            # Thresholds of the clarification heuristic, None when every
+            # response went to the judge
+            "clarification_heuristic": list(config.clarification_thresholds)
+            if config.clarification_heuristic
+            else None,
+            "dedupe_queries": config.dedupe_queries,
+            "agent_calls": runner.agent_calls,
+            "agent_calls_saved": runner.agent_calls_saved,
+            "states_dir": state_archive.root.name if state_archive else None,
+            "duration_seconds": round(total_duration, 1),
+            "aborted_by": aborted_by,
+        }
+        exporter.save_run_metadata(metadata, config.output_filename)
+        summary = summarize_results(results)
+        # Budgets and history only apply to complete runs
+        if config.slo_gate is not None and aborted_by is None:
+            summary["slo"] = config.slo_gate.evaluate(results)
+        exporter.save_summary_json(summary, config.output_filename)
+        if config.record_history and aborted_by is None:
+            exporter.save_to_history(
+                results,
+                metadata,
+                config.output_filename,
+                environment=config.api_base_url,
+                history_path=config.history_db,
+            )
 
     # Print summary
-    _print_csv_summary(results)
+    print_summary(summary)
+    _print_judge_usage()
+    if "slo" in summary:
+        print_slo_report(summary["slo"])
     return results
 
 
-def _print_csv_summary(results: list[TestResult]) -> None:
-    """Print CSV test summary statistics."""
-    total_tests = len(results)
-    if total_tests == 0:
+def _print_judge_usage() -> None:
+    """Print judge token usage and estimated cost of the run."""
+    rows = judge_usage.summary_rows()
+    if not rows:
         return
 
-    avg_score = sum(r.overall_score for r in results) / total_tests
-    passed = sum(1 for r in results if r.overall_score >= 0.7)
-
     print(f"\n{'=' * 50}")
-    print("SIMPLE E2E TEST SUMMARY")
+    print("JUDGE USAGE")
     print(f"{'=' * 50}")
-    print(f"Total Tests: {total_tests}")
-    print(f"Average Score: {avg_score:.2f}")
-    print(f"Passed (≥0.7): {passed}/{total_tests} ({passed / total_tests:.1%})")
-
-    # Component-specific stats (separate binary scores)
-
-    # AOI ID Match
-    aoi_id_nones = len([r for r in results if r.aoi_id_match_score is None])
-    if total_tests - aoi_id_nones > 0:
-        aoi_id_avg = sum(
-            r.aoi_id_match_score for r in results if r.aoi_id_match_score is not None
-        ) / (total_tests - aoi_id_nones)
-        aoi_id_avg = f"{aoi_id_avg:.2f}"
-    else:
-        aoi_id_avg = None
-    print(f"AOI ID Match: {aoi_id_avg} ({aoi_id_nones} None)")
-
-    # Subregion Match
-    subregion_nones = len([r for r in results if r.subregion_match_score is None])
-    if total_tests - subregion_nones > 0:
-        subregion_avg = sum(
-            r.subregion_match_score
-            for r in results
-            if r.subregion_match_score is not None
-        ) / (total_tests - subregion_nones)
-        subregion_avg = f"{subregion_avg:.2f}"
-    else:
-        subregion_avg = None
-    print(f"Subregion Match: {subregion_avg} ({subregion_nones} None)")
-
-    # Dataset ID Match
-    dataset_id_nones = len([r for r in results if r.dataset_id_match_score is None])
-    if total_tests - dataset_id_nones > 0:
-        dataset_id_avg = sum(
-            r.dataset_id_match_score
-            for r in results
-            if r.dataset_id_match_score is not None
-        ) / (total_tests - dataset_id_nones)
-        dataset_id_avg = f"{dataset_id_avg:.2f}"
-    else:
-        dataset_id_avg = None
-    print(f"Dataset ID Match: {dataset_id_avg} ({dataset_id_nones} None)")
-
-    # Context Layer Match
-    context_nones = len([r for r in results if r.context_layer_match_score is None])
-    if total_tests - context_nones > 0:
-        context_avg = sum(
-            r.context_layer_match_score
-            for r in results
-            if r.context_layer_match_score is not None
-        ) / (total_tests - context_nones)
-        context_avg = f"{context_avg:.2f}"
-    else:
-        context_avg = None
-    print(f"Context Layer Match: {context_avg} ({context_nones} None)")
-
-    # Data Pull Exists
-    data_pull_nones = len([r for r in results if r.data_pull_exists_score is None])
-    if total_tests - data_pull_nones > 0:
-        data_pull_avg = sum(
-            r.data_pull_exists_score
-            for r in results
-            if r.data_pull_exists_score is not None
-        ) / (total_tests - data_pull_nones)
-        data_pull_avg = f"{data_pull_avg:.2f}"
-    else:
-        data_pull_avg = None
-    print(f"Data Pull Exists: {data_pull_avg} ({data_pull_nones} None)")
-
-    # Date Match
-    date_nones = len([r for r in results if r.date_match_score is None])
-    if total_tests - date_nones > 0:
-        date_avg = sum(
-            r.date_match_score for r in results if r.date_match_score is not None
-        ) / (total_tests - date_nones)
-        date_avg = f"{date_avg:.2f}"
-    else:
-        date_avg = None
-    print(f"Date Match: {date_avg} ({date_nones} None)")
-
-    # Charts Answer
-    charts_answer_nones = len([r for r in results if r.charts_answer_score is None])
-    if total_tests - charts_answer_nones > 0:
-        charts_answer_avg = sum(
-            r.charts_answer_score for r in results if r.charts_answer_score is not None
-        ) / (total_tests - charts_answer_nones)
-        charts_answer_avg = f"{charts_answer_avg:.2f}"
-    else:
-        charts_answer_avg = None
-    print(f"Charts Answer: {charts_answer_avg} ({charts_answer_nones} None)")
-
-    # Agent Answer
-    agent_answer_nones = len([r for r in results if r.agent_answer_score is None])
-    if total_tests - agent_answer_nones > 0:
-        agent_answer_avg = sum(
-            r.agent_answer_score for r in results if r.agent_answer_score is not None
-        ) / (total_tests - agent_answer_nones)
-        agent_answer_avg = f"{agent_answer_avg:.2f}"
-    else:
-        agent_answer_avg = None
-    print(f"Agent Answer: {agent_answer_avg} ({agent_answer_nones} None)")
-
-
-@click.command()
+    for evaluator in sorted({row["evaluator"] for row in rows}):
+        evaluator_rows = [row for row in rows if row["evaluator"] == evaluator]
+        calls = sum(row["calls"] for row in evaluator_rows)
+        input_tokens = sum(row["input_tokens"] for row in evaluator_rows)
+        output_tokens = sum(row["output_tokens"] for row in evaluator_rows)
+        cost = sum(row["cost_usd"] for row in evaluator_rows)
+        print(
+            f"{evaluator}: {calls} calls, {input_tokens} in / {output_tokens} out tokens, ${cost:.4f}",
+        )
+    print(
+        f"Total: {len(judge_usage.calls)} calls, {judge_usage.total_tokens} tokens, ${judge_usage.total_cost_usd:.4f}",
+    )
+    heuristic_decisions = sum(row["heuristic_decisions"] for row in rows)
+    if heuristic_decisions:
+        print(
+            f"Clarification heuristic: {heuristic_decisions} verdicts decided without a judge call",
+        )
+
+
+def _parse_thresholds(value: str) -> tuple[float, float]:
+    """Parse "lower,upper" clarification thresholds."""
+    lower, upper = (float(v) for v in value.split(","))
+    ClarificationClassifier(lower, upper)
+    return lower, upper
+
+
+def build_config(**options: Any) -> SimpleNamespace:
+    """Validate run_evals options and build the run config from them.
+
+    Options not given take their CLI defaults. The string options that are
+    parsed (status filter, passthrough columns, shard, judge budget,
+    clarification thresholds, SLO config) are replaced by their parsed
+    values, so callers other than the CLI get the same config as a run does.
+
+    Raises:
+        click.BadParameter: If an option is invalid
+
+    """
+    defaults = {param.name: param.default for param in run_evals.params}
+    options = SimpleNamespace(**{**defaults, **options})
+
+    # Validate API token
+    if not options.api_token:
+        raise click.BadParameter(
+            "API token is required. Provide --api-token or set API_TOKEN environment variable.",
+        )
+
+    # Validate inputs
+    if options.sample_size < -1:
+        raise click.BadParameter("SAMPLE_SIZE must be >= -1")
+    if options.num_workers < 1:
+        raise click.BadParameter("NUM_WORKERS must be >= 1")
+    if options.batch_poll_interval <= 0:
+        raise click.BadParameter("BATCH_POLL_INTERVAL must be > 0")
+    if options.batch_timeout <= 0:
+        raise click.BadParameter("BATCH_TIMEOUT must be > 0")
+    if options.judge_samples < 1:
+        raise click.BadParameter("JUDGE_SAMPLES must be >= 1")
+    if options.judge_samples > 1 and options.judge_mode == "batch":
+        raise click.BadParameter("JUDGE_SAMPLES > 1 is only supported in inline mode")
+    if options.metrics_port is not None and not 0 <= options.metrics_port <= 65535:
+        raise click.BadParameter("METRICS_PORT must be between 0 and 65535")
+    if options.live_status_interval < 0:
+        raise click.BadParameter("LIVE_STATUS_INTERVAL must be >= 0")
+    if options.profile_snapshot_every < 0:
+        raise click.BadParameter("PROFILE_SNAPSHOT_EVERY must be >= 0")
+
+    slo_gate = None
+    if options.slo_config:
+        try:
+            slo_gate = SLOGate.load(options.slo_config)
+        except (ValueError, OSError) as e:
+            raise click.BadParameter(f"Invalid SLO_CONFIG: {e}") from e
+
+    try:
+        create_judge_backend(options.judge_backend)
+    except (ValueError, TypeError, OSError) as e:
+        raise click.BadParameter(f"Invalid JUDGE_BACKEND: {e}") from e
+    if options.judge_mode == "batch" and not options.judge_backend.startswith(
+        "anthropic",
+    ):
+        raise click.BadParameter("JUDGE_MODE batch requires an anthropic judge backend")
+
+    try:
+        clarification_threshold_values = _parse_thresholds(
+            options.clarification_thresholds,
+        )
+    except ValueError as e:
+        raise click.BadParameter(
+            "CLARIFICATION_THRESHOLDS must be 'lower,upper' with 0 <= lower <= upper <= 1",
+        ) from e
+
+    judge_budget_tokens, judge_budget_usd = None, None
+    if options.judge_budget:
+        try:
+            judge_budget_tokens, judge_budget_usd = parse_judge_budget(
+                options.judge_budget,
+            )
+        except ValueError as e:
+            raise click.BadParameter(
+                "JUDGE_BUDGET must be a token count (500000) or a dollar amount ($2.50)",
+            ) from e
+
+    # Parse status_filter from comma-separated string to list
+    status_filter_list = None
+    if options.status_filter:
+        status_filter_list = [
+            s.strip() for s in options.status_filter.split(",") if s.strip()
+        ]
+
+    passthrough_columns_list = None
+    if options.passthrough_columns:
+        passthrough_columns_list = [
+            c.strip() for c in options.passthrough_columns.split(",") if c.strip()
+        ]
+
+    shard_spec = None
+    if options.shard:
+        durations = None
+        if options.shard_durations:
+            durations = load_durations(
+                [p.strip() for p in options.shard_durations.split(",") if p.strip()],
+            )
+        try:
+            shard_spec = Shard.parse(options.shard, durations)
+        except ValueError as e:
+            raise click.BadParameter(
+                "SHARD must be 'i/N' with 1 <= i <= N, e.g. 2/4",
+            ) from e
+    elif options.shard_durations:
+        raise click.BadParameter("SHARD_DURATIONS requires SHARD")
+
+    return SimpleNamespace(
+        **{
+            **vars(options),
+            "status_filter": status_filter_list,
+            "passthrough_columns": passthrough_columns_list,
+            "shard": shard_spec,
+            "judge_budget_tokens": judge_budget_tokens,
+            "judge_budget_usd": judge_budget_usd,
+            "clarification_thresholds": clarification_threshold_values,
+            "slo_gate": slo_gate,
+        },
+    )
+
+
+@click.group(invoke_without_command=True)
+@click.pass_context
 @click.option(
     "--api-base-url",
     default="https://api.staging.globalnaturewatch.org",
@@ -258,7 +593,27 @@ def _print_csv_summary(results: list[TestResult]) -> None:
     "--test-file",
     default="https://docs.google.com/spreadsheets/d/1_G1aq2fSCPqhT6w55_Od6VU7sov76t1lHQTBeZZxbdM/export?format=csv&gid=0",
     envvar="TEST_FILE",
-    help="Path or URL to test dataset CSV file (relative to project root) (can also be set via TEST_FILE env var)",
+    help="Path or URL to test suite file: CSV, JSONL or Parquet, detected by extension (relative to project root). Several files can be given separated by commas; they are loaded concurrently and run as one suite (can also be set via TEST_FILE env var)",
+)
+@click.option(
+    "--offline",
+    is_flag=True,
+    default=False,
+    envvar="OFFLINE",
+    help="Use the cached copy of a remote test file without revalidating it (can also be set via OFFLINE env var)",
+)
+@click.option(
+    "--stream",
+    is_flag=True,
+    default=False,
+    envvar="STREAM",
+    help="Start dispatching tests while the test file is still being read, with at most NUM_WORKERS test cases buffered (can also be set via STREAM env var)",
+)
+@click.option(
+    "--test-file-cache-dir",
+    default=str(DEFAULT_CACHE_DIR),
+    envvar="TEST_FILE_CACHE_DIR",
+    help="Directory where remote test files are cached (can also be set via TEST_FILE_CACHE_DIR env var)",
 )
 @click.option(
     "--test-group-filter",
@@ -272,12 +627,62 @@ def _print_csv_summary(results: list[TestResult]) -> None:
     envvar="STATUS_FILTER",
     help="Filter by status column (comma-separated values) (can also be set via STATUS_FILTER env var)",
 )
+@click.option(
+    "--passthrough-columns",
+    default=None,
+    envvar="PASSTHROUGH_COLUMNS",
+    help="Extra test file columns to keep on test cases (comma-separated); only query and expected fields are read otherwise (can also be set via PASSTHROUGH_COLUMNS env var)",
+)
+@click.option(
+    "--shard",
+    default=None,
+    envvar="SHARD",
+    help="Only run shard i of N (e.g. 2/4). Tests are assigned by a stable hash of their query, so shards are disjoint and stable as rows are added (can also be set via SHARD env var)",
+)
+@click.option(
+    "--shard-durations",
+    default=None,
+    envvar="SHARD_DURATIONS",
+    help="Earlier result CSVs (comma-separated) whose duration_seconds balance shards by expected run time instead of by hash (can also be set via SHARD_DURATIONS env var)",
+)
+@click.option(
+    "--dedupe-queries",
+    is_flag=True,
+    default=False,
+    envvar="DEDUPE_QUERIES",
+    help="Run the agent once per unique (whitespace and case normalized) query and evaluate every row with that query against the shared agent state (can also be set via DEDUPE_QUERIES env var)",
+)
+@click.option(
+    "--archive-states",
+    is_flag=True,
+    default=False,
+    envvar="ARCHIVE_STATES",
+    help="Archive every raw agent state (gzipped, content-addressed) in outputs/<run>_states so the run can be rescored offline with the rescore command (can also be set via ARCHIVE_STATES env var)",
+)
+@click.option(
+    "--aoi-index",
+    default=None,
+    envvar="AOI_INDEX",
+    help="CSV (src_id, optional source) or text file of known AOI IDs. Expected AOI IDs missing from it are rejected at load time and the hierarchy relation of selected AOIs is reported (can also be set via AOI_INDEX env var)",
+)
 @click.option(
     "--output-filename",
     default=None,
     envvar="OUTPUT_FILENAME",
     help="Custom filename (timestamp will be appended) (can also be set via OUTPUT_FILENAME env var)",
 )
+@click.option(
+    "--record-history/--no-record-history",
+    default=False,
+    envvar="RECORD_HISTORY",
+    help="Also record the run in the SQLite run history store. Off by default so local runs don't write to a shared store; enable it for CI or named environments (can also be set via RECORD_HISTORY env var)",
+)
+@click.option(
+    "--history-db",
+    default=None,
+    envvar="HISTORY_DB",
+    help="Run history database (default: outputs/history.sqlite) (can also be set via HISTORY_DB env var)",
+)
 @click.option(
     "--num-workers",
     default=1,
@@ -299,19 +704,157 @@ def _print_csv_summary(results: list[TestResult]) -> None:
     envvar="OFFSET",
     help="Offset for getting subset. Ignored if random_seed is not 0 (can also be set via OFFSET env var)",
 )
+@click.option(
+    "--judge-mode",
+    default="inline",
+    type=click.Choice(["inline", "batch"]),
+    envvar="JUDGE_MODE",
+    help="inline judges answers during each test, batch defers all answer judging to a Message Batches submission after the agent runs (can also be set via JUDGE_MODE env var)",
+)
+@click.option(
+    "--batch-poll-interval",
+    default=30.0,
+    type=float,
+    envvar="BATCH_POLL_INTERVAL",
+    help="Seconds between status checks of submitted judge batches (can also be set via BATCH_POLL_INTERVAL env var)",
+)
+@click.option(
+    "--batch-timeout",
+    default=7200.0,
+    type=float,
+    envvar="BATCH_TIMEOUT",
+    help="Seconds to wait for submitted judge batches to end before aborting the run; finished tests are still exported (can also be set via BATCH_TIMEOUT env var)",
+)
+@click.option(
+    "--judge-budget",
+    default=None,
+    envvar="JUDGE_BUDGET",
+    help="Judge budget per run, in tokens (e.g. 500000) or dollars (e.g. $2.50). Once exceeded, judge checks follow --judge-budget-action (can also be set via JUDGE_BUDGET env var)",
+)
+@click.option(
+    "--judge-budget-action",
+    default="deterministic",
+    type=click.Choice(["deterministic", "skip"]),
+    envvar="JUDGE_BUDGET_ACTION",
+    help="What to do once the judge budget is exceeded: deterministic falls back to rule-based scoring, skip leaves judge checks unscored (can also be set via JUDGE_BUDGET_ACTION env var)",
+)
+@click.option(
+    "--judge-backend",
+    default="anthropic",
+    envvar="JUDGE_BACKEND",
+    help="Judge backend: anthropic[:model], fake[:latency=0.5,jitter=0.1,error_rate=0.01,pass_rate=0.5,seed=0] for offline runs, or replay:PATH to replay a judge cache (can also be set via JUDGE_BACKEND env var)",
+)
+@click.option(
+    "--judge-cache",
+    default=None,
+    envvar="JUDGE_CACHE",
+    help="Append every judge verdict to this JSONL file so it can be replayed later with --judge-backend replay:PATH (can also be set via JUDGE_CACHE env var)",
+)
+@click.option(
+    "--judge-samples",
+    default=1,
+    type=int,
+    envvar="JUDGE_SAMPLES",
+    help="Self-consistency votes per answer judgement. Above 1, answers are scored by majority vote with early stopping and the vote agreement is reported as a confidence (can also be set via JUDGE_SAMPLES env var)",
+)
+@click.option(
+    "--clarification-heuristic/--no-clarification-heuristic",
+    default=False,
+    envvar="CLARIFICATION_HEURISTIC",
+    help="Decide clear clarification cases with a local heuristic and only send uncertain responses to the LLM judge. Off by default: the heuristic weights are not calibrated yet (can also be set via CLARIFICATION_HEURISTIC env var)",
+)
+@click.option(
+    "--clarification-thresholds",
+    default="0.15,0.85",
+    envvar="CLARIFICATION_THRESHOLDS",
+    help="Heuristic probabilities 'lower,upper' at or below which a response is not a clarification and at or above which it is; anything in between goes to the LLM judge (can also be set via CLARIFICATION_THRESHOLDS env var)",
+)
+@click.option(
+    "--metrics-port",
+    default=None,
+    type=int,
+    envvar="METRICS_PORT",
+    help="Serve live run metrics in the Prometheus text format at http://127.0.0.1:PORT/metrics during the run (can also be set via METRICS_PORT env var)",
+)
+@click.option(
+    "--live-status-interval",
+    default=0.0,
+    type=float,
+    envvar="LIVE_STATUS_INTERVAL",
+    help="Print a live status line (in flight, completed/sec, error rate, rolling p50/p95 latency, judge calls in flight, queue depths) every N seconds; 0 disables it (can also be set via LIVE_STATUS_INTERVAL env var)",
+)
+@click.option(
+    "--trace",
+    is_flag=True,
+    default=False,
+    envvar="TRACE",
+    help="Record nested spans of every test (dispatch wait, HTTP, agent nodes, state fetch, evaluators, judge calls) to outputs/<run>_trace.json, viewable in Perfetto or chrome://tracing (can also be set via TRACE env var)",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    default=False,
+    envvar="PROFILE",
+    help="Profile the harness itself: sample the stacks of all threads into outputs/<run>_profile.folded (flame graph input) and report the top allocators to outputs/<run>_allocations.txt (can also be set via PROFILE env var)",
+)
+@click.option(
+    "--profile-snapshot-every",
+    default=100,
+    type=int,
+    envvar="PROFILE_SNAPSHOT_EVERY",
+    help="Completed tests between tracemalloc snapshots with --profile; 0 only snapshots at the end of the run (can also be set via PROFILE_SNAPSHOT_EVERY env var)",
+)
+@click.option(
+    "--slo-config",
+    default=None,
+    type=click.Path(exists=True, dir_okay=False),
+    envvar="SLO_CONFIG",
+    help="TOML file of latency budgets (p50/p95/max seconds over all tests, per test_group and per agent node). Results are added to the summary and the run exits with status 1 on a breach (can also be set via SLO_CONFIG env var)",
+)
 def run_evals(
+    ctx: click.Context,
     api_base_url: str,
     api_token: str | None,
     sample_size: int,
     test_file: str,
+    offline: bool,
+    stream: bool,
+    test_file_cache_dir: str,
     test_group_filter: str | None,
     status_filter: str | None,
+    passthrough_columns: str | None,
+    shard: str | None,
+    shard_durations: str | None,
+    dedupe_queries: bool,
+    archive_states: bool,
+    aoi_index: str | None,
     output_filename: str | None,
+    record_history: bool,
+    history_db: str | None,
     num_workers: int,
     random_seed: int,
     offset: int,
+    judge_mode: str,
+    batch_poll_interval: float,
+    batch_timeout: float,
+    judge_budget: str | None,
+    judge_budget_action: str,
+    judge_backend: str,
+    judge_cache: str | None,
+    judge_samples: int,
+    clarification_heuristic: bool,
+    clarification_thresholds: str,
+    metrics_port: int | None,
+    live_status_interval: float,
+    trace: bool,
+    profile: bool,
+    profile_snapshot_every: int,
+    slo_config: str | None,
 ):
     """Run main E2E test function for CSV based evaluation."""
+    if ctx.invoked_subcommand is not None:
+        return
+
     print(
         f"""
 ========================
@@ -320,49 +863,617 @@ EVALUATION CONFIGURATION
   API Base URL:      {api_base_url}
   Sample Size:       {sample_size}
   Test File:         {test_file}
+  Offline:           {offline}
+  Stream:            {stream}
   Test Group Filter: {test_group_filter or "None"}
   Status Filter:     {status_filter or "None"}
+  Shard:             {shard or "None"}
+  Dedupe Queries:    {dedupe_queries}
+  Archive States:    {archive_states}
+  AOI Index:         {aoi_index or "None"}
   Output Filename:   {output_filename or "Auto-generated"}
+  Run History:       {(history_db or "outputs/history.sqlite") if record_history else "Off"}
   Num Workers:       {num_workers}
   Random Seed:       {random_seed}
   Offset:            {offset}
+  Judge Mode:        {f"batch (timeout {batch_timeout:g}s)" if judge_mode == "batch" else judge_mode}
+  Judge Backend:     {judge_backend}
+  Judge Budget:      {judge_budget or "None"}
+  Judge Samples:     {judge_samples}
+  Clarif. Heuristic: {clarification_thresholds if clarification_heuristic else "Off"}
+  Metrics Port:      {"Off" if metrics_port is None else metrics_port}
+  Live Status:       {f"every {live_status_interval:g}s" if live_status_interval > 0 else "Off"}
+  Trace:             {trace}
+  Profile:           {f"snapshot every {profile_snapshot_every} tests" if profile else "Off"}
+  Latency SLOs:      {slo_config or "None"}
 ========================
 """,
     )
-    # Validate API token
+    config = build_config(**ctx.params)
+    results = asyncio.run(run_csv_tests(config))
+    assert len(results) > 0, "No test results from CSV"
+    if config.slo_gate is not None and config.slo_gate.breached:
+        ctx.exit(1)
+
+
+@run_evals.command("calibrate-clarification")
+@click.argument("cache_file", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--min-accuracy",
+    default=0.98,
+    type=float,
+    help="Minimum agreement with the LLM judge on heuristic decisions",
+)
+@click.option(
+    "--clarification-thresholds",
+    default="0.15,0.85",
+    envvar="CLARIFICATION_THRESHOLDS",
+    help="Currently configured thresholds to report on (can also be set via CLARIFICATION_THRESHOLDS env var)",
+)
+def calibrate_clarification(
+    cache_file: str,
+    min_accuracy: float,
+    clarification_thresholds: str,
+):
+    """Tune clarification heuristic thresholds against verdicts in a judge cache."""
+    verdicts = load_clarification_verdicts(cache_file)
+    if not verdicts:
+        raise click.ClickException(
+            f"No LLM clarification verdicts found in {cache_file}",
+        )
+
+    report = calibrate_thresholds(
+        verdicts,
+        min_accuracy,
+        *_parse_thresholds(clarification_thresholds),
+    )
+    print(f"\n{'=' * 50}")
+    print("CLARIFICATION HEURISTIC CALIBRATION")
+    print(f"{'=' * 50}")
+    print(f"Verdicts: {report['samples']} ({report['positives']} clarifications)")
+    for label in ("current", "recommended"):
+        row = report[label]
+        if row is None:
+            print(f"{label.title()}: no thresholds reach {min_accuracy:.0%} accuracy")
+            continue
+        accuracy = "n/a" if row["accuracy"] is None else f"{row['accuracy']:.1%}"
+        print(
+            f"{label.title()}: {row['lower_threshold']:.2f},{row['upper_threshold']:.2f} - "
+            f"coverage {row['coverage']:.1%}, accuracy {accuracy}, "
+            f"{row['false_positives']} FP / {row['false_negatives']} FN, "
+            f"{row['llm_calls']} judge calls",
+        )
+
+
+@run_evals.command("merge")
+@click.argument(
+    "detailed_files",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, dir_okay=False),
+)
+@click.option(
+    "--output-filename",
+    default=None,
+    envvar="OUTPUT_FILENAME",
+    help="Custom filename for the merged results (timestamp will be appended) (can also be set via OUTPUT_FILENAME env var)",
+)
+def merge(detailed_files: tuple[str, ...], output_filename: str | None):
+    """Combine the *_detailed.csv results of shard runs into one result set.
+
+    Judge usage and run metadata written next to each detailed file are merged
+    as well. Tests (same query and expected values) found in an earlier file
+    are only kept once.
+    """
+    results = []
+    seen = set()
+    duplicates = 0
+    usage_row_sets = []
+    shard_runs = []
+    for detailed_file in detailed_files:
+        file_ids = set()
+        for result in load_results_csv(detailed_file):
+            # Recomputed, so files from before the current test_id still match
+            result.test_id = compute_test_id(result.query, result.model_dump())
+            if result.test_id in seen:
+                duplicates += 1
+                continue
+            file_ids.add(result.test_id)
+            results.append(result)
+        seen |= file_ids
+
+        base = detailed_file.removesuffix("_detailed.csv")
+        if Path(f"{base}_judge_usage.csv").exists():
+            with open(f"{base}_judge_usage.csv", newline="", encoding="utf-8") as f:
+                usage_row_sets.append(list(csv.DictReader(f)))
+        if Path(f"{base}_run.json").exists():
+            with open(f"{base}_run.json", encoding="utf-8") as f:
+                shard_runs.append(json.load(f))
+
+    if duplicates:
+        print(
+            f"Warning: dropped {duplicates} tests found in more than one file "
+            "(same query and expected values)",
+        )
+    suite_hashes = {run.get("suite", {}).get("sha256") for run in shard_runs}
+    if len(suite_hashes) > 1:
+        print("Warning: shard results were produced from different test suites")
+
+    exporter = ResultExporter()
+    exporter.save_results_to_csv(results, output_filename)
+    exporter.save_judge_usage(merge_summary_rows(usage_row_sets), output_filename)
+    exporter.save_run_metadata(
+        {
+            "merged_from": list(detailed_files),
+            "suite": shard_runs[0].get("suite") if len(suite_hashes) == 1 else None,
+            "shards": [run.get("shard") for run in shard_runs],
+            "test_count": len(results),
+            "duration_seconds": max(
+                (run.get("duration_seconds", 0) for run in shard_runs),
+                default=None,
+            ),
+        },
+        output_filename,
+    )
+    summary = summarize_results(results)
+    exporter.save_summary_json(summary, output_filename)
+    print_summary(summary)
+
+
+@run_evals.command("rescore")
+@click.argument("detailed_file", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--states-dir",
+    default=None,
+    type=click.Path(exists=True, file_okay=False),
+    help="State archive of the run (default: the _states directory next to DETAILED_FILE)",
+)
+@click.option(
+    "--num-workers",
+    default=os.cpu_count() or 1,
+    type=int,
+    envvar="NUM_WORKERS",
+    help="Number of worker processes (can also be set via NUM_WORKERS env var)",
+)
+@click.option(
+    "--judge-backend",
+    default="anthropic",
+    envvar="JUDGE_BACKEND",
+    help="Judge backend spec as for a run; replay:PATH rescores without new judge calls (can also be set via JUDGE_BACKEND env var)",
+)
+@click.option(
+    "--judge-cache",
+    default=None,
+    envvar="JUDGE_CACHE",
+    help="Append every judge verdict to this JSONL file (can also be set via JUDGE_CACHE env var)",
+)
+@click.option(
+    "--clarification-heuristic/--no-clarification-heuristic",
+    default=False,
+    envvar="CLARIFICATION_HEURISTIC",
+    help="Decide clear clarification cases with a local heuristic (can also be set via CLARIFICATION_HEURISTIC env var)",
+)
+@click.option(
+    "--clarification-thresholds",
+    default="0.15,0.85",
+    envvar="CLARIFICATION_THRESHOLDS",
+    help="Heuristic thresholds 'lower,upper' (can also be set via CLARIFICATION_THRESHOLDS env var)",
+)
+@click.option(
+    "--aoi-index",
+    default=None,
+    envvar="AOI_INDEX",
+    help="AOI reference index file (can also be set via AOI_INDEX env var)",
+)
+@click.option(
+    "--output-filename",
+    default=None,
+    envvar="OUTPUT_FILENAME",
+    help="Custom filename for the rescored results (timestamp will be appended) (can also be set via OUTPUT_FILENAME env var)",
+)
+def rescore(
+    detailed_file: str,
+    states_dir: str | None,
+    num_workers: int,
+    judge_backend: str,
+    judge_cache: str | None,
+    clarification_heuristic: bool,
+    clarification_thresholds: str,
+    aoi_index: str | None,
+    output_filename: str | None,
+):
+    """Re-evaluate a run from its archived agent states, without calling the agent.
+
+    Writes the rescored results next to the original ones, plus a
+    *_score_diff.csv with every score that changed.
+    """
+    if num_workers < 1:
+        raise click.BadParameter("NUM_WORKERS must be >= 1")
+    base = detailed_file.removesuffix("_detailed.csv")
+    states_dir = states_dir or f"{base}_states"
+    if not Path(states_dir).is_dir():
+        raise click.ClickException(
+            f"No state archive at {states_dir}; was the run made with --archive-states?",
+        )
+
+    results = load_results_csv(detailed_file)
+    print(f"Rescoring {len(results)} tests with {num_workers} processes...")
+    start_time = time.time()
+    rescored = rescore_results(
+        results,
+        states_dir,
+        judge_backend=judge_backend,
+        judge_cache=judge_cache,
+        clarification_thresholds=(
+            _parse_thresholds(clarification_thresholds)
+            if clarification_heuristic
+            else None
+        ),
+        aoi_index=aoi_index,
+        num_workers=num_workers,
+    )
+    total_duration = time.time() - start_time
+    print(f"Rescored {len(rescored)} tests in {total_duration:.1f} seconds")
+
+    diff_rows = score_diff(results, rescored)
+    output_filename = output_filename or f"{Path(base).name}_rescored"
+    exporter = ResultExporter()
+    exporter.save_results_to_csv(rescored, output_filename)
+    exporter.save_score_diff(diff_rows, output_filename)
+    exporter.save_run_metadata(
+        {
+            "rescored_from": detailed_file,
+            "states_dir": str(states_dir),
+            "judge_backend": judge_backend,
+            "clarification_heuristic": list(_parse_thresholds(clarification_thresholds))
+            if clarification_heuristic
+            else None,
+            "test_count": len(rescored),
+            "changed_tests": len({row["thread_id"] for row in diff_rows}),
+            "duration_seconds": round(total_duration, 1),
+        },
+        output_filename,
+    )
+
+    before = sum(r.overall_score for r in results) / max(len(results), 1)
+    after = sum(r.overall_score for r in rescored) / max(len(rescored), 1)
+    print(f"\n{'=' * 50}")
+    print("RESCORE DIFF")
+    print(f"{'=' * 50}")
+    print(f"Average Score: {before:.2f} -> {after:.2f}")
+    for field in dict.fromkeys(row["score"] for row in diff_rows):
+        changed = [row for row in diff_rows if row["score"] == field]
+        print(f"{field}: {len(changed)} tests changed")
+    missing = sum(1 for r in rescored if r.error_type == "MissingState")
+    if missing:
+        print(f"Warning: {missing} tests have no archived agent state")
+
+
+@run_evals.command("diff")
+@click.argument("run_a")
+@click.argument("run_b")
+@click.option(
+    "--history-db",
+    default=None,
+    envvar="HISTORY_DB",
+    help="Run history database to look up run IDs in (default: outputs/history.sqlite) (can also be set via HISTORY_DB env var)",
+)
+@click.option(
+    "--bootstrap",
+    "n_boot",
+    default=1000,
+    type=int,
+    help="Bootstrap resamples for the confidence intervals",
+)
+@click.option(
+    "--alpha",
+    default=0.05,
+    type=float,
+    help="Two-sided significance level of the confidence intervals",
+)
+@click.option("--seed", default=0, type=int, help="Random seed of the bootstrap")
+@click.option(
+    "--output-filename",
+    default=None,
+    envvar="OUTPUT_FILENAME",
+    help="Custom filename for the diff (timestamp will be appended) (can also be set via OUTPUT_FILENAME env var)",
+)
+@click.pass_context
+def diff(
+    ctx: click.Context,
+    run_a: str,
+    run_b: str,
+    history_db: str | None,
+    n_boot: int,
+    alpha: float,
+    seed: int,
+    output_filename: str | None,
+):
+    """Compare run B against baseline run A and exit 1 on significant regressions.
+
+    RUN_A and RUN_B are result CSVs (*_detailed.csv or *_summary.csv) or run
+    IDs in the run history. Tests are joined by test_id; every score, the
+    pass rate (overall score >= 0.7) and each test group get a paired
+    bootstrap confidence interval of the delta.
+    """
+    if n_boot < 1:
+        raise click.BadParameter("BOOTSTRAP must be >= 1")
+    if not 0 < alpha < 1:
+        raise click.BadParameter("ALPHA must be between 0 and 1")
+    history_db = history_db or str(default_history_path())
+    try:
+        before = load_run(run_a, history_db)
+        after = load_run(run_b, history_db)
+    except ValueError as e:
+        raise click.ClickException(str(e)) from e
+
+    checks, flips = diff_runs(before, after, n_boot, alpha, seed)
+    paired = int(checks.loc[0, "n"]) if len(checks) else 0
+    print(f"\n{'=' * 50}")
+    print("RUN DIFF")
+    print(f"{'=' * 50}")
+    print(f"Baseline:  {run_a} ({len(before)} tests)")
+    print(f"Candidate: {run_b} ({len(after)} tests)")
+    print(f"Paired tests: {paired}")
+    for row in checks.itertuples():
+        if row.scope != "all" and not row.significant:
+            continue
+        marker = " REGRESSION" if row.regression else " *" if row.significant else ""
+        print(
+            f"{row.scope:<24} {row.check:<30} {row.before:.3f} -> {row.after:.3f} "
+            f"({row.delta:+.3f}, {1 - alpha:.0%} CI {row.ci_low:+.3f}..{row.ci_high:+.3f}){marker}",
+        )
+    regressed = int((flips["flip"] == "regressed").sum())
+    print(f"Flipped tests: {regressed} regressed, {len(flips) - regressed} fixed")
+
+    ResultExporter().save_run_diff(checks, flips, output_filename or "diff")
+
+    regressions = checks[(checks["scope"] == "all") & checks["regression"]]
+    if not regressions.empty:
+        print(
+            f"Significant regressions: {', '.join(regressions['check'])}",
+        )
+        ctx.exit(1)
+
+
+@run_evals.command("load")
+@click.option(
+    "--api-base-url",
+    default="https://api.staging.globalnaturewatch.org",
+    envvar="API_BASE_URL",
+    help="Base URL of the agent API (can also be set via API_BASE_URL env var)",
+)
+@click.option(
+    "--api-token",
+    default=None,
+    envvar="API_TOKEN",
+    help="API token for authentication (can also be set via API_TOKEN env var)",
+)
+@click.option(
+    "--test-file",
+    default="https://docs.google.com/spreadsheets/d/1_G1aq2fSCPqhT6w55_Od6VU7sov76t1lHQTBeZZxbdM/export?format=csv&gid=0",
+    envvar="TEST_FILE",
+    help="Test suite the queries are drawn from (can also be set via TEST_FILE env var)",
+)
+@click.option(
+    "--offline",
+    is_flag=True,
+    default=False,
+    envvar="OFFLINE",
+    help="Use the cached copy of a remote test file without revalidating it (can also be set via OFFLINE env var)",
+)
+@click.option(
+    "--test-file-cache-dir",
+    default=str(DEFAULT_CACHE_DIR),
+    envvar="TEST_FILE_CACHE_DIR",
+    help="Directory where remote test files are cached (can also be set via TEST_FILE_CACHE_DIR env var)",
+)
+@click.option(
+    "--test-group-filter",
+    default=None,
+    envvar="TEST_GROUP_FILTER",
+    help="Only draw queries of this test_group (can also be set via TEST_GROUP_FILTER env var)",
+)
+@click.option(
+    "--status-filter",
+    default=None,
+    envvar="STATUS_FILTER",
+    help="Only draw queries with these statuses (comma-separated) (can also be set via STATUS_FILTER env var)",
+)
+@click.option(
+    "--arrival-profile",
+    default="constant",
+    type=click.Choice(PROFILES),
+    help="Arrival rate profile: constant at --rate, or a linear ramp or --steps equal steps from --rate to --peak-rate",
+)
+@click.option("--rate", default=1.0, type=float, help="(Starting) arrivals per second")
+@click.option(
+    "--peak-rate",
+    default=None,
+    type=float,
+    help="Final arrivals per second of the ramp and step profiles",
+)
+@click.option("--steps", default=4, type=int, help="Rate steps of the step profile")
+@click.option(
+    "--duration",
+    default=60.0,
+    type=float,
+    help="Seconds to send requests for",
+)
+@click.option(
+    "--arrivals",
+    default="poisson",
+    type=click.Choice(["poisson", "uniform"]),
+    help="Exponential (Poisson) or evenly spaced gaps between arrivals",
+)
+@click.option(
+    "--max-in-flight",
+    default=None,
+    type=int,
+    help="Cap on concurrent conversations; requests over the cap wait and the wait counts as latency",
+)
+@click.option(
+    "--evaluate/--no-evaluate",
+    default=False,
+    help="Also evaluate every response (with the judge backend), instead of only timing the agent",
+)
+@click.option(
+    "--judge-backend",
+    default="anthropic",
+    envvar="JUDGE_BACKEND",
+    help="Judge backend spec as for a run, used with --evaluate (can also be set via JUDGE_BACKEND env var)",
+)
+@click.option("--window", default=10.0, type=float, help="Seconds per timeline window")
+@click.option(
+    "--seed",
+    default=0,
+    type=int,
+    help="Random seed of arrivals and query order",
+)
+@click.option(
+    "--output-filename",
+    default=None,
+    envvar="OUTPUT_FILENAME",
+    help="Custom filename (timestamp will be appended) (can also be set via OUTPUT_FILENAME env var)",
+)
+def load(
+    api_base_url: str,
+    api_token: str | None,
+    test_file: str,
+    offline: bool,
+    test_file_cache_dir: str,
+    test_group_filter: str | None,
+    status_filter: str | None,
+    arrival_profile: str,
+    rate: float,
+    peak_rate: float | None,
+    steps: int,
+    duration: float,
+    arrivals: str,
+    max_in_flight: int | None,
+    evaluate: bool,
+    judge_backend: str,
+    window: float,
+    seed: int,
+    output_filename: str | None,
+):
+    """Send conversations at a target arrival rate (open-loop) and report latency.
+
+    Latency is measured from each request's intended start time, so queueing
+    behind a slow agent is counted rather than hidden (coordinated-omission
+    correction). Writes every request to *_load.csv and the latency
+    percentiles and per-window timeline to *_load_summary.json.
+    """
     if not api_token:
         raise click.BadParameter(
             "API token is required. Provide --api-token or set API_TOKEN environment variable.",
         )
+    if rate <= 0 or (peak_rate is not None and peak_rate <= 0):
+        raise click.BadParameter("--rate and --peak-rate must be > 0")
+    if arrival_profile != "constant" and peak_rate is None:
+        raise click.BadParameter(f"The {arrival_profile} profile needs --peak-rate")
+    if duration <= 0 or window <= 0:
+        raise click.BadParameter("--duration and --window must be > 0")
+    if steps < 1:
+        raise click.BadParameter("--steps must be >= 1")
+    if max_in_flight is not None and max_in_flight < 1:
+        raise click.BadParameter("--max-in-flight must be >= 1")
 
-    # Validate inputs
-    if sample_size < -1:
-        raise click.BadParameter("SAMPLE_SIZE must be >= -1")
-    if num_workers < 1:
-        raise click.BadParameter("NUM_WORKERS must be >= 1")
+    loader = SuiteLoader(
+        cache=RemoteFileCache(test_file_cache_dir, offline=offline),
+    )
+    test_cases = loader.load_test_data(
+        test_file,
+        -1,
+        test_group_filter,
+        [s.strip() for s in status_filter.split(",") if s.strip()]
+        if status_filter
+        else None,
+        0,
+        0,
+    )
+    if not test_cases:
+        raise click.ClickException("No test cases to draw queries from")
 
-    # Parse status_filter from comma-separated string to list
-    status_filter_list = None
-    if status_filter:
-        status_filter_list = [s.strip() for s in status_filter.split(",") if s.strip()]
-
-    # Create a simple config object
-    class Config:
-        def __init__(self):
-            self.api_base_url = api_base_url
-            self.api_token = api_token
-            self.sample_size = sample_size
-            self.test_file = test_file
-            self.test_group_filter = test_group_filter
-            self.status_filter = status_filter_list
-            self.output_filename = output_filename
-            self.num_workers = num_workers
-            self.random_seed = random_seed
-            self.offset = offset
-
-    config = Config()
-    results = asyncio.run(run_csv_tests(config))
-    assert len(results) > 0, "No test results from CSV"
+    schedule = arrival_times(
+        arrival_profile,
+        rate,
+        duration,
+        peak_rate=peak_rate,
+        steps=steps,
+        poisson=arrivals == "poisson",
+        seed=seed,
+    )
+    runner = APITestRunner(
+        api_base_url=api_base_url,
+        api_token=api_token,
+        judge_backend=create_judge_backend(judge_backend) if evaluate else None,
+    )
+    profile_label = (
+        f"{rate:g} req/s"
+        if arrival_profile == "constant"
+        else f"{arrival_profile} {rate:g} -> {peak_rate:g} req/s"
+    )
+    print(
+        f"Sending {len(schedule)} conversations over {duration:g}s ({profile_label}, "
+        f"{arrivals} arrivals) drawn from {len(test_cases)} queries to {api_base_url}...",
+    )
+
+    records = asyncio.run(
+        run_load(runner, test_cases, schedule, evaluate, max_in_flight, seed),
+    )
+    summary = summarize_load(records, duration, window)
+    summary["profile"] = {
+        "profile": arrival_profile,
+        "rate": rate,
+        "peak_rate": peak_rate,
+        "steps": steps,
+        "duration": duration,
+        "arrivals": arrivals,
+        "max_in_flight": max_in_flight,
+        "evaluate": evaluate,
+    }
+    ResultExporter().save_load_results(records, summary, output_filename or "load")
+    _print_load_summary(summary)
+
+
+def _print_load_summary(summary: dict) -> None:
+    """Print the latency and throughput of a load run."""
+    if not summary["requests"]:
+        return
+
+    def row(label: str, stats: dict) -> str:
+        return f"{label:<22}" + " ".join(
+            f"{k} {'-' if v is None else f'{v:.2f}s'}" for k, v in stats.items()
+        )
+
+    print(f"\n{'=' * 50}")
+    print("LOAD TEST SUMMARY")
+    print(f"{'=' * 50}")
+    print(
+        f"Requests: {summary['requests']} ({summary['errors']} errors, "
+        f"{summary['error_rate']:.1%})",
+    )
+    print(
+        f"Offered: {summary['offered_per_s']:.2f} req/s | "
+        f"Completed: {summary['completed_per_s']:.2f} req/s",
+    )
+    print(row("Latency (corrected):", summary["latency_seconds"]))
+    print(row("Service time:", summary["service_seconds"]))
+    print(row("Dispatch lag:", summary["dispatch_lag_seconds"]))
+    print(
+        f"\n{'Window':>8} {'Offered/s':>10} {'Done/s':>8} {'Errors':>7} {'p50':>7} {'p99':>7}",
+    )
+    for w in summary["timeline"]:
+        error_rate = "-" if w["error_rate"] is None else f"{w['error_rate']:.1%}"
+        p50, p99 = (
+            "-" if w[k] is None else f"{w[k]:.1f}s"
+            for k in ("latency_p50", "latency_p99")
+        )
+        print(
+            f"{w['start_s']:>7g}s {w['offered_per_s']:>10.2f} {w['completed_per_s']:>8.2f} "
+            f"{error_rate:>7} {p50:>7} {p99:>7}",
+        )
 
 
 if __name__ == "__main__":
@@ -1,6 +1,24 @@
 """Data handling for E2E testing framework."""
 
-from .csv_loader import CSVLoader
-from .result_exporter import ResultExporter
+from .aoi_index import AOIIndex
+from .history import RunHistory
+from .remote_cache import RemoteFileCache
+from .result_exporter import ResultExporter, load_results_csv
+from .sharding import Shard, compute_test_id, load_durations
+from .state_archive import StateArchive
+from .suite_loader import CSVLoader, SuiteLoader, detect_suite_format
 
-__all__ = ["CSVLoader", "ResultExporter"]
+__all__ = [
+    "AOIIndex",
+    "CSVLoader",
+    "RemoteFileCache",
+    "ResultExporter",
+    "RunHistory",
+    "Shard",
+    "StateArchive",
+    "SuiteLoader",
+    "compute_test_id",
+    "detect_suite_format",
+    "load_durations",
+    "load_results_csv",
+]
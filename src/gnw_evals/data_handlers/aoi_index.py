@@ -0,0 +1,170 @@
+"""Local AOI reference index for validating and matching expected AOI IDs.
+
+The index is loaded from an ID file (GADM, KBA, WDPA, ... IDs) and keeps the
+normalized IDs in a frozenset for constant time membership, plus a sorted
+tuple per source for prefix (child) lookups. GADM IDs encode their hierarchy
+("IND.26.3_1" is a district of the state "IND.26" of the country "IND"), so
+parents, children and admin levels are derived from the ID itself.
+
+Supported files (optionally gzipped):
+- CSV with a ``src_id`` column and optional ``source`` and ``name`` columns
+- Plain text with one GADM ID per line
+"""
+
+import bisect
+import csv
+import difflib
+import gzip
+import io
+from pathlib import Path
+
+from gnw_evals.evaluators.utils import SUBREGION_LEVELS, normalize_gadm_id
+
+# Subregions that are not GADM admin levels
+OTHER_SUBREGIONS = {"kba", "wdpa", "landmark"}
+# Relations of a selected AOI to an expected one, best first
+RELATION_ORDER = ["exact", "child", "parent", "unrelated", "unknown"]
+
+
+def normalize_aoi_id(aoi_id: str, source: str = "gadm") -> str:
+    """Normalize an AOI ID the way the AOI evaluator compares it."""
+    if source == "gadm":
+        return normalize_gadm_id(aoi_id)
+    return aoi_id.strip().lower()
+
+
+def gadm_level(aoi_id: str) -> int:
+    """Return the GADM admin level of an ID (0 for countries)."""
+    return normalize_gadm_id(aoi_id).count(".")
+
+
+def gadm_ancestors(aoi_id: str) -> list[str]:
+    """Return the normalized GADM ancestors of an ID, nearest first."""
+    parts = normalize_gadm_id(aoi_id).split(".")
+    return [".".join(parts[:i]) for i in range(len(parts) - 1, 0, -1)]
+
+
+class AOIIndex:
+    """Set of known AOI IDs with hierarchy-aware lookups."""
+
+    def __init__(self, ids_by_source: dict[str, list[str]]):
+        """Initialize from raw IDs grouped by source.
+
+        Args:
+            ids_by_source: AOI IDs per source, e.g. {"gadm": ["BRA", "BRA.1_1"]}
+
+        """
+        # Original spelling of each normalized ID, used in suggestions
+        self._raw = {
+            normalize_aoi_id(i, source): i.strip()
+            for source, ids in ids_by_source.items()
+            for i in ids
+        }
+        self._sorted = {
+            source: tuple(sorted({normalize_aoi_id(i, source) for i in ids}))
+            for source, ids in ids_by_source.items()
+        }
+        self._ids = frozenset(i for ids in self._sorted.values() for i in ids)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "AOIIndex":
+        """Load an index from a CSV or plain text ID file."""
+        path = Path(path)
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="utf-8", newline="") as f:
+            text = f.read()
+
+        ids_by_source: dict[str, list[str]] = {}
+        first_line = text.split("\n", 1)[0]
+        if "src_id" in first_line:
+            for row in csv.DictReader(io.StringIO(text)):
+                source = (row.get("source") or "gadm").strip().lower()
+                ids_by_source.setdefault(source, []).append(row["src_id"])
+        else:
+            ids_by_source["gadm"] = [line for line in text.splitlines() if line.strip()]
+        return cls(ids_by_source)
+
+    def __len__(self) -> int:
+        """Return the number of known IDs."""
+        return len(self._ids)
+
+    def __contains__(self, aoi_id: str) -> bool:
+        """Whether an ID is known, under GADM or any other source."""
+        return (
+            normalize_gadm_id(aoi_id) in self._ids
+            or aoi_id.strip().lower() in self._ids
+        )
+
+    def children(self, aoi_id: str) -> list[str]:
+        """Return the known GADM IDs one admin level below an ID."""
+        prefix = f"{normalize_gadm_id(aoi_id)}."
+        ids = self._sorted.get("gadm", ())
+        start = bisect.bisect_left(ids, prefix)
+        end = bisect.bisect_left(ids, f"{prefix}\uffff")
+        return [i for i in ids[start:end] if "." not in i[len(prefix) :]]
+
+    def suggest(self, aoi_id: str, limit: int = 3) -> list[str]:
+        """Return known IDs that look like a mistyped ID."""
+        normalized = normalize_gadm_id(aoi_id)
+        # Siblings and the parent are the most likely intended IDs
+        parent = gadm_ancestors(aoi_id)[:1]
+        if parent:
+            candidates = [*self.children(parent[0]), *parent]
+        else:
+            candidates = [i for i in self._sorted.get("gadm", ()) if "." not in i]
+        matches = difflib.get_close_matches(normalized, candidates, n=limit)
+        return [self._raw.get(match, match) for match in matches]
+
+    def relation(self, expected_id: str, actual_id: str) -> str:
+        """Return how a selected AOI relates to an expected one.
+
+        Returns:
+            "exact", "child" (the actual AOI lies within the expected one),
+            "parent" (the actual AOI contains the expected one), "unrelated",
+            or "unknown" if the actual AOI is not in the index
+
+        """
+        if actual_id not in self:
+            return "unknown"
+        expected = normalize_gadm_id(expected_id)
+        actual = normalize_gadm_id(actual_id)
+        if actual == expected:
+            return "exact"
+        if actual.startswith(f"{expected}."):
+            return "child"
+        if expected.startswith(f"{actual}."):
+            return "parent"
+        return "unrelated"
+
+    def best_relation(self, expected_id: str, actual_ids: list[str]) -> str:
+        """Return the closest relation of any selected AOI to an expected one."""
+        relations = {self.relation(expected_id, actual_id) for actual_id in actual_ids}
+        return min(relations, key=RELATION_ORDER.index, default="unrelated")
+
+    def validate_subregion(self, aoi_ids: list[str], subregion: str) -> str | None:
+        """Return a problem with an expected subregion for these AOIs, if any."""
+        subregion = subregion.strip().lower()
+        if not subregion or subregion in OTHER_SUBREGIONS:
+            return None
+        if subregion not in SUBREGION_LEVELS:
+            return f"unknown expected_subregion '{subregion}'"
+        level = SUBREGION_LEVELS[subregion]
+        too_deep = [i for i in aoi_ids if i in self and gadm_level(i) >= level]
+        if too_deep:
+            return (
+                f"expected_subregion '{subregion}' is not below the admin level "
+                f"of {', '.join(too_deep)}"
+            )
+        return None
+
+    def validate(self, aoi_ids: list[str]) -> list[str]:
+        """Return error messages for expected AOI IDs missing from the index."""
+        errors = []
+        for aoi_id in aoi_ids:
+            if aoi_id not in self:
+                suggestions = self.suggest(aoi_id)
+                hint = (
+                    f" (did you mean {', '.join(suggestions)}?)" if suggestions else ""
+                )
+                errors.append(f"unknown AOI ID '{aoi_id}'{hint}")
+        return errors
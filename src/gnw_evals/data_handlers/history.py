@@ -0,0 +1,210 @@
+"""Local run history store.
+
+Every run is also written to a SQLite database (``outputs/history.sqlite`` by
+default) with one row per test result, indexed by the stable ``test_id``,
+run, environment and test group. Cross-run questions such as the score
+history of a test or the runs of an environment are then single indexed
+queries instead of re-parsing the CSVs of every run.
+"""
+
+import json
+import sqlite3
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from gnw_evals.data_handlers.sharding import compute_test_id
+from gnw_evals.utils.eval_types import SCORE_FIELDS, TestResult
+
+# Result columns stored besides the scores, with their SQLite types
+RESULT_COLUMNS = {
+    "test_id": "TEXT NOT NULL",
+    "query": "TEXT",
+    "test_group": "TEXT",
+    "thread_id": "TEXT",
+    "duration_seconds": "REAL",
+    "error": "TEXT",
+}
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    environment TEXT,
+    test_file TEXT,
+    suite_sha256 TEXT,
+    test_count INTEGER,
+    metadata TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id TEXT NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    {", ".join(f"{column} {kind}" for column, kind in RESULT_COLUMNS.items())},
+    {", ".join(f"{field} REAL" for field in SCORE_FIELDS)}
+);
+CREATE INDEX IF NOT EXISTS results_test ON results (test_id, run_id);
+CREATE INDEX IF NOT EXISTS results_run ON results (run_id);
+CREATE INDEX IF NOT EXISTS results_group ON results (test_group, run_id);
+CREATE INDEX IF NOT EXISTS runs_environment ON runs (environment, started_at);
+"""
+
+
+class RunHistory:
+    """SQLite store of the results of all runs."""
+
+    def __init__(self, path: str | Path):
+        """Open (and create if needed) the history database.
+
+        Args:
+            path: Path of the SQLite database file
+
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection that commits on success and is always closed."""
+        connection = sqlite3.connect(self.path)
+        try:
+            connection.execute("PRAGMA foreign_keys = ON")
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def record_run(
+        self,
+        run_id: str,
+        started_at: str,
+        results: list[TestResult],
+        metadata: dict[str, Any] | None = None,
+        environment: str | None = None,
+    ) -> None:
+        """Store the results of a run, replacing an earlier run with the same ID.
+
+        Args:
+            run_id: Unique run ID (the timestamped base filename of the run)
+            started_at: ISO timestamp of the run, used to order runs
+            results: Results of the run
+            metadata: Run metadata as written to ``*_run.json`` (optional)
+            environment: Environment the run targeted, e.g. the API base URL
+                (optional)
+
+        """
+        metadata = metadata or {}
+        rows = [
+            (
+                run_id,
+                result.test_id or compute_test_id(result.query, result.model_dump()),
+                *(getattr(result, column) for column in list(RESULT_COLUMNS)[1:]),
+                *(getattr(result, field) for field in SCORE_FIELDS),
+            )
+            for result in results
+        ]
+        placeholders = ", ".join("?" * (1 + len(RESULT_COLUMNS) + len(SCORE_FIELDS)))
+        with self._connect() as connection:
+            connection.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+            connection.execute(
+                "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    run_id,
+                    started_at,
+                    environment,
+                    metadata.get("test_file"),
+                    (metadata.get("suite") or {}).get("sha256"),
+                    len(results),
+                    json.dumps(metadata, default=str),
+                ),
+            )
+            connection.executemany(
+                f"INSERT INTO results VALUES ({placeholders})",
+                rows,
+            )
+
+    def runs(self, environment: str | None = None) -> pd.DataFrame:
+        """Return the stored runs, oldest first."""
+        query = (
+            "SELECT run_id, started_at, environment, test_file, suite_sha256, "
+            "test_count FROM runs"
+        )
+        params: list[Any] = []
+        if environment is not None:
+            query += " WHERE environment = ?"
+            params.append(environment)
+        with self._connect() as connection:
+            return pd.read_sql_query(
+                f"{query} ORDER BY started_at, run_id",
+                connection,
+                params=params,
+            )
+
+    def run_results(self, run_id: str) -> pd.DataFrame:
+        """Return all stored results of one run."""
+        with self._connect() as connection:
+            return pd.read_sql_query(
+                "SELECT * FROM results WHERE run_id = ?",
+                connection,
+                params=[run_id],
+            )
+
+    def score_history(
+        self,
+        test_ids: list[str] | None = None,
+        test_group: str | None = None,
+        environment: str | None = None,
+        score: str = "overall_score",
+        last_runs: int | None = None,
+    ) -> pd.DataFrame:
+        """Return the score time series of tests across runs.
+
+        Args:
+            test_ids: Only these tests (optional, all tests otherwise)
+            test_group: Only tests of this test group (optional)
+            environment: Only runs against this environment (optional)
+            score: Score column to return (one of SCORE_FIELDS)
+            last_runs: Only the most recent N matching runs (optional)
+
+        Returns:
+            Frame with test_id, test_group, run_id, started_at and the score,
+            ordered by test and run time
+
+        """
+        if score not in SCORE_FIELDS:
+            raise ValueError(f"Unknown score column: {score}")
+
+        conditions = []
+        params: list[Any] = []
+        if test_ids is not None:
+            conditions.append(f"r.test_id IN ({', '.join('?' * len(test_ids))})")
+            params.extend(test_ids)
+        if test_group is not None:
+            conditions.append("r.test_group = ?")
+            params.append(test_group)
+        if environment is not None:
+            conditions.append("runs.environment = ?")
+            params.append(environment)
+        if last_runs is not None:
+            recent = "SELECT run_id FROM runs"
+            if environment is not None:
+                recent += " WHERE environment = ?"
+                params.append(environment)
+            conditions.append(
+                f"r.run_id IN ({recent} ORDER BY started_at DESC LIMIT ?)",
+            )
+            params.append(last_runs)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._connect() as connection:
+            return pd.read_sql_query(
+                f"SELECT r.test_id, r.test_group, r.run_id, runs.started_at, "
+                f"r.{score} AS {score} "
+                f"FROM results r JOIN runs USING (run_id) {where} "
+                f"ORDER BY r.test_id, runs.started_at",
+                connection,
+                params=params,
+            )
@@ -0,0 +1,194 @@
+"""Local cache for remote test files.
+
+Remote test sheets (e.g. Google Sheets CSV exports) are stored on disk keyed by
+URL, together with their ETag/Last-Modified validators. Later runs revalidate
+the cached copy with a conditional request and only download the body again if
+it changed. In offline mode the cached copy is used without any request.
+"""
+
+import hashlib
+import json
+import os
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "gnw_evals" / "test_files"
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+class RemoteFileCache:
+    """Caches remote test files with conditional revalidation."""
+
+    def __init__(
+        self,
+        cache_dir: str | Path = DEFAULT_CACHE_DIR,
+        offline: bool = False,
+        transport: httpx.BaseTransport | httpx.AsyncBaseTransport | None = None,
+    ):
+        """Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding cached bodies and their metadata
+            offline: Use cached copies without revalidating them
+            transport: Optional httpx transport, e.g. for tests
+
+        """
+        self.cache_dir = Path(cache_dir)
+        self.offline = offline
+        self.transport = transport
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        """Return the body and metadata paths of a cached URL."""
+        key = hashlib.sha256(url.encode()).hexdigest()[:32]
+        return self.cache_dir / f"{key}.body", self.cache_dir / f"{key}.json"
+
+    def _cached_metadata(self, url: str) -> dict[str, Any] | None:
+        """Return the metadata of a cached URL, or None if it is not cached."""
+        body_path, meta_path = self._paths(url)
+        if body_path.exists() and meta_path.exists():
+            return json.loads(meta_path.read_text(encoding="utf-8"))
+        if self.offline:
+            raise FileNotFoundError(f"Offline mode: no cached copy of {url}")
+        return None
+
+    @staticmethod
+    def _conditional_headers(metadata: dict[str, Any] | None) -> dict[str, str]:
+        """Return revalidation headers for a cached copy."""
+        headers = {}
+        if metadata is not None:
+            if metadata.get("etag"):
+                headers["If-None-Match"] = metadata["etag"]
+            if metadata.get("last_modified"):
+                headers["If-Modified-Since"] = metadata["last_modified"]
+        return headers
+
+    def fetch(self, url: str) -> tuple[bytes, dict[str, Any]]:
+        """Return the content of a remote test file, using the cache if possible.
+
+        Args:
+            url: URL of the test file
+
+        Returns:
+            File content and metadata (url, sha256, etag, last_modified,
+            fetched_at and source: "network", "revalidated", "cache" or
+            "stale-cache" when the server could not be reached)
+
+        """
+        body_path, meta_path = self._paths(url)
+        metadata = self._cached_metadata(url)
+        if self.offline:
+            return body_path.read_bytes(), {**metadata, "source": "cache"}
+
+        try:
+            with httpx.Client(
+                transport=self.transport,
+                follow_redirects=True,
+                timeout=60.0,
+            ) as client:
+                response = client.get(url, headers=self._conditional_headers(metadata))
+                if response.status_code != 304:
+                    response.raise_for_status()
+        except httpx.HTTPError as e:
+            if metadata is None:
+                raise
+            print(f"Warning: could not revalidate {url} ({e}), using cached copy")
+            return body_path.read_bytes(), {**metadata, "source": "stale-cache"}
+
+        if response.status_code == 304 and metadata is not None:
+            return body_path.read_bytes(), {**metadata, "source": "revalidated"}
+
+        content = response.content
+        metadata = self._metadata(url, response, hashlib.sha256(content).hexdigest())
+        self._store(body_path, content)
+        self._store(meta_path, json.dumps(metadata, indent=2).encode())
+        return content, {**metadata, "source": "network"}
+
+    async def aiter_bytes(
+        self,
+        url: str,
+        info: dict[str, Any],
+    ) -> AsyncIterator[bytes]:
+        """Stream a remote test file, filling the cache while it downloads.
+
+        Args:
+            url: URL of the test file
+            info: Filled with the metadata returned by ``fetch`` once the
+                stream has been consumed
+
+        Yields:
+            Chunks of the file content
+
+        """
+        body_path, meta_path = self._paths(url)
+        metadata = self._cached_metadata(url)
+        source = "cache"
+
+        if not self.offline:
+            yielded = False
+            try:
+                async with (
+                    httpx.AsyncClient(
+                        transport=self.transport,
+                        follow_redirects=True,
+                        timeout=60.0,
+                    ) as client,
+                    client.stream(
+                        "GET",
+                        url,
+                        headers=self._conditional_headers(metadata),
+                    ) as response,
+                ):
+                    if response.status_code == 304 and metadata is not None:
+                        source = "revalidated"
+                    else:
+                        response.raise_for_status()
+                        digest = hashlib.sha256()
+                        self.cache_dir.mkdir(parents=True, exist_ok=True)
+                        tmp_path = body_path.with_name(
+                            f"{body_path.name}.{os.getpid()}.tmp",
+                        )
+                        with open(tmp_path, "wb") as f:
+                            async for chunk in response.aiter_bytes():
+                                digest.update(chunk)
+                                f.write(chunk)
+                                yielded = True
+                                yield chunk
+                        os.replace(tmp_path, body_path)
+
+                        metadata = self._metadata(url, response, digest.hexdigest())
+                        self._store(meta_path, json.dumps(metadata, indent=2).encode())
+                        info.update(metadata, source="network")
+                        return
+            except httpx.HTTPError as e:
+                # Falling back mid-stream would yield rows twice
+                if metadata is None or yielded:
+                    raise
+                print(f"Warning: could not revalidate {url} ({e}), using cached copy")
+                source = "stale-cache"
+
+        with open(body_path, "rb") as f:
+            while chunk := f.read(STREAM_CHUNK_BYTES):
+                yield chunk
+        info.update(metadata, source=source)
+
+    @staticmethod
+    def _metadata(url: str, response: httpx.Response, sha256: str) -> dict[str, Any]:
+        """Build cache metadata for a downloaded body."""
+        return {
+            "url": url,
+            "sha256": sha256,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": datetime.now(UTC).isoformat(),
+        }
+
+    def _store(self, path: Path, content: bytes) -> None:
+        """Write a file atomically so concurrent runs never read a partial body."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(content)
+        os.replace(tmp_path, path)
@@ -1,17 +1,73 @@
 """Result export functionality for E2E testing framework."""
 
+import ast
 import csv
+import json
 from datetime import datetime
 from pathlib import Path
+from typing import Any
 
+import pandas as pd
+
+from gnw_evals.data_handlers.history import RunHistory
 from gnw_evals.utils.eval_types import TestResult
 
+OUTPUT_DIR = Path(__file__).parent.parent.parent.parent / "outputs"
+HISTORY_FILENAME = "history.sqlite"
+
+
+def default_history_path() -> Path:
+    """Return the default run history database in the outputs directory."""
+    return OUTPUT_DIR / HISTORY_FILENAME
+
+
+def load_results_csv(path: str | Path) -> list[TestResult]:
+    """Load test results back from a detailed results CSV (e.g. of a shard run).
+
+    Args:
+        path: Path to a ``*_detailed.csv`` file
+
+    Returns:
+        List of test results
+
+    """
+    results = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            # Empty cells were None (or empty strings) before export
+            record = {k: v for k, v in row.items() if v != ""}
+            for column in ("expected_aoi_ids", "node_seconds"):
+                if column in record:
+                    record[column] = ast.literal_eval(record[column])
+            results.append(TestResult.model_validate(record))
+    return results
+
 
 class ResultExporter:
-    """Handles exporting test results to CSV files."""
+    """Handles exporting test results to CSV files.
+
+    All files written by one exporter share the timestamp taken when it was
+    created, so the artifacts of a run can be matched by their base filename.
+    """
+
+    def __init__(self):
+        """Initialize with the run timestamp."""
+        self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    def base_filename(self, filename: str | None = None) -> str:
+        """Return the timestamped base filename for this run's output files."""
+        if not filename:
+            return f"simple_e2e_{self.timestamp}"
+        # Remove .csv extension if present and append timestamp
+        clean_filename = filename.replace(".csv", "")
+        return f"{clean_filename}_{self.timestamp}"
+
+    def states_dir(self, filename: str | None = None) -> Path:
+        """Return the directory of this run's agent state archive."""
+        return OUTPUT_DIR / f"{self.base_filename(filename)}_states"
 
-    @staticmethod
     def save_results_to_csv(
+        self,
         results: list[TestResult],
         filename: str | None = None,
     ) -> str:
@@ -29,21 +85,15 @@ class ResultExporter:
             return ""
 
         # Always append timestamp to filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        base_filename = self.base_filename(filename)
 
-        if not filename:
-            base_filename = f"simple_e2e_{timestamp}"
-        else:
-            # Remove .csv extension if present and append timestamp
-            clean_filename = filename.replace(".csv", "")
-            base_filename = f"{clean_filename}_{timestamp}"
-
-        output_dir = Path(__file__).parent.parent.parent.parent / "outputs"
+        output_dir = OUTPUT_DIR
         output_dir.mkdir(exist_ok=True)
 
         # 1. Summary CSV - just query and scores
         summary_fields = [
             "query",
+            "test_id",
             "overall_score",
             "aoi_id_match_score",
             "subregion_match_score",
@@ -55,6 +105,7 @@ class ResultExporter:
             "agent_answer_score",
             "clarification_requested_score",
             "execution_time",
+            "duration_seconds",
             "error",
             "trace_url",
         ]
@@ -74,11 +125,14 @@ class ResultExporter:
         detailed_fields = [
             # Basic info
             "query",
+            "test_id",
             "thread_id",
             "trace_id",
             "trace_url",
             "overall_score",
             "execution_time",
+            "duration_seconds",
+            "state_sha256",
             # AOI: Expected vs Actual
             "expected_aoi_ids",
             "actual_id",
@@ -89,6 +143,7 @@ class ResultExporter:
             "actual_subregion",
             "subregion_match_score",
             "match_subregion",
+            "aoi_relation",
             "actual_subtype",
             "expected_aoi_source",
             "actual_source",
@@ -117,12 +172,17 @@ class ResultExporter:
             "charts_answer_score",
             "actual_agent_answer",
             "agent_answer_score",
+            "charts_answer_confidence",
+            "agent_answer_confidence",
             # Clarification: Expected vs Actual
             "expected_clarification",
             "clarification_requested_score",
             # Metadata
             "test_group",
+            "source",
             "error",
+            "error_type",
+            "node_seconds",
         ]
 
         detailed_filename = f"{base_filename}_detailed.csv"
@@ -143,3 +203,272 @@ class ResultExporter:
         print(f"Summary results saved to: {summary_filename}")
         print(f"Detailed results saved to: {detailed_filename}")
         return summary_filename
+
+    def save_judge_usage(
+        self,
+        usage_rows: list[dict[str, Any]],
+        filename: str | None = None,
+    ) -> str:
+        """Save aggregated judge usage (per evaluator and test group) to CSV.
+
+        Args:
+            usage_rows: Rows from JudgeUsageTracker.summary_rows()
+            filename: Base filename (optional)
+
+        Returns:
+            Path to judge usage CSV file
+
+        """
+        if not usage_rows:
+            return ""
+
+        OUTPUT_DIR.mkdir(exist_ok=True)
+        usage_filename = f"{self.base_filename(filename)}_judge_usage.csv"
+        with open(
+            OUTPUT_DIR / usage_filename,
+            "w",
+            newline="",
+            encoding="utf-8",
+        ) as f:
+            writer = csv.DictWriter(f, fieldnames=list(usage_rows[0]))
+            writer.writeheader()
+            writer.writerows(usage_rows)
+
+        print(f"Judge usage saved to: {usage_filename}")
+        return usage_filename
+
+    def save_score_diff(
+        self,
+        diff_rows: list[dict[str, Any]],
+        filename: str | None = None,
+    ) -> str:
+        """Save changed scores between two result sets to CSV.
+
+        Args:
+            diff_rows: Rows with query, test_id, thread_id, score, before, after
+            filename: Base filename (optional)
+
+        Returns:
+            Path to score diff CSV file
+
+        """
+        OUTPUT_DIR.mkdir(exist_ok=True)
+        diff_filename = f"{self.base_filename(filename)}_score_diff.csv"
+        with open(
+            OUTPUT_DIR / diff_filename,
+            "w",
+            newline="",
+            encoding="utf-8",
+        ) as f:
+            writer = csv.DictWriter(
+                f,
+                fieldnames=[
+                    "query",
+                    "test_id",
+                    "thread_id",
+                    "score",
+                    "before",
+                    "after",
+                ],
+            )
+            writer.writeheader()
+            writer.writerows(diff_rows)
+
+        print(f"Score diff saved to: {diff_filename}")
+        return diff_filename
+
+    def save_run_diff(
+        self,
+        checks: pd.DataFrame,
+        flips: pd.DataFrame,
+        filename: str | None = None,
+    ) -> str:
+        """Save a run-over-run diff: per-check deltas and flipped tests.
+
+        Args:
+            checks: Per-check and per-test-group deltas from diff_runs
+            flips: Tests that flipped between pass and fail
+            filename: Base filename (optional)
+
+        Returns:
+            Path to the per-check diff CSV file
+
+        """
+        OUTPUT_DIR.mkdir(exist_ok=True)
+        base_filename = self.base_filename(filename)
+        checks.to_csv(OUTPUT_DIR / f"{base_filename}_diff.csv", index=False)
+        flips.to_csv(OUTPUT_DIR / f"{base_filename}_flips.csv", index=False)
+
+        print(f"Diff saved to: {base_filename}_diff.csv")
+        print(f"Flipped tests saved to: {base_filename}_flips.csv")
+        return f"{base_filename}_diff.csv"
+
+    def save_to_history(
+        self,
+        results: list[TestResult],
+        metadata: dict[str, Any],
+        filename: str | None = None,
+        environment: str | None = None,
+        history_path: str | Path | None = None,
+    ) -> str:
+        """Record the run in the run history store.
+
+        Args:
+            results: List of test results
+            metadata: Run metadata (as saved by save_run_metadata)
+            filename: Base filename (optional); the timestamped base filename
+                is the run ID
+            environment: Environment the run targeted (optional)
+            history_path: History database (optional, outputs/history.sqlite
+                by default)
+
+        Returns:
+            Run ID
+
+        """
+        run_id = self.base_filename(filename)
+        started_at = datetime.strptime(self.timestamp, "%Y%m%d_%H%M%S")
+        RunHistory(history_path or default_history_path()).record_run(
+            run_id,
+            started_at.isoformat(),
+            results,
+            metadata,
+            environment,
+        )
+        print(f"Run recorded in history as: {run_id}")
+        return run_id
+
+    def save_summary_json(
+        self,
+        summary: dict[str, Any],
+        filename: str | None = None,
+    ) -> str:
+        """Save the run summary statistics to JSON.
+
+        Args:
+            summary: Summary from summarize_results
+            filename: Base filename (optional)
+
+        Returns:
+            Path to summary JSON file
+
+        """
+        OUTPUT_DIR.mkdir(exist_ok=True)
+        summary_filename = f"{self.base_filename(filename)}_summary.json"
+        with open(OUTPUT_DIR / summary_filename, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+        print(f"Summary statistics saved to: {summary_filename}")
+        return summary_filename
+
+    def save_trace(
+        self,
+        events: list[dict[str, Any]],
+        filename: str | None = None,
+    ) -> str:
+        """Save the spans of a run as a Chrome/Perfetto trace JSON.
+
+        Args:
+            events: Trace events recorded by the tracer
+            filename: Base filename (optional)
+
+        Returns:
+            Path to trace JSON file
+
+        """
+        OUTPUT_DIR.mkdir(exist_ok=True)
+        trace_filename = f"{self.base_filename(filename)}_trace.json"
+        with open(OUTPUT_DIR / trace_filename, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+        print(f"Trace saved to: {trace_filename} (open in https://ui.perfetto.dev)")
+        return trace_filename
+
+    def save_profile(
+        self,
+        folded_stacks: list[str],
+        allocation_report: list[str],
+        filename: str | None = None,
+    ) -> str:
+        """Save the harness profile: folded stacks and the allocation report.
+
+        Args:
+            folded_stacks: "frame;frame;... count" lines of the sampled stacks
+            allocation_report: Lines of the tracemalloc snapshot report
+            filename: Base filename (optional)
+
+        Returns:
+            Path to the folded stacks file
+
+        """
+        OUTPUT_DIR.mkdir(exist_ok=True)
+        base_filename = self.base_filename(filename)
+        (OUTPUT_DIR / f"{base_filename}_profile.folded").write_text(
+            "\n".join(folded_stacks) + "\n",
+            encoding="utf-8",
+        )
+        (OUTPUT_DIR / f"{base_filename}_allocations.txt").write_text(
+            "\n".join(allocation_report),
+            encoding="utf-8",
+        )
+
+        print(f"Profile saved to: {base_filename}_profile.folded")
+        print(f"Allocation report saved to: {base_filename}_allocations.txt")
+        return f"{base_filename}_profile.folded"
+
+    def save_load_results(
+        self,
+        records: list[dict[str, Any]],
+        summary: dict[str, Any],
+        filename: str | None = None,
+    ) -> str:
+        """Save the requests and summary of a load run.
+
+        Args:
+            records: One row per request, from run_load
+            summary: Summary from summarize_load
+            filename: Base filename (optional)
+
+        Returns:
+            Path to the load requests CSV file
+
+        """
+        OUTPUT_DIR.mkdir(exist_ok=True)
+        base_filename = self.base_filename(filename)
+        pd.DataFrame.from_records(records).to_csv(
+            OUTPUT_DIR / f"{base_filename}_load.csv",
+            index=False,
+        )
+        with open(
+            OUTPUT_DIR / f"{base_filename}_load_summary.json",
+            "w",
+            encoding="utf-8",
+        ) as f:
+            json.dump(summary, f, indent=2)
+
+        print(f"Load requests saved to: {base_filename}_load.csv")
+        print(f"Load summary saved to: {base_filename}_load_summary.json")
+        return f"{base_filename}_load.csv"
+
+    def save_run_metadata(
+        self,
+        metadata: dict[str, Any],
+        filename: str | None = None,
+    ) -> str:
+        """Save run metadata (e.g. the test suite hash) to JSON.
+
+        Args:
+            metadata: JSON-serializable run metadata
+            filename: Base filename (optional)
+
+        Returns:
+            Path to run metadata JSON file
+
+        """
+        OUTPUT_DIR.mkdir(exist_ok=True)
+        run_filename = f"{self.base_filename(filename)}_run.json"
+        with open(OUTPUT_DIR / run_filename, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=2, default=str)
+
+        print(f"Run metadata saved to: {run_filename}")
+        return run_filename
@@ -0,0 +1,192 @@
+"""Deterministic test sharding for multi-node runs.
+
+Every test gets a stable ``test_id`` hashed from its query and its expected_*
+values (suites repeat a query with different expectations, and those rows are
+different tests), so a test lands in the same shard on every runner and stays
+there when rows are added to or removed from the suite. Shards are disjoint and
+together cover the suite.
+
+With historical durations (the ``duration_seconds`` column of earlier
+results), tests are instead assigned greedily, longest first, to the shard
+with the least total expected time. This balances wall time across runners,
+but the assignment depends on the whole suite, so adding rows can move other
+tests between shards.
+"""
+
+import ast
+import contextlib
+import hashlib
+import math
+import statistics
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from gnw_evals.utils.eval_types import ExpectedData
+
+# Expected values that, with the query, identify a test
+EXPECTATION_FIELDS = [f for f in ExpectedData.model_fields if f.startswith("expected_")]
+
+# Null spellings of suite cells, read as missing (as the suite loader does)
+NULL_STRINGS = {"nan", "null", "none"}
+
+# Spellings of a true expected_clarification (anything else is false)
+TRUE_STRINGS = {"true", "1", "yes", "y", "t", "on"}
+
+
+def normalize_query(query: Any) -> str:
+    """Return a query insensitive to whitespace and case."""
+    return " ".join(str(query).split()).lower()
+
+
+def _normalize_expectation(field: str, value: Any) -> str:
+    """Return an expected value as compared for test IDs.
+
+    Missing values and defaults compare equal, as do ";"-separated strings
+    and lists of the same items.
+    """
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    if field == "expected_clarification":
+        return "true" if str(value).strip().lower() in TRUE_STRINGS else ""
+    if isinstance(value, str) and value.startswith("["):
+        # Lists are exported to result CSVs as their repr
+        with contextlib.suppress(ValueError, SyntaxError):
+            value = ast.literal_eval(value)
+    items = value if isinstance(value, list | tuple) else str(value).split(";")
+    items = [normalize_query(item) for item in items]
+    return ";".join(item for item in items if item and item not in NULL_STRINGS)
+
+
+def compute_test_id(query: str, expectations: Mapping[str, Any] | None = None) -> str:
+    """Return a stable ID for a test row from its query and expected_* values.
+
+    Args:
+        query: Test query, compared insensitive to whitespace and case
+        expectations: Row, record or ``model_dump()`` holding the expected_*
+            values (fields it lacks count as empty)
+
+    Returns:
+        16 hex digit ID
+
+    """
+    expectations = expectations if expectations is not None else {}
+    parts = [normalize_query(query)] + [
+        _normalize_expectation(field, expectations.get(field))
+        for field in EXPECTATION_FIELDS
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def frame_test_ids(df: pd.DataFrame) -> pd.Series:
+    """Return the test ID of every row of a suite or results frame."""
+    fields = [field for field in EXPECTATION_FIELDS if field in df.columns]
+    rows = zip(df["query"], *(df[field] for field in fields), strict=True)
+    return pd.Series(
+        [
+            compute_test_id(query, dict(zip(fields, values, strict=True)))
+            for query, *values in rows
+        ],
+        index=df.index,
+        dtype=object,
+    )
+
+
+def load_durations(results_files: list[str | Path]) -> dict[str, float]:
+    """Load per-test durations from earlier summary or detailed result CSVs.
+
+    Tests are identified by their query and expected values (detailed CSVs),
+    or by the ``test_id`` column of summary CSVs, which have no expected
+    values. Tests that appear in several files get their median duration.
+    """
+    durations: dict[str, list[float]] = {}
+    for results_file in results_files:
+        df = pd.read_csv(
+            results_file,
+            usecols=lambda c: c in {"query", "test_id", "duration_seconds"}
+            or c in EXPECTATION_FIELDS,
+            dtype=str,
+        )
+        test_ids = frame_test_ids(df)
+        if "test_id" in df.columns and not set(EXPECTATION_FIELDS) & set(df.columns):
+            test_ids = df["test_id"].fillna(test_ids)
+        for test_id, duration in zip(test_ids, df["duration_seconds"], strict=True):
+            if pd.notna(duration):
+                durations.setdefault(test_id, []).append(float(duration))
+    return {test_id: statistics.median(values) for test_id, values in durations.items()}
+
+
+class Shard:
+    """One of ``count`` disjoint slices of a test suite."""
+
+    def __init__(
+        self,
+        index: int,
+        count: int,
+        durations: dict[str, float] | None = None,
+    ):
+        """Initialize the shard.
+
+        Args:
+            index: Zero-based shard index
+            count: Total number of shards
+            durations: Historical seconds per test_id to balance shards by
+                expected run time (optional, hash-based otherwise)
+
+        """
+        if not 0 <= index < count:
+            raise ValueError("Shard index must satisfy 0 <= index < count")
+        self.index = index
+        self.count = count
+        self.durations = durations or {}
+
+    @classmethod
+    def parse(cls, value: str, durations: dict[str, float] | None = None) -> "Shard":
+        """Parse a one-based "i/N" shard spec, e.g. "2/4" for the second of four."""
+        index, count = (int(v) for v in value.split("/"))
+        return cls(index - 1, count, durations)
+
+    def __str__(self) -> str:
+        """Return the one-based "i/N" spec of the shard."""
+        return f"{self.index + 1}/{self.count}"
+
+    @property
+    def weighted(self) -> bool:
+        """Whether shards are balanced by historical durations."""
+        return bool(self.durations)
+
+    def _hash_shard(self, test_id: str) -> int:
+        """Return the shard of a test by hash."""
+        return int(test_id, 16) % self.count
+
+    def _weighted_shards(self, test_ids: list[str]) -> dict[str, int]:
+        """Assign tests to shards longest first, balancing expected time."""
+        # Tests without history are assumed to take the typical duration
+        default = statistics.median(self.durations.values())
+        expected = {t: self.durations.get(t, default) for t in set(test_ids)}
+
+        loads = [0.0] * self.count
+        assignment = {}
+        for test_id in sorted(expected, key=lambda t: (-expected[t], t)):
+            shard = loads.index(min(loads))
+            assignment[test_id] = shard
+            loads[shard] += expected[test_id]
+        return assignment
+
+    def select(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Keep the rows of a suite frame that belong to this shard.
+
+        Weighted sharding needs the whole (filtered) suite in one frame; hash
+        sharding also works on chunks of it.
+        """
+        if df.empty:
+            return df
+        test_ids = frame_test_ids(df)
+        if self.weighted:
+            assignment = self._weighted_shards(test_ids.tolist())
+            shards = test_ids.map(assignment)
+        else:
+            shards = test_ids.map(self._hash_shard)
+        return df[shards == self.index]
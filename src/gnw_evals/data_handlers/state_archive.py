@@ -0,0 +1,65 @@
+"""Content-addressed archive of raw agent states.
+
+Each agent state returned by the API's state endpoint is stored gzipped under
+the sha256 of its serialized JSON, so rows that share an agent run (e.g. with
+query dedupe) and identical states across runs are stored once. Archived
+states let a run be rescored offline after evaluator or scoring changes.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+
+class StateArchive:
+    """Stores raw agent states by content hash."""
+
+    def __init__(self, root: str | Path):
+        """Initialize the archive.
+
+        Args:
+            root: Directory holding the archived states, usually
+                ``outputs/{base_filename}_states``
+
+        """
+        self.root = Path(root)
+
+    def _path(self, state_sha256: str) -> Path:
+        """Return the path of an archived state (two-level fan-out)."""
+        return self.root / state_sha256[:2] / f"{state_sha256}.json.gz"
+
+    def put(self, raw_state: Any) -> str:
+        """Archive a raw agent state and return its sha256.
+
+        Args:
+            raw_state: The serialized state string from the state endpoint
+                (other JSON values are serialized first)
+
+        Returns:
+            Hex sha256 of the serialized state
+
+        """
+        if not isinstance(raw_state, str):
+            raw_state = json.dumps(raw_state, sort_keys=True)
+        content = raw_state.encode("utf-8")
+        state_sha256 = hashlib.sha256(content).hexdigest()
+
+        path = self._path(state_sha256)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            # mtime=0 keeps the archive bytes identical for identical states
+            tmp_path.write_bytes(gzip.compress(content, mtime=0))
+            os.replace(tmp_path, path)
+        return state_sha256
+
+    def get(self, state_sha256: str) -> str:
+        """Return the serialized agent state stored under a sha256."""
+        return gzip.decompress(self._path(state_sha256).read_bytes()).decode("utf-8")
+
+    def __contains__(self, state_sha256: str) -> bool:
+        """Whether a state is archived."""
+        return self._path(state_sha256).exists()
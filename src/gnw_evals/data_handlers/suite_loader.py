@@ -0,0 +1,692 @@
+import asyncio
+import codecs
+import hashlib
+import io
+import json
+import math
+from collections.abc import AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlparse
+
+import httpx
+import pandas as pd
+from pydantic import TypeAdapter
+
+from gnw_evals.data_handlers.aoi_index import AOIIndex
+from gnw_evals.data_handlers.remote_cache import STREAM_CHUNK_BYTES, RemoteFileCache
+from gnw_evals.data_handlers.sharding import Shard
+from gnw_evals.evaluators.matchers import ExpectationMatchers
+from gnw_evals.utils.eval_types import ExpectedData
+
+FIELD_EXCLUDE_FROM_EXPECTED_DATA = ["thread_id", "status"]
+NULL_STRINGS = ["nan", "NaN", "null", "NULL", "None"]
+
+# Columns read from the sheet; anything else must be listed as passthrough
+REQUIRED_COLUMNS = {"query", *ExpectedData.model_fields}
+
+# Validates all rows in one pass instead of constructing models row by row
+EXPECTED_DATA_LIST = TypeAdapter(list[ExpectedData])
+
+# Invalid test cases listed when a suite is rejected
+MAX_REPORTED_ERRORS = 10
+
+# Rows parsed per chunk when streaming a test file
+STREAM_CHUNK_ROWS = 200
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+
+# Suite formats by file extension; anything else (e.g. a sheet export URL) is CSV
+SUITE_FORMATS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+}
+
+
+# Suite files fetched and parsed at the same time in multi-source runs
+MAX_CONCURRENT_SOURCES = 8
+
+
+def split_sources(suite_file: str) -> list[str]:
+    """Split a comma-separated list of suite paths or URLs."""
+    return [source.strip() for source in suite_file.split(",") if source.strip()]
+
+
+def detect_suite_format(suite_file: str) -> str:
+    """Return the format ("csv", "jsonl" or "parquet") of a suite path or URL."""
+    path = urlparse(suite_file).path if suite_file.startswith("http") else suite_file
+    return SUITE_FORMATS.get(Path(path).suffix.lower(), "csv")
+
+
+def _is_missing(value: Any) -> bool:
+    """Whether a native value is a null (None or NaN) that should use the default."""
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _clean_native(value: Any) -> Any:
+    """Strip string values and blank null strings, leaving other types as is."""
+    if isinstance(value, str):
+        value = value.strip()
+        return "" if value in NULL_STRINGS else value
+    return value
+
+
+class SuiteLoader:
+    """Handles loading test suites from CSV, JSONL and Parquet files.
+
+    The format is detected from the file extension. CSV values are read as
+    strings and cleaned up, while JSONL and Parquet keep their native types
+    (e.g. lists for ``expected_aoi_ids`` and booleans for
+    ``expected_clarification``). All formats only read the columns the run
+    needs.
+    """
+
+    def __init__(
+        self,
+        cache: RemoteFileCache | None = None,
+        passthrough_columns: list[str] | None = None,
+        shard: Shard | None = None,
+        aoi_index: AOIIndex | None = None,
+    ):
+        """Initialize the loader.
+
+        Args:
+            cache: Cache for remote test files (optional, downloads every time
+                without it)
+            passthrough_columns: Extra sheet columns to keep on the test cases
+                besides query and the expected fields (optional)
+            shard: Only load the tests of this shard, after filtering and
+                before sampling (optional)
+            aoi_index: Reject test cases whose expected AOI IDs are not in
+                this index and warn about implausible subregions (optional)
+
+        """
+        self.cache = cache
+        self.passthrough_columns = passthrough_columns or []
+        self.shard = shard
+        self.aoi_index = aoi_index
+        # Provenance of the last loaded suite (source, sha256, validators)
+        self.suite_info: dict[str, Any] = {}
+        # Rows and columns read vs kept by the last load
+        self.load_stats: dict[str, int] = {}
+        self._wanted_columns = REQUIRED_COLUMNS | set(self.passthrough_columns)
+        self._sheet_columns: set[str] = set()
+
+    def _read_source(self, suite_file: str) -> bytes:
+        """Read the raw test file and record its provenance in suite_info."""
+        if suite_file.startswith("http"):
+            if self.cache is not None:
+                content, self.suite_info = self.cache.fetch(suite_file)
+                return content
+            response = httpx.get(suite_file, follow_redirects=True, timeout=60.0)
+            response.raise_for_status()
+            content = response.content
+            self.suite_info = {"url": suite_file, "source": "network"}
+        else:
+            content = (PROJECT_ROOT / suite_file).read_bytes()
+            self.suite_info = {"path": suite_file, "source": "local"}
+
+        self.suite_info["sha256"] = hashlib.sha256(content).hexdigest()
+        return content
+
+    async def _aiter_source(self, suite_file: str) -> AsyncIterator[bytes]:
+        """Stream the raw test file; suite_info is complete once it is consumed."""
+        self.suite_info = {}
+        if suite_file.startswith("http") and self.cache is not None:
+            async for chunk in self.cache.aiter_bytes(suite_file, self.suite_info):
+                yield chunk
+            return
+
+        digest = hashlib.sha256()
+        if suite_file.startswith("http"):
+            async with (
+                httpx.AsyncClient(follow_redirects=True, timeout=60.0) as client,
+                client.stream("GET", suite_file) as response,
+            ):
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes():
+                    digest.update(chunk)
+                    yield chunk
+            self.suite_info.update(url=suite_file, source="network")
+        else:
+            with open(PROJECT_ROOT / suite_file, "rb") as f:
+                while chunk := f.read(STREAM_CHUNK_BYTES):
+                    digest.update(chunk)
+                    yield chunk
+            self.suite_info.update(path=suite_file, source="local")
+        self.suite_info["sha256"] = digest.hexdigest()
+
+    def _use_column(self, column: str) -> bool:
+        """Column projection for read_csv: only read the columns the run needs."""
+        self._sheet_columns.add(column)
+        return column in self._wanted_columns
+
+    def _read_frame(self, source: io.IOBase) -> pd.DataFrame:
+        """Parse CSV text into a raw string frame with column projection."""
+        return pd.read_csv(
+            source,
+            dtype=str,
+            keep_default_na=False,
+            usecols=self._use_column,
+        )
+
+    def _read_jsonl_frame(self, lines: list[str]) -> pd.DataFrame:
+        """Parse JSONL records into a frame of native values with column projection."""
+        records = []
+        for line in lines:
+            if line.strip():
+                record = json.loads(line)
+                records.append({k: v for k, v in record.items() if self._use_column(k)})
+        columns = [c for c in self._wanted_columns if c in self._sheet_columns]
+        # Object dtype keeps integer IDs from being widened to floats by gaps
+        return pd.DataFrame(records, columns=sorted(columns), dtype=object)
+
+    def _read_parquet_frame(self, content: bytes) -> pd.DataFrame:
+        """Read only the needed columns of a Parquet file as native values."""
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError(
+                "Parquet test suites require pyarrow: pip install 'gnw-evals[parquet]'",
+            ) from e
+
+        parquet_file = pq.ParquetFile(io.BytesIO(content))
+        columns = [c for c in parquet_file.schema_arrow.names if self._use_column(c)]
+        table = parquet_file.read(columns=columns)
+        # to_pylist keeps lists as Python lists (to_pandas would give numpy arrays)
+        return pd.DataFrame(table.to_pylist(), columns=columns, dtype=object)
+
+    def _read_suite_frame(self, content: bytes, suite_format: str) -> pd.DataFrame:
+        """Parse a whole suite file of the given format."""
+        if suite_format == "parquet":
+            return self._read_parquet_frame(content)
+        if suite_format == "jsonl":
+            return self._read_jsonl_frame(
+                content.decode("utf-8-sig").splitlines(),
+            )
+        return self._read_frame(io.BytesIO(content))
+
+    async def _aiter_jsonl_frames(
+        self,
+        source: AsyncIterator[bytes],
+        chunk_rows: int,
+    ) -> AsyncIterator[pd.DataFrame]:
+        """Incrementally parse streamed JSONL bytes into frames of chunk_rows rows."""
+        decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        lines: list[str] = []
+        tail = ""
+
+        async for data in source:
+            new_lines = (tail + decoder.decode(data)).split("\n")
+            tail = new_lines.pop()
+            lines.extend(line for line in new_lines if line.strip())
+            if len(lines) >= chunk_rows:
+                chunk, lines = lines, []
+                yield await asyncio.to_thread(self._read_jsonl_frame, chunk)
+
+        tail += decoder.decode(b"", final=True)
+        if tail.strip():
+            lines.append(tail)
+        if lines:
+            yield await asyncio.to_thread(self._read_jsonl_frame, lines)
+
+    async def _aiter_csv_frames(
+        self,
+        source: AsyncIterator[bytes],
+        chunk_rows: int,
+    ) -> AsyncIterator[pd.DataFrame]:
+        """Incrementally parse streamed CSV bytes into frames of chunk_rows rows.
+
+        Records are split on newlines outside quoted fields, so multi-line
+        answers are kept intact.
+        """
+        decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        header = None
+        records: list[str] = []
+        record = ""
+        in_quotes = False
+        tail = ""
+        parsed_any = False
+
+        async for data in source:
+            lines = (tail + decoder.decode(data)).split("\n")
+            tail = lines.pop()
+            for line in lines:
+                record += line + "\n"
+                # An odd number of quotes toggles whether we are inside a quoted field
+                in_quotes ^= line.count('"') % 2 == 1
+                if in_quotes:
+                    continue
+                if header is None:
+                    header = record
+                else:
+                    records.append(record)
+                record = ""
+
+            if header is not None and len(records) >= chunk_rows:
+                text = header + "".join(records)
+                records = []
+                parsed_any = True
+                yield await asyncio.to_thread(self._read_frame, io.StringIO(text))
+
+        record += tail + decoder.decode(b"", final=True)
+        if record.strip() and header is not None:
+            records.append(record)
+        # A header-only file still yields one (empty) frame
+        if header is not None and (records or not parsed_any):
+            text = header + "".join(records)
+            yield await asyncio.to_thread(self._read_frame, io.StringIO(text))
+
+    @staticmethod
+    def _apply_filters(
+        df: pd.DataFrame,
+        test_group_filter: str | None,
+        status_filter: list[str] | None,
+        verbose: bool = True,
+    ) -> pd.DataFrame:
+        """Apply status and test_group filters to raw (uncleaned) rows."""
+        # Filter by status - only include tests that should be run
+        # Skip tests with status: done, fail, skip
+        if "status" in df.columns and status_filter:
+            original_count = len(df)
+            # Native suites may omit the status of a row, which means the default
+            status = df["status"].fillna(ExpectedData.model_fields["status"].default)
+            status = status.str.strip().str.lower()
+            df = df[status.isin([s.lower() for s in status_filter])]
+            filtered_count = len(df)
+            if verbose and filtered_count < original_count:
+                print(
+                    f"Filtered {original_count - filtered_count} tests based on status (keeping only: {', '.join(status_filter)})",
+                )
+
+        # Filter by test_group if specified
+        if test_group_filter and "test_group" in df.columns:
+            original_count = len(df)
+            df = df[
+                df["test_group"]
+                .str.strip()
+                .str.lower()
+                .str.contains(test_group_filter.lower(), na=False)
+            ]
+            filtered_count = len(df)
+            if verbose and filtered_count < original_count:
+                print(
+                    f"Filtered {original_count - filtered_count} tests based on test_group filter '{test_group_filter}'",
+                )
+        return df
+
+    @staticmethod
+    def _compile_matchers(test_cases: list[ExpectedData]) -> list[ExpectedData]:
+        """Attach compiled expectation matchers, rejecting unparseable expectations."""
+        errors = []
+        for test_case in test_cases:
+            try:
+                test_case.matchers = ExpectationMatchers.compile(test_case, strict=True)
+            except ValueError as e:
+                errors.append(f"  {getattr(test_case, 'query', '')[:60]!r}: {e}")
+        if errors:
+            raise ValueError(
+                f"{len(errors)} test cases have invalid expectations:\n"
+                + "\n".join(errors[:MAX_REPORTED_ERRORS]),
+            )
+        return test_cases
+
+    @staticmethod
+    def _to_test_cases(
+        df: pd.DataFrame,
+        verbose: bool = True,
+        native: bool = False,
+    ) -> list[ExpectedData]:
+        """Fill missing fields, clean values and validate rows as ExpectedData.
+
+        Native frames (JSONL, Parquet) only have their string values cleaned,
+        and null values are left out so the model defaults apply.
+        """
+        # Check which expected_* fields are present vs missing
+        present_fields = []
+        missing_fields = []
+
+        for field in ExpectedData.model_fields.keys():
+            if field in FIELD_EXCLUDE_FROM_EXPECTED_DATA:
+                continue
+
+            if field in df.columns:
+                present_fields.append(field)
+            else:
+                missing_fields.append(field)
+                # Add missing field with default value (list defaults such as
+                # expected_aoi_ids are left to the model)
+                default_value = ExpectedData.model_fields[field].default
+                if not isinstance(default_value, list):
+                    df[field] = default_value
+
+        # Print summary (one-time per CSV load)
+        if verbose and present_fields:
+            print(f"✓ Expected fields detected: {', '.join(present_fields)}")
+        if verbose and missing_fields:
+            print(f"○ Expected fields not in suite: {', '.join(missing_fields)}")
+
+        columns = list(df.columns)
+        if native:
+            # Cleaned per value: DataFrame.map would re-infer (and widen) dtypes
+            records = [
+                {
+                    k: _clean_native(v)
+                    for k, v in zip(columns, values, strict=True)
+                    if not _is_missing(v)
+                }
+                for values in zip(*(df[col].tolist() for col in columns))
+            ]
+            return SuiteLoader._compile_matchers(
+                EXPECTED_DATA_LIST.validate_python(records),
+            )
+
+        # Simple cleanup: replace NaN/null with empty string
+        df = df.fillna("")
+
+        # Clean all string values
+        df = df.astype(str).apply(lambda col: col.str.strip())
+        df = df.mask(df.isin(NULL_STRINGS), "")
+
+        # Zipping column lists is much faster than DataFrame.to_dict("records")
+        records = [
+            dict(zip(columns, values, strict=True))
+            for values in zip(*(df[col].tolist() for col in columns))
+        ]
+        return SuiteLoader._compile_matchers(
+            EXPECTED_DATA_LIST.validate_python(records),
+        )
+
+    def _check_aoi_ids(self, test_cases: list[ExpectedData]) -> list[ExpectedData]:
+        """Reject unknown expected AOI IDs and warn about implausible subregions."""
+        if self.aoi_index is None:
+            return test_cases
+        errors = []
+        for test_case in test_cases:
+            query = getattr(test_case, "query", "")[:60]
+            errors.extend(
+                f"  {query!r}: {error}"
+                for error in self.aoi_index.validate(test_case.expected_aoi_ids)
+            )
+            problem = self.aoi_index.validate_subregion(
+                test_case.expected_aoi_ids,
+                test_case.expected_subregion,
+            )
+            if problem:
+                print(f"Warning: {query!r}: {problem}")
+        if errors:
+            raise ValueError(
+                f"{len(errors)} expected AOI IDs are not in the AOI index:\n"
+                + "\n".join(errors[:MAX_REPORTED_ERRORS]),
+            )
+        return test_cases
+
+    def _record_load_stats(self, rows_read: int, rows_kept: int) -> None:
+        """Store and print rows and columns read vs kept."""
+        self.load_stats = {
+            "rows_read": rows_read,
+            "rows_kept": rows_kept,
+            "columns_read": len(self._sheet_columns & self._wanted_columns),
+            "columns_total": len(self._sheet_columns),
+        }
+        print(
+            f"Read {rows_read} rows, kept {rows_kept} "
+            f"({self.load_stats['columns_read']} of {len(self._sheet_columns)} columns)",
+        )
+
+    def _load_sources(
+        self,
+        sources: list[str],
+        sample_size: int,
+        test_group_filter: str | None,
+        status_filter: list[str] | None,
+        random_seed: int,
+        offset: int,
+    ) -> list[ExpectedData]:
+        """Load several suite files concurrently into one tagged, deduplicated suite.
+
+        Every file is fetched (through the shared cache) and parsed by its own
+        loader in a thread pool, with the filters applied per file. Test cases
+        are tagged with their ``source``, identical rows across files are
+        only kept once, and sharding and sampling then apply to the union.
+        """
+        loaders = [
+            SuiteLoader(
+                cache=self.cache,
+                passthrough_columns=self.passthrough_columns,
+                aoi_index=self.aoi_index,
+            )
+            for _ in sources
+        ]
+        with ThreadPoolExecutor(
+            max_workers=min(len(sources), MAX_CONCURRENT_SOURCES),
+        ) as pool:
+            parts = list(
+                pool.map(
+                    lambda loader, source: loader.load_test_data(
+                        source,
+                        -1,
+                        test_group_filter,
+                        status_filter,
+                    ),
+                    loaders,
+                    sources,
+                ),
+            )
+
+        test_cases = []
+        seen = set()
+        for source, part in zip(sources, parts, strict=True):
+            for test_case in part:
+                key = json.dumps(test_case.model_dump(), sort_keys=True, default=str)
+                if key in seen:
+                    continue
+                seen.add(key)
+                test_case.source = source
+                test_cases.append(test_case)
+        duplicates = sum(len(part) for part in parts) - len(test_cases)
+        if duplicates:
+            print(f"Dropped {duplicates} duplicate rows across test files")
+
+        # Shard and sample the union like a single suite frame
+        positions = pd.DataFrame([t.model_dump() for t in test_cases])
+        if self.shard is not None:
+            positions = self.shard.select(positions)
+            print(f"Shard {self.shard}: {len(positions)} tests")
+        if sample_size > 0 and sample_size < len(positions):
+            if random_seed:
+                positions = positions.sample(n=sample_size, random_state=random_seed)
+            else:
+                positions = positions.iloc[offset : offset + sample_size]
+        test_cases = [test_cases[i] for i in positions.index]
+
+        # The combined hash identifies the exact set of file contents
+        digest = hashlib.sha256()
+        for loader in loaders:
+            digest.update(loader.suite_info["sha256"].encode())
+        self.suite_info = {
+            "sha256": digest.hexdigest(),
+            "source": "multiple",
+            "sources": [loader.suite_info for loader in loaders],
+        }
+        self.load_stats = {
+            "rows_read": sum(loader.load_stats["rows_read"] for loader in loaders),
+            "rows_kept": len(test_cases),
+            "duplicates": duplicates,
+        }
+        print(
+            f"Loaded {len(sources)} test files (sha256 {self.suite_info['sha256'][:12]})",
+        )
+        print(f"Final test count after all filters: {len(test_cases)} tests")
+        return test_cases
+
+    def load_test_data(
+        self,
+        suite_file: str,
+        sample_size: int = 0,
+        test_group_filter: str | None = None,
+        status_filter: str | None = None,
+        random_seed: int = 42,
+        offset: int = 0,
+    ) -> list[ExpectedData]:
+        """Load test data from a CSV, JSONL or Parquet suite file.
+
+        Several suite files can be given separated by commas; see
+        ``_load_sources``.
+
+        Args:
+            suite_file: Path or URL to the test suite file(s)
+            sample_size: Number of test cases to load (0 means all)
+            test_group_filter: Filter by test_group column (optional)
+            status_filter: Filter by status column (optional)
+            random_seed: Random seed for sampling (optional)
+            offset: Offset for sampling (optional)
+
+        Returns:
+            List of ExpectedData objects
+
+        """
+        sources = split_sources(suite_file)
+        if len(sources) > 1:
+            return self._load_sources(
+                sources,
+                sample_size,
+                test_group_filter,
+                status_filter,
+                random_seed,
+                offset,
+            )
+
+        suite_format = detect_suite_format(suite_file)
+        content = self._read_source(suite_file)
+        print(
+            f"Test suite sha256 {self.suite_info['sha256'][:12]} ({self.suite_info['source']}, {suite_format})",
+        )
+
+        self._sheet_columns = set()
+        df = self._read_suite_frame(content, suite_format)
+        rows_read = len(df)
+
+        # Filter and sample before the cleanup, which then only touches kept rows
+        df = self._apply_filters(df, test_group_filter, status_filter)
+        if self.shard is not None:
+            df = self.shard.select(df)
+            print(f"Shard {self.shard}: {len(df)} tests")
+
+        # Sample if requested (-1 means run all rows, 0+ means run that many)
+        if sample_size > 0 and sample_size < len(df):
+            if random_seed:
+                df = df.sample(n=sample_size, random_state=random_seed)
+            else:
+                df = df.iloc[offset : offset + sample_size]
+
+        self._record_load_stats(rows_read, len(df))
+        print(f"Final test count after all filters: {len(df)} tests")
+
+        return self._check_aoi_ids(
+            self._to_test_cases(df, native=suite_format != "csv"),
+        )
+
+    async def iter_test_data(
+        self,
+        suite_file: str,
+        sample_size: int = 0,
+        test_group_filter: str | None = None,
+        status_filter: str | None = None,
+        random_seed: int = 0,
+        offset: int = 0,
+        chunk_rows: int = STREAM_CHUNK_ROWS,
+    ) -> AsyncIterator[ExpectedData]:
+        """Stream test cases while the test file is still being read.
+
+        Takes the same arguments as ``load_test_data``. Test cases are parsed
+        in chunks of ``chunk_rows`` rows and yielded as soon as their chunk is
+        parsed. Random sampling, weighted sharding and multi-source runs need
+        the whole suite and Parquet files can't be parsed incrementally, so in
+        those cases the suite is loaded eagerly and then yielded.
+
+        Yields:
+            ExpectedData objects
+
+        """
+        suite_format = detect_suite_format(suite_file)
+        if (
+            (random_seed and sample_size > 0)
+            or suite_format == "parquet"
+            or (self.shard is not None and self.shard.weighted)
+            or len(split_sources(suite_file)) > 1
+        ):
+            test_cases = await asyncio.to_thread(
+                self.load_test_data,
+                suite_file,
+                sample_size,
+                test_group_filter,
+                status_filter,
+                random_seed,
+                offset,
+            )
+            for test_case in test_cases:
+                yield test_case
+            return
+
+        limit = sample_size if sample_size > 0 else None
+        skip = offset if limit else 0
+        rows_read = rows_kept = chunks = 0
+        self._sheet_columns = set()
+
+        source = self._aiter_source(suite_file)
+        if suite_format == "jsonl":
+            frames = self._aiter_jsonl_frames(source, chunk_rows)
+        else:
+            frames = self._aiter_csv_frames(source, chunk_rows)
+        async with aclosing(source):
+            async with aclosing(frames):
+                async for df in frames:
+                    rows_read += len(df)
+                    df = self._apply_filters(
+                        df,
+                        test_group_filter,
+                        status_filter,
+                        verbose=False,
+                    )
+                    if self.shard is not None:
+                        df = self.shard.select(df)
+                    if skip:
+                        skipped = min(skip, len(df))
+                        df = df.iloc[skipped:]
+                        skip -= skipped
+                    if limit is not None:
+                        df = df.iloc[: limit - rows_kept]
+
+                    test_cases = self._check_aoi_ids(
+                        self._to_test_cases(
+                            df,
+                            verbose=chunks == 0,
+                            native=suite_format != "csv",
+                        ),
+                    )
+                    chunks += 1
+                    for test_case in test_cases:
+                        rows_kept += 1
+                        yield test_case
+                    if limit is not None and rows_kept >= limit:
+                        break
+
+            # Drain the rest so the suite hash covers the whole file (and the
+            # remote cache is filled) even when sampling stopped early
+            async for _ in source:
+                pass
+
+        self._record_load_stats(rows_read, rows_kept)
+        print(
+            f"Test suite sha256 {self.suite_info['sha256'][:12]} ({self.suite_info['source']}, {suite_format})",
+        )
+
+
+# Backwards compatible name from when only CSV suites were supported
+CSVLoader = SuiteLoader
@@ -1,12 +1,17 @@
 from typing import Any
 
-from gnw_evals.evaluators.llm_judges import llm_judge
+from gnw_evals.evaluators.judge_backends import JudgeBackend
+from gnw_evals.evaluators.judge_batch import JudgeBatchQueue
+from gnw_evals.evaluators.llm_judges import llm_judge, llm_judge_self_consistent
 
 
 def evaluate_final_answer(
     agent_state: dict[str, Any],
     expected_answer: str,
     expected_clarification: bool = False,
+    judge_queue: JudgeBatchQueue | None = None,
+    judge_backend: JudgeBackend | None = None,
+    judge_samples: int = 1,
 ) -> dict[str, Any]:
     """Check if final answer contains key information from expected answer using LLM-as-a-judge.
 
@@ -18,9 +23,17 @@ def evaluate_final_answer(
         agent_state: Final agent state after execution
         expected_answer: Expected answer text
         expected_clarification: Whether clarification is expected (kept for consistency)
+        judge_queue: If given, judge requests are queued for deferred batch
+            scoring instead of being judged inline. Scores are left as None and
+            the queued request ids are returned under "pending_judgements".
+        judge_backend: Judge backend for inline judging (default Anthropic)
+        judge_samples: Number of self-consistency votes per answer. Above 1,
+            scores are majority votes and the share of agreeing votes is
+            returned as charts_answer_confidence / agent_answer_confidence.
 
     Returns:
-        Dict with charts_answer_score, agent_answer_score, and actual values
+        Dict with charts_answer_score, agent_answer_score, their confidences,
+        and actual values
 
     """
     # If no expected answer, both scores are None (check not applicable)
@@ -28,6 +41,8 @@ def evaluate_final_answer(
         return {
             "charts_answer_score": None,
             "agent_answer_score": None,
+            "charts_answer_confidence": None,
+            "agent_answer_confidence": None,
             "actual_charts_answer": None,
             "actual_agent_answer": None,
             "error": "Missing expected answer",
@@ -58,25 +73,57 @@ def evaluate_final_answer(
             # Fallback for any other format
             actual_agent_answer = str(content) if content else ""
 
+    def judge(actual_answer: str) -> tuple[int | None, float | None]:
+        if judge_samples > 1:
+            return llm_judge_self_consistent(
+                expected_answer,
+                actual_answer,
+                judge_samples,
+                backend=judge_backend,
+            )
+        return llm_judge(expected_answer, actual_answer, backend=judge_backend), None
+
     # Score charts answer
     charts_answer_score = None
+    charts_answer_confidence = None
+    pending_judgements = {}
     if actual_charts_answer:
         # Has insight (even if empty string), evaluate it
-        charts_answer_score = llm_judge(expected_answer, actual_charts_answer)
+        if judge_queue is not None:
+            pending_judgements["charts_answer_score"] = judge_queue.enqueue(
+                expected_answer,
+                actual_charts_answer,
+            )
+        else:
+            charts_answer_score, charts_answer_confidence = judge(
+                actual_charts_answer,
+            )
     # else: No charts data at all, return None (not applicable)
 
     # Score agent answer
     agent_answer_score = None
+    agent_answer_confidence = None
     if actual_agent_answer:
         # Has message response, evaluate it
-        agent_answer_score = llm_judge(expected_answer, actual_agent_answer)
+        if judge_queue is not None:
+            pending_judgements["agent_answer_score"] = judge_queue.enqueue(
+                expected_answer,
+                actual_agent_answer,
+            )
+        else:
+            agent_answer_score, agent_answer_confidence = judge(actual_agent_answer)
     # else: No agent message, return None (not applicable)
 
     # Set actual values to None if empty strings for cleaner CSV output
-    return {
+    evaluation = {
         "charts_answer_score": charts_answer_score,
         "agent_answer_score": agent_answer_score,
+        "charts_answer_confidence": charts_answer_confidence,
+        "agent_answer_confidence": agent_answer_confidence,
         "actual_charts_answer": actual_charts_answer or None,
         "actual_agent_answer": actual_agent_answer or None,
         "error": "",
     }
+    if pending_judgements:
+        evaluation["pending_judgements"] = pending_judgements
+    return evaluation
@@ -1,9 +1,15 @@
 """AOI (Area of Interest) selection evaluator."""
 
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
+from gnw_evals.evaluators.clarification_classifier import ClarificationClassifier
+from gnw_evals.evaluators.judge_backends import JudgeBackend
 from gnw_evals.evaluators.llm_judges import llm_judge_clarification
-from gnw_evals.evaluators.utils import normalize_gadm_id, normalize_value
+from gnw_evals.evaluators.matchers import AOIMatcher, ExpectationMatchers, ValueMatcher
+from gnw_evals.evaluators.utils import SUBREGION_LEVELS, normalize_value
+
+if TYPE_CHECKING:
+    from gnw_evals.data_handlers.aoi_index import AOIIndex
 
 
 def evaluate_aoi_selection(
@@ -12,6 +18,10 @@ def evaluate_aoi_selection(
     expected_subregion: str | None,
     expected_clarification: bool = False,
     query: str = "",
+    judge_backend: JudgeBackend | None = None,
+    clarification_classifier: ClarificationClassifier | None = None,
+    matchers: ExpectationMatchers | None = None,
+    aoi_index: "AOIIndex | None" = None,
 ) -> dict[str, Any]:
     """Check if the correct AOI was selected, or if agent appropriately asked for clarification.
 
@@ -21,10 +31,22 @@ def evaluate_aoi_selection(
         expected_subregion: Expected subregion (e.g., "state-province", "country")
         expected_clarification: Whether clarification request is expected
         query: Original user query for clarification detection
+        judge_backend: Judge backend for clarification detection (default Anthropic)
+        clarification_classifier: Heuristic that decides clear clarification
+            cases before the LLM judge is called (optional)
+        matchers: Expectations compiled at load time (optional, compiled
+            from expected_aoi_ids and expected_subregion otherwise)
+        aoi_index: AOI reference index (optional). With it, the hierarchy
+            relation of the selected AOIs is reported
+
+    Subregions are compared by admin level, so aliases like "state" and
+    "state-province" match.
+
     Returns:
         Dict with aoi_id_match_score (0/1/None), subregion_match_score (0/1/None),
         clarification_requested_score (0/1/None), actual_id, actual_name, actual_subtype,
-        actual_source, actual_subregion
+        actual_source, actual_subregion, aoi_relation (with an index: per expected
+        ID, "exact", "child", "parent", "unrelated" or "unknown")
 
     """
     if not expected_aoi_ids:
@@ -54,7 +76,13 @@ def evaluate_aoi_selection(
 
     # Check if agent asked for clarification instead of selecting AOI
     if not aois and query:
-        clarification = llm_judge_clarification(agent_state, query)
+        clarification = llm_judge_clarification(
+            agent_state,
+            query,
+            evaluator="aoi",
+            backend=judge_backend,
+            classifier=clarification_classifier,
+        )
         if clarification["is_clarification"]:
             # Score clarification based on whether it was expected
             clarification_score = 1.0 if expected_clarification else 0.0
@@ -91,35 +119,33 @@ def evaluate_aoi_selection(
     actual_aoi_subtypes = [aoi.get("subtype", "") for aoi in aois]
     actual_aoi_sources = [aoi.get("source", "") for aoi in aois]
 
-    if actual_aoi_sources[0] == "gadm":
-        # Normalize GADM ids
-        normalized_actual = [
-            normalize_gadm_id(actual_aoi_id) for actual_aoi_id in actual_aoi_ids
-        ]
-        normalized_expected = [
-            normalize_gadm_id(expected_aoi_id) for expected_aoi_id in expected_aoi_ids
-        ]
+    if matchers is not None:
+        aoi_matcher, subregion_matcher = matchers.aoi, matchers.subregion
     else:
-        normalized_actual = [actual_aoi_id.lower() for actual_aoi_id in actual_aoi_ids]
-        normalized_expected = [
-            expected_aoi_id.lower() for expected_aoi_id in expected_aoi_ids
-        ]
-
-    match_aoi_id = set(normalized_actual) == set(normalized_expected)
+        aoi_matcher = AOIMatcher.compile(expected_aoi_ids)
+        subregion_matcher = ValueMatcher.compile(expected_subregion, multi_value=False)
 
-    # Normalize subregion values for comparison
-    expected_subregion_str = normalize_value(expected_subregion)
+    # GADM ids are normalized, other sources compared case-insensitively
+    match_aoi_id = aoi_matcher.matches(actual_aoi_ids, actual_aoi_sources[0])
     actual_subregion_str = normalize_value(subregion)
 
     # Binary scoring: Each component is 0 or 1 (or None if not evaluated)
     aoi_id_match_score = 1.0 if match_aoi_id else 0.0
 
     # If expected subregion is empty, return None (not evaluated)
-    if not expected_subregion_str:
+    if not subregion_matcher:
         match_subregion = None
         subregion_match_score = None
     else:
-        match_subregion = expected_subregion_str == actual_subregion_str
+        # Admin levels are the same for subregion name aliases
+        actual_level = SUBREGION_LEVELS.get(actual_subregion_str.lower())
+        match_subregion = subregion_matcher.matches(subregion) or (
+            actual_level is not None
+            and any(
+                SUBREGION_LEVELS.get(expected.lower()) == actual_level
+                for expected in subregion_matcher.values
+            )
+        )
         subregion_match_score = 1.0 if match_subregion else 0.0
 
     return {
@@ -133,4 +159,19 @@ def evaluate_aoi_selection(
         "actual_subregion": actual_subregion_str,
         "match_aoi_id": match_aoi_id,
         "match_subregion": match_subregion,
+        "aoi_relation": _aoi_relation(aoi_index, expected_aoi_ids, actual_aoi_ids),
     }
+
+
+def _aoi_relation(
+    aoi_index: "AOIIndex | None",
+    expected_aoi_ids: list[str],
+    actual_aoi_ids: list[str],
+) -> str | None:
+    """Summarize how the selected AOIs relate to each expected AOI."""
+    if aoi_index is None:
+        return None
+    return ";".join(
+        aoi_index.best_relation(expected_id, actual_aoi_ids)
+        for expected_id in expected_aoi_ids
+    )
@@ -0,0 +1,239 @@
+"""Heuristic pre-classifier for clarification detection.
+
+Most agent responses that reach the clarification judge are obvious: a short
+message ending in a question with a list of options, or an error string. The
+classifier scores cheap text features with a logistic model and only defers
+responses whose probability falls between the two thresholds to the LLM judge.
+
+Thresholds can be tuned against historical LLM verdicts recorded in a judge
+cache (see ``--judge-cache``) with ``calibrate_thresholds``.
+"""
+
+import json
+import math
+import re
+from pathlib import Path
+from typing import Any
+
+CLARIFICATION_PHRASES = (
+    "could you clarify",
+    "can you clarify",
+    "please clarify",
+    "could you specify",
+    "can you specify",
+    "please specify",
+    "could you provide",
+    "can you provide",
+    "please provide",
+    "did you mean",
+    "do you mean",
+    "which one",
+    "which of these",
+    "which of the following",
+    "more specific",
+    "more information",
+    "more details",
+    "let me know which",
+    "please confirm",
+    "multiple locations",
+    "multiple areas",
+    "ambiguous",
+)
+FOLLOW_UP_PHRASES = (
+    "would you like",
+    "let me know if",
+    "anything else",
+    "happy to help",
+)
+ERROR_PHRASES = (
+    "error",
+    "exception",
+    "traceback",
+    "failed to",
+    "something went wrong",
+    "internal server",
+    "timed out",
+    "timeout",
+)
+OPTION_LINE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+\S", re.MULTILINE)
+
+# Logistic model weights, set by hand and not fitted yet (the heuristic is off
+# by default until weights fitted on recorded verdicts are checked in)
+WEIGHTS = {
+    "ends_with_question": 3.0,
+    "question_marks": 0.8,
+    "option_list": 1.5,
+    "clarification_phrases": 2.0,
+    "follow_up_phrases": -2.0,
+    "error_phrases": -3.0,
+    "length": -0.8,
+}
+BIAS = -2.0
+
+DEFAULT_LOWER_THRESHOLD = 0.15
+DEFAULT_UPPER_THRESHOLD = 0.85
+
+
+def extract_features(response: str) -> dict[str, float]:
+    """Extract clarification features from an agent response."""
+    text = response.strip()
+    lowered = text.lower()
+    question_marks = text.count("?")
+    option_lines = len(OPTION_LINE.findall(text))
+
+    return {
+        "ends_with_question": float(text.endswith("?")),
+        "question_marks": float(min(question_marks, 3)),
+        # Options only indicate clarification when the user is asked to pick one
+        "option_list": float(option_lines >= 2 and question_marks > 0),
+        "clarification_phrases": float(
+            min(sum(p in lowered for p in CLARIFICATION_PHRASES), 2),
+        ),
+        "follow_up_phrases": float(
+            min(sum(p in lowered for p in FOLLOW_UP_PHRASES), 1),
+        ),
+        "error_phrases": float(min(sum(p in lowered for p in ERROR_PHRASES), 2)),
+        # Long responses are usually completed analyses
+        "length": min(len(text) / 500, 3.0),
+    }
+
+
+class ClarificationClassifier:
+    """Decides clear clarification cases locally and defers uncertain ones."""
+
+    def __init__(
+        self,
+        lower_threshold: float = DEFAULT_LOWER_THRESHOLD,
+        upper_threshold: float = DEFAULT_UPPER_THRESHOLD,
+    ):
+        """Initialize with decision thresholds.
+
+        Args:
+            lower_threshold: At or below this probability, not a clarification
+            upper_threshold: At or above this probability, a clarification
+
+        """
+        if not 0 <= lower_threshold <= upper_threshold <= 1:
+            raise ValueError("Thresholds must satisfy 0 <= lower <= upper <= 1")
+        self.lower_threshold = lower_threshold
+        self.upper_threshold = upper_threshold
+
+    @staticmethod
+    def probability(response: str) -> float:
+        """Return the probability that a response is a clarification request."""
+        features = extract_features(response)
+        logit = BIAS + sum(WEIGHTS[name] * value for name, value in features.items())
+        return 1 / (1 + math.exp(-logit))
+
+    def decide(self, probability: float) -> bool | None:
+        """Turn a probability into a verdict, or None if it should go to the LLM."""
+        if probability >= self.upper_threshold:
+            return True
+        if probability <= self.lower_threshold:
+            return False
+        return None
+
+    def classify(self, response: str) -> bool | None:
+        """Classify a response, returning None for uncertain cases."""
+        return self.decide(self.probability(response))
+
+
+def load_clarification_verdicts(cache_path: str | Path) -> list[tuple[str, bool]]:
+    """Load (response, is_clarification) LLM verdicts from a judge cache file."""
+    verdicts = {}
+    with open(cache_path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry.get("schema") != "ClarificationJudgment":
+                continue
+            # Only real LLM verdicts are useful for calibration
+            if entry.get("model") in ("fake", "replay"):
+                continue
+            verdicts[entry["key"]] = (
+                entry["inputs"]["response"],
+                bool(entry["output"]["is_clarification"]),
+            )
+    return list(verdicts.values())
+
+
+def _evaluate_thresholds(
+    scored: list[tuple[float, bool]],
+    lower: float,
+    upper: float,
+) -> dict[str, Any]:
+    """Compare heuristic decisions at the given thresholds with LLM verdicts."""
+    classifier = ClarificationClassifier(lower, upper)
+    decided = correct = false_positives = false_negatives = 0
+    for probability, expected in scored:
+        verdict = classifier.decide(probability)
+        if verdict is None:
+            continue
+        decided += 1
+        if verdict == expected:
+            correct += 1
+        elif verdict:
+            false_positives += 1
+        else:
+            false_negatives += 1
+
+    return {
+        "lower_threshold": lower,
+        "upper_threshold": upper,
+        "coverage": decided / len(scored) if scored else 0.0,
+        "accuracy": correct / decided if decided else None,
+        "false_positives": false_positives,
+        "false_negatives": false_negatives,
+        "llm_calls": len(scored) - decided,
+    }
+
+
+def calibrate_thresholds(
+    verdicts: list[tuple[str, bool]],
+    min_accuracy: float = 0.98,
+    lower_threshold: float = DEFAULT_LOWER_THRESHOLD,
+    upper_threshold: float = DEFAULT_UPPER_THRESHOLD,
+) -> dict[str, Any]:
+    """Build a calibration report of the classifier against LLM verdicts.
+
+    Args:
+        verdicts: (response, is_clarification) pairs judged by the LLM
+        min_accuracy: Minimum agreement with the LLM on decided cases
+        lower_threshold: Currently configured lower threshold
+        upper_threshold: Currently configured upper threshold
+
+    Returns:
+        Report with the metrics of the current thresholds, the threshold pair
+        with the highest coverage that meets min_accuracy (None if no pair
+        does), and the full threshold grid
+
+    """
+    scored = [(ClarificationClassifier.probability(r), v) for r, v in verdicts]
+    grid = [
+        _evaluate_thresholds(scored, lower / 100, upper / 100)
+        for lower in range(0, 55, 5)
+        for upper in range(50, 105, 5)
+        if lower <= upper
+    ]
+    eligible = [
+        row
+        for row in grid
+        if row["accuracy"] is not None and row["accuracy"] >= min_accuracy
+    ]
+    recommended = max(
+        eligible,
+        key=lambda row: (
+            row["coverage"],
+            row["upper_threshold"] - row["lower_threshold"],
+        ),
+        default=None,
+    )
+
+    return {
+        "samples": len(scored),
+        "positives": sum(v for _, v in scored),
+        "current": _evaluate_thresholds(scored, lower_threshold, upper_threshold),
+        "recommended": recommended,
+        "grid": grid,
+    }
@@ -2,8 +2,10 @@
 
 from typing import Any
 
+from gnw_evals.evaluators.clarification_classifier import ClarificationClassifier
+from gnw_evals.evaluators.judge_backends import JudgeBackend
 from gnw_evals.evaluators.llm_judges import llm_judge_clarification
-from gnw_evals.evaluators.utils import normalize_date
+from gnw_evals.evaluators.matchers import DateRangeMatcher, ExpectationMatchers
 
 
 def evaluate_data_pull(
@@ -13,6 +15,9 @@ def evaluate_data_pull(
     expected_end_date: str | None = None,
     expected_clarification: bool = False,
     query: str = "",
+    judge_backend: JudgeBackend | None = None,
+    clarification_classifier: ClarificationClassifier | None = None,
+    matchers: ExpectationMatchers | None = None,
 ) -> dict[str, Any]:
     """Check if data was successfully pulled, or if the agent asked for clarification.
 
@@ -23,6 +28,11 @@ def evaluate_data_pull(
         expected_end_date: Expected end date
         expected_clarification: Whether clarification request is expected
         query: Original user query for clarification detection
+        judge_backend: Judge backend for clarification detection (default Anthropic)
+        clarification_classifier: Heuristic that decides clear clarification
+            cases before the LLM judge is called (optional)
+        matchers: Expectations compiled at load time (optional, compiled
+            from the expected dates otherwise)
 
     Returns:
         Dict with data_pull_exists_score (0/1), date_match_score (0/1/None),
@@ -42,7 +52,13 @@ def evaluate_data_pull(
 
     # Check if agent asked for clarification instead of pulling data
     if not raw_data and query:
-        clarification = llm_judge_clarification(agent_state, query)
+        clarification = llm_judge_clarification(
+            agent_state,
+            query,
+            evaluator="data_pull",
+            backend=judge_backend,
+            classifier=clarification_classifier,
+        )
         if clarification["is_clarification"]:
             # Score clarification based on whether it was expected
             clarification_score = 1.0 if expected_clarification else 0.0
@@ -80,21 +96,21 @@ def evaluate_data_pull(
     data_pull_exists_score = 1.0 if data_pull_success else 0.0
 
     if expected_start_date and expected_end_date:
-        # Normalize date values to YYYY-MM-DD format for comparison
-        expected_start_str = normalize_date(expected_start_date)
-        expected_end_str = normalize_date(expected_end_date)
-        actual_start_str = normalize_date(actual_start_date)
-        actual_end_str = normalize_date(actual_end_date)
+        # Expected dates are parsed to YYYY-MM-DD once, at load time
+        if matchers is not None:
+            date_matcher = matchers.dates
+        else:
+            date_matcher = DateRangeMatcher.compile(
+                expected_start_date,
+                expected_end_date,
+            )
 
         # If any date failed to parse (empty string), treat as missing expected
-        if not expected_start_str or not expected_end_str:
+        if not date_matcher:
             date_success = None
             date_match_score = None
         else:
-            date_success = (
-                expected_start_str == actual_start_str
-                and expected_end_str == actual_end_str
-            )
+            date_success = date_matcher.matches(actual_start_date, actual_end_date)
             date_match_score = 1.0 if date_success else 0.0
     else:
         # Missing expected dates - return None (not evaluated)
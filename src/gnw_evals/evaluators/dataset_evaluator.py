@@ -2,8 +2,10 @@
 
 from typing import Any
 
+from gnw_evals.evaluators.clarification_classifier import ClarificationClassifier
+from gnw_evals.evaluators.judge_backends import JudgeBackend
 from gnw_evals.evaluators.llm_judges import llm_judge_clarification
-from gnw_evals.evaluators.utils import normalize_value
+from gnw_evals.evaluators.matchers import ExpectationMatchers, ValueMatcher
 
 
 def evaluate_dataset_selection(
@@ -12,15 +14,25 @@ def evaluate_dataset_selection(
     expected_context_layer: Any,
     expected_clarification: bool = False,
     query: str = "",
+    judge_backend: JudgeBackend | None = None,
+    clarification_classifier: ClarificationClassifier | None = None,
+    matchers: ExpectationMatchers | None = None,
 ) -> dict[str, Any]:
     """Check if the correct dataset was selected, or if the agent asked for clarification.
 
     Args:
         agent_state: Final agent state after execution
-        expected_dataset_id: Expected dataset id as string
-        expected_context_layer: Expected context layer as string
+        expected_dataset_id: Expected dataset id as string; several accepted
+            ids are separated by semicolons (e.g. "0;1")
+        expected_context_layer: Expected context layer as string; several
+            accepted layers are separated by semicolons
         expected_clarification: Whether clarification request is expected
         query: Original user query for clarification detection
+        judge_backend: Judge backend for clarification detection (default Anthropic)
+        clarification_classifier: Heuristic that decides clear clarification
+            cases before the LLM judge is called (optional)
+        matchers: Expectations compiled at load time (optional, compiled
+            from expected_dataset_id and expected_context_layer otherwise)
 
     Returns:
         Dict with dataset_id_match_score (0/1/None), context_layer_match_score (0/1/None),
@@ -42,7 +54,13 @@ def evaluate_dataset_selection(
 
     # Check if agent asked for clarification instead of selecting a dataset
     if not dataset and query:
-        clarification = llm_judge_clarification(agent_state, query)
+        clarification = llm_judge_clarification(
+            agent_state,
+            query,
+            evaluator="dataset",
+            backend=judge_backend,
+            classifier=clarification_classifier,
+        )
         if clarification["is_clarification"]:
             # Score clarification based on whether it was expected
             clarification_score = 1.0 if expected_clarification else 0.0
@@ -71,22 +89,23 @@ def evaluate_dataset_selection(
     actual_dataset_name = dataset.get("dataset_name", "")
     actual_context_layer = dataset.get("context_layer", "")
 
-    # Normalize values for comparison
-    expected_id_str = normalize_value(expected_dataset_id)
-    actual_id_str = normalize_value(actual_dataset_id)
-    dataset_match = expected_id_str == actual_id_str
+    if matchers is not None:
+        dataset_matcher, context_matcher = matchers.dataset_id, matchers.context_layer
+    else:
+        dataset_matcher = ValueMatcher.compile(expected_dataset_id)
+        context_matcher = ValueMatcher.compile(expected_context_layer)
 
-    expected_context_str = normalize_value(expected_context_layer)
-    actual_context_str = normalize_value(actual_context_layer)
+    # Any of the semicolon separated expected values is a match
+    dataset_match = dataset_matcher.matches(actual_dataset_id)
 
     # Binary scoring: Each component is 0 or 1 (or None if not evaluated)
     dataset_id_match_score = 1.0 if dataset_match else 0.0
 
     # Context layer matching: if expected is empty, return None (not evaluated)
-    if not expected_context_str:
+    if not context_matcher:
         context_layer_match_score = None
     else:
-        context_layer_match = expected_context_str == actual_context_str
+        context_layer_match = context_matcher.matches(actual_context_layer)
         context_layer_match_score = 1.0 if context_layer_match else 0.0
 
     return {
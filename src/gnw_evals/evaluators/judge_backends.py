@@ -0,0 +1,269 @@
+"""Judge backends used by the LLM-as-a-judge evaluators.
+
+A backend turns a prompt template, its inputs and a structured output schema
+into a parsed verdict plus token usage. Backends are selected from the CLI
+with a spec string (see ``create_judge_backend``) and injected into the
+evaluators by the test runner:
+
+- ``anthropic[:model]`` - Anthropic chat model (default)
+- ``fake[:latency=..,jitter=..,error_rate=..,pass_rate=..,seed=..]`` - offline
+  deterministic verdicts with a configurable latency/error distribution
+- ``replay:path.jsonl`` - verdicts replayed from a judge cache file
+
+Self-consistency judging draws several independent votes for the same
+request. Each vote passes its ``sample`` index, which backends use to draw a
+fresh (non-greedy) verdict and which is part of the cache key.
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any
+
+from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel
+
+from gnw_evals.utils.models import DEFAULT_JUDGE_MODEL, create_judge_model
+
+# Temperature of self-consistency votes, so repeated votes can disagree
+SAMPLING_TEMPERATURE = 1.0
+
+
+def judge_cache_key(
+    prompt: ChatPromptTemplate,
+    inputs: dict[str, Any],
+    schema: type[BaseModel],
+    sample: int | None = None,
+) -> str:
+    """Return a stable key for a judge request (rendered prompt + schema name).
+
+    Self-consistency votes get a distinct key per sample index.
+    """
+    rendered = "\n".join(str(m.content) for m in prompt.format_messages(**inputs))
+    key = f"{schema.__name__}\x00{rendered}"
+    if sample is not None:
+        key += f"\x00sample={sample}"
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class JudgeBackend(ABC):
+    """Abstract base class for judge backends."""
+
+    model: str
+
+    @abstractmethod
+    def invoke(
+        self,
+        prompt: ChatPromptTemplate,
+        inputs: dict[str, Any],
+        schema: type[BaseModel],
+        sample: int | None = None,
+    ) -> tuple[BaseModel, dict[str, int]]:
+        """Run a judge request.
+
+        Args:
+            prompt: Judge prompt template
+            inputs: Template variables
+            schema: Structured output schema of the verdict
+            sample: Index of a self-consistency vote, None for a single
+                greedy verdict
+
+        Returns:
+            Parsed verdict and usage dict with input_tokens, output_tokens and
+            cached_tokens
+
+        """
+        pass
+
+
+class AnthropicJudgeBackend(JudgeBackend):
+    """Judge backend calling an Anthropic chat model."""
+
+    def __init__(self, model: str = DEFAULT_JUDGE_MODEL):
+        """Initialize with the judge model name."""
+        self.model = model
+        self.chat_model = create_judge_model(model)
+        self.sampling_model = create_judge_model(model, SAMPLING_TEMPERATURE)
+
+    def invoke(self, prompt, inputs, schema, sample=None):
+        """Invoke the chat model with structured output."""
+        chat_model = self.chat_model if sample is None else self.sampling_model
+        judge_chain = prompt | chat_model.with_structured_output(
+            schema,
+            include_raw=True,
+        )
+        output = judge_chain.invoke(inputs)
+        if output["parsing_error"]:
+            raise output["parsing_error"]
+
+        usage = getattr(output["raw"], "usage_metadata", None) or {}
+        return output["parsed"], {
+            "input_tokens": usage.get("input_tokens", 0),
+            "output_tokens": usage.get("output_tokens", 0),
+            "cached_tokens": usage.get("input_token_details", {}).get("cache_read", 0),
+        }
+
+
+class FakeJudgeError(RuntimeError):
+    """Error injected by the fake judge backend."""
+
+
+class FakeJudgeBackend(JudgeBackend):
+    """Offline judge backend with deterministic verdicts.
+
+    Verdicts are derived from a hash of the request, so the same request
+    always gets the same verdict. Boolean and integer fields are "positive"
+    with probability ``pass_rate``. Each call sleeps for a latency drawn from
+    a normal distribution (``latency`` mean, ``jitter`` standard deviation,
+    in seconds) and fails with probability ``error_rate``.
+    """
+
+    model = "fake"
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        pass_rate: float = 0.5,
+        seed: int = 0,
+    ):
+        """Initialize the latency/error distribution."""
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.pass_rate = pass_rate
+        self.seed = seed
+
+    def invoke(self, prompt, inputs, schema, sample=None):
+        """Return a deterministic fake verdict after a simulated delay."""
+        key = judge_cache_key(prompt, inputs, schema, sample)
+        rng = random.Random(f"{self.seed}:{key}")
+
+        time.sleep(max(0.0, rng.gauss(self.latency, self.jitter)))
+        if rng.random() < self.error_rate:
+            raise FakeJudgeError("Injected fake judge error")
+
+        values = {}
+        for name, field in schema.model_fields.items():
+            if field.annotation is bool:
+                values[name] = rng.random() < self.pass_rate
+            elif field.annotation is int:
+                values[name] = int(rng.random() < self.pass_rate)
+            else:
+                values[name] = "fake"
+
+        prompt_chars = sum(
+            len(str(m.content)) for m in prompt.format_messages(**inputs)
+        )
+        # Roughly four characters per token
+        return schema(**values), {
+            "input_tokens": prompt_chars // 4,
+            "output_tokens": 20,
+            "cached_tokens": 0,
+        }
+
+
+class RecordingJudgeBackend(JudgeBackend):
+    """Wraps a backend and appends every verdict to a judge cache file."""
+
+    def __init__(self, backend: JudgeBackend, cache_path: str | Path):
+        """Initialize with the wrapped backend and the JSONL cache path."""
+        self.backend = backend
+        self.model = backend.model
+        self.cache_path = Path(cache_path)
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt, inputs, schema, sample=None):
+        """Invoke the wrapped backend and record the verdict."""
+        parsed, usage = self.backend.invoke(prompt, inputs, schema, sample)
+        entry = {
+            "key": judge_cache_key(prompt, inputs, schema, sample),
+            "schema": schema.__name__,
+            "model": self.model,
+            "sample": sample,
+            "inputs": inputs,
+            "output": parsed.model_dump(),
+            "usage": usage,
+        }
+        with self._lock, open(self.cache_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        return parsed, usage
+
+
+class ReplayJudgeBackend(JudgeBackend):
+    """Replays verdicts from a judge cache file written by RecordingJudgeBackend."""
+
+    model = "replay"
+
+    def __init__(self, cache_path: str | Path):
+        """Load cached verdicts by request key."""
+        self.entries: dict[str, dict[str, Any]] = {}
+        with open(cache_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.entries[entry["key"]] = entry
+
+    def invoke(self, prompt, inputs, schema, sample=None):
+        """Return the cached verdict for the request."""
+        key = judge_cache_key(prompt, inputs, schema, sample)
+        if key not in self.entries:
+            raise KeyError(f"No cached {schema.__name__} verdict for this request")
+        entry = self.entries[key]
+        return schema(**entry["output"]), entry.get("usage", {})
+
+
+def _parse_options(options: str) -> dict[str, float]:
+    """Parse "a=1,b=2" into {"a": 1.0, "b": 2.0}."""
+    parsed = {}
+    for option in filter(None, options.split(",")):
+        name, _, value = option.partition("=")
+        parsed[name.strip()] = float(value)
+    return parsed
+
+
+def create_judge_backend(spec: str, cache_path: str | None = None) -> JudgeBackend:
+    """Create a judge backend from a CLI spec string.
+
+    Args:
+        spec: "anthropic[:model]", "fake[:k=v,...]" or "replay:path"
+        cache_path: If given, verdicts are appended to this judge cache file
+
+    Returns:
+        Configured judge backend
+
+    """
+    kind, _, options = spec.partition(":")
+    if kind == "anthropic":
+        backend = AnthropicJudgeBackend(options or DEFAULT_JUDGE_MODEL)
+    elif kind == "fake":
+        values = _parse_options(options)
+        if "seed" in values:
+            values["seed"] = int(values["seed"])
+        backend = FakeJudgeBackend(**values)
+    elif kind == "replay":
+        if not options:
+            raise ValueError("The replay judge backend needs a cache path")
+        backend = ReplayJudgeBackend(options)
+    else:
+        raise ValueError(f"Unknown judge backend: {kind}")
+
+    if cache_path:
+        backend = RecordingJudgeBackend(backend, cache_path)
+    return backend
+
+
+_default_backend: JudgeBackend | None = None
+
+
+def get_default_backend() -> JudgeBackend:
+    """Return the default Anthropic backend, created on first use."""
+    global _default_backend
+    if _default_backend is None:
+        _default_backend = AnthropicJudgeBackend()
+    return _default_backend
@@ -0,0 +1,257 @@
+"""Deferred answer judging through the Anthropic Message Batches API.
+
+In batch mode the answer evaluator does not call the judge inline. It
+enqueues the request on a ``JudgeBatchQueue`` and leaves the score empty.
+Once every agent conversation has finished, ``run_deferred_judging`` submits
+the queue in bulk, polls until the batches have ended and back-fills the
+scores (and overall scores) into the results before they are exported.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from typing import Any
+
+import httpx
+
+from gnw_evals.evaluators.judge_usage import judge_usage
+from gnw_evals.evaluators.llm_judges import JUDGE_PROMPT, Score
+from gnw_evals.utils.eval_types import ExpectedData, TestResult
+from gnw_evals.utils.models import DEFAULT_JUDGE_MODEL
+
+ANTHROPIC_API_VERSION = "2023-06-01"
+MAX_REQUESTS_PER_BATCH = 100_000
+
+
+class JudgeBatchQueue:
+    """Collects answer judge requests during a run for later bulk submission."""
+
+    def __init__(self):
+        """Initialize an empty queue."""
+        self._requests: dict[str, tuple[str, str]] = {}
+
+    def __len__(self) -> int:
+        """Return the number of unique queued requests."""
+        return len(self._requests)
+
+    def enqueue(self, expected_answer: str, actual_answer: str) -> str:
+        """Queue a judge request and return its custom id.
+
+        Identical (expected, actual) pairs share one request, which is common
+        when the chart insight and the final agent message are the same text.
+        """
+        digest = hashlib.sha256(
+            f"{expected_answer}\x00{actual_answer}".encode(),
+        ).hexdigest()
+        custom_id = f"judge-{digest[:32]}"
+        self._requests[custom_id] = (expected_answer, actual_answer)
+        return custom_id
+
+    def build_requests(
+        self,
+        model: str,
+        max_tokens: int = 8_192,
+        temperature: float = 0,
+    ) -> list[dict[str, Any]]:
+        """Render queued requests as Message Batches request entries."""
+        tool = {
+            "name": Score.__name__,
+            "description": Score.__doc__,
+            "input_schema": Score.model_json_schema(),
+        }
+        requests = []
+        for custom_id, (expected_answer, actual_answer) in self._requests.items():
+            prompt = JUDGE_PROMPT.format_messages(
+                expected_answer=expected_answer,
+                actual_answer=actual_answer,
+            )
+            requests.append(
+                {
+                    "custom_id": custom_id,
+                    "params": {
+                        "model": model,
+                        "max_tokens": max_tokens,
+                        "temperature": temperature,
+                        "messages": [
+                            {"role": "user", "content": prompt[0].content},
+                        ],
+                        "tools": [tool],
+                        "tool_choice": {"type": "tool", "name": tool["name"]},
+                    },
+                },
+            )
+        return requests
+
+
+class MessageBatchClient:
+    """Minimal async client for the Message Batches endpoints."""
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        base_url: str | None = None,
+        poll_interval: float = 30.0,
+        max_wait: float | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        """Initialize with API configuration.
+
+        Args:
+            api_key: Anthropic API key (defaults to ANTHROPIC_API_KEY)
+            base_url: API base URL (defaults to ANTHROPIC_BASE_URL or the public API)
+            poll_interval: Seconds between batch status checks
+            max_wait: Seconds to wait for a batch to end before raising
+                ``TimeoutError`` (no limit if None)
+            transport: Optional httpx transport, e.g. a local stand-in server
+
+        """
+        self.api_key = api_key or os.environ.get("ANTHROPIC_API_KEY", "")
+        self.base_url = base_url or os.environ.get(
+            "ANTHROPIC_BASE_URL",
+            "https://api.anthropic.com",
+        )
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+        self.transport = transport
+
+    async def run(self, requests: list[dict[str, Any]]) -> dict[str, dict]:
+        """Submit requests, wait for all batches to end and return results by custom id."""
+        headers = {
+            "x-api-key": self.api_key,
+            "anthropic-version": ANTHROPIC_API_VERSION,
+        }
+        async with httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=headers,
+            transport=self.transport,
+            timeout=120.0,
+        ) as client:
+            chunks = [
+                requests[i : i + MAX_REQUESTS_PER_BATCH]
+                for i in range(0, len(requests), MAX_REQUESTS_PER_BATCH)
+            ]
+            chunk_results = await asyncio.gather(
+                *(self._run_batch(client, chunk) for chunk in chunks),
+            )
+
+        results = {}
+        for chunk_result in chunk_results:
+            results.update(chunk_result)
+        return results
+
+    async def _run_batch(
+        self,
+        client: httpx.AsyncClient,
+        requests: list[dict[str, Any]],
+    ) -> dict[str, dict]:
+        """Submit one batch, poll until it has ended and download its results.
+
+        Raises:
+            TimeoutError: If the batch has not ended within ``max_wait`` seconds
+
+        """
+        loop = asyncio.get_running_loop()
+        response = await client.post(
+            "/v1/messages/batches",
+            json={"requests": requests},
+        )
+        response.raise_for_status()
+        batch = response.json()
+        print(f"Submitted judge batch {batch['id']} with {len(requests)} requests")
+
+        deadline = None if self.max_wait is None else loop.time() + self.max_wait
+        while batch["processing_status"] != "ended":
+            if deadline is not None and loop.time() >= deadline:
+                raise TimeoutError(
+                    f"Judge batch {batch['id']} did not end within {self.max_wait:g}s",
+                )
+            await asyncio.sleep(self.poll_interval)
+            response = await client.get(f"/v1/messages/batches/{batch['id']}")
+            response.raise_for_status()
+            batch = response.json()
+
+        response = await client.get(batch["results_url"])
+        response.raise_for_status()
+
+        results = {}
+        for line in response.text.splitlines():
+            if line.strip():
+                entry = json.loads(line)
+                results[entry["custom_id"]] = entry["result"]
+        return results
+
+
+def parse_batch_score(result: dict[str, Any] | None) -> float | None:
+    """Extract the judge score from a batch result entry (None if it did not succeed)."""
+    if not result or result.get("type") != "succeeded":
+        return None
+    for block in result.get("message", {}).get("content", []):
+        if block.get("type") == "tool_use":
+            return Score.model_validate(block["input"]).score
+    return None
+
+
+def _record_batch_usage(
+    result: dict[str, Any] | None,
+    model: str,
+    test_group: str,
+) -> None:
+    """Record token usage of a batch result entry with the judge usage tracker."""
+    succeeded = bool(result) and result.get("type") == "succeeded"
+    usage = result["message"].get("usage", {}) if succeeded else {}
+    cached_tokens = usage.get("cache_read_input_tokens", 0)
+    judge_usage.record(
+        "answer",
+        model,
+        # The API reports uncached input tokens separately from cache reads/writes
+        input_tokens=usage.get("input_tokens", 0)
+        + cached_tokens
+        + usage.get("cache_creation_input_tokens", 0),
+        output_tokens=usage.get("output_tokens", 0),
+        cached_tokens=cached_tokens,
+        error=not succeeded,
+        batch=True,
+        test_group=test_group,
+    )
+
+
+async def run_deferred_judging(
+    results: list[TestResult],
+    queue: JudgeBatchQueue,
+    runner,
+    client: MessageBatchClient,
+    model: str = DEFAULT_JUDGE_MODEL,
+) -> None:
+    """Resolve all queued judge requests and back-fill scores into results."""
+    if not len(queue):
+        return
+
+    print(f"\nRunning deferred judge batch for {len(queue)} requests...")
+    requests = queue.build_requests(model)
+    batch_results = await client.run(requests)
+
+    failed = 0
+    recorded = set()
+    for result in results:
+        pending = (result.model_extra or {}).pop("pending_judgements", None)
+        if not pending:
+            continue
+        for field, custom_id in pending.items():
+            batch_result = batch_results.get(custom_id)
+            if custom_id not in recorded:
+                recorded.add(custom_id)
+                _record_batch_usage(batch_result, model, result.test_group)
+            score = parse_batch_score(batch_result)
+            if score is None:
+                failed += 1
+            setattr(result, field, score)
+
+        evaluations = result.to_dict()
+        result.overall_score = runner._calculate_overall_score(
+            evaluations,
+            ExpectedData(**evaluations),
+        )
+
+    if failed:
+        print(f"Warning: {failed} deferred judge requests did not succeed")
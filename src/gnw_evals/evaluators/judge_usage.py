@@ -0,0 +1,255 @@
+"""Token, latency and cost accounting for LLM judge calls."""
+
+import threading
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Any
+
+# USD per million tokens, matched by model name prefix
+MODEL_PRICES = {
+    "claude-3-5-haiku": {"input": 0.80, "output": 4.00, "cache_read": 0.08},
+    "claude-haiku-4-5": {"input": 1.00, "output": 5.00, "cache_read": 0.10},
+}
+# Message Batches requests are billed at half the interactive price
+BATCH_DISCOUNT = 0.5
+
+# Test group of the test currently being evaluated (set per asyncio task)
+current_test_group: ContextVar[str] = ContextVar(
+    "current_test_group",
+    default="unknown",
+)
+
+
+def parse_judge_budget(value: str) -> tuple[int | None, float | None]:
+    """Parse a judge budget into (max_tokens, max_usd).
+
+    Plain integers are token budgets ("250000"), values prefixed with "$" or
+    suffixed with "usd" are dollar budgets ("$2.50", "2.5usd").
+    """
+    value = value.strip().lower()
+    if value.startswith("$") or value.endswith("usd"):
+        return None, float(value.removeprefix("$").removesuffix("usd"))
+    return int(value), None
+
+
+def estimate_cost_usd(
+    model: str,
+    input_tokens: int,
+    output_tokens: int,
+    cached_tokens: int,
+    batch: bool = False,
+) -> float:
+    """Estimate the cost of a judge call (0.0 for models without known pricing)."""
+    prices = next(
+        (p for prefix, p in MODEL_PRICES.items() if model.startswith(prefix)),
+        None,
+    )
+    if prices is None:
+        return 0.0
+    cost = (
+        (input_tokens - cached_tokens) * prices["input"]
+        + cached_tokens * prices["cache_read"]
+        + output_tokens * prices["output"]
+    ) / 1_000_000
+    return cost * BATCH_DISCOUNT if batch else cost
+
+
+class JudgeUsageTracker:
+    """Accumulates usage of every judge call and enforces an optional budget."""
+
+    def __init__(self):
+        """Initialize an empty tracker without a budget."""
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear recorded calls and remove the budget."""
+        self.calls: list[dict[str, Any]] = []
+        self.heuristic_decisions: dict[tuple[str, str], int] = defaultdict(int)
+        self.total_tokens = 0
+        self.total_cost_usd = 0.0
+        self.budget_tokens: int | None = None
+        self.budget_usd: float | None = None
+        self.budget_action = "deterministic"
+        self._budget_warned = False
+
+    def configure_budget(
+        self,
+        budget_tokens: int | None = None,
+        budget_usd: float | None = None,
+        action: str = "deterministic",
+    ) -> None:
+        """Set the run budget and what to do once it is exceeded.
+
+        Args:
+            budget_tokens: Maximum total (input + output) judge tokens
+            budget_usd: Maximum estimated judge cost in dollars
+            action: "deterministic" to fall back to rule-based scorers, or
+                "skip" to leave judge-based checks unscored
+
+        """
+        self.budget_tokens = budget_tokens
+        self.budget_usd = budget_usd
+        self.budget_action = action
+
+    @property
+    def budget_exceeded(self) -> bool:
+        """Whether the configured budget has been used up."""
+        exceeded = (
+            self.budget_tokens is not None and self.total_tokens >= self.budget_tokens
+        ) or (self.budget_usd is not None and self.total_cost_usd >= self.budget_usd)
+        if exceeded and not self._budget_warned:
+            self._budget_warned = True
+            print(
+                f"Judge budget exceeded ({self.total_tokens} tokens, ${self.total_cost_usd:.4f}); "
+                f"remaining judge checks use action '{self.budget_action}'",
+            )
+        return exceeded
+
+    def record(
+        self,
+        evaluator: str,
+        model: str,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        cached_tokens: int = 0,
+        latency_s: float = 0.0,
+        error: bool = False,
+        batch: bool = False,
+        test_group: str | None = None,
+    ) -> None:
+        """Record a single judge call.
+
+        Args:
+            evaluator: Evaluator that issued the call (e.g. "answer", "aoi")
+            model: Judge model name
+            input_tokens: Total prompt tokens, including cached tokens
+            output_tokens: Completion tokens
+            cached_tokens: Prompt tokens served from the prompt cache
+            latency_s: Wall time of the call in seconds
+            error: Whether the call failed
+            batch: Whether the call was made through the Message Batches API
+            test_group: Test group (defaults to the group of the current test)
+
+        """
+        cost = estimate_cost_usd(
+            model,
+            input_tokens,
+            output_tokens,
+            cached_tokens,
+            batch,
+        )
+        call = {
+            "evaluator": evaluator,
+            "test_group": test_group or current_test_group.get(),
+            "model": model,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cached_tokens": cached_tokens,
+            "latency_s": latency_s,
+            "cost_usd": cost,
+            "error": error,
+            "batch": batch,
+        }
+        with self._lock:
+            self.calls.append(call)
+            self.total_tokens += input_tokens + output_tokens
+            self.total_cost_usd += cost
+
+    def record_heuristic(self, evaluator: str) -> None:
+        """Record a verdict decided locally instead of by a judge call."""
+        with self._lock:
+            self.heuristic_decisions[(evaluator, current_test_group.get())] += 1
+
+    def summary_rows(self) -> list[dict[str, Any]]:
+        """Aggregate recorded calls per (evaluator, test_group)."""
+        groups = defaultdict(list)
+        with self._lock:
+            for call in self.calls:
+                groups[(call["evaluator"], call["test_group"])].append(call)
+            heuristic_decisions = dict(self.heuristic_decisions)
+
+        rows = []
+        for evaluator, test_group in sorted(set(groups) | set(heuristic_decisions)):
+            calls = groups[(evaluator, test_group)]
+            latencies = [c["latency_s"] for c in calls if not c["batch"]]
+            rows.append(
+                {
+                    "evaluator": evaluator,
+                    "test_group": test_group,
+                    "calls": len(calls),
+                    "heuristic_decisions": heuristic_decisions.get(
+                        (evaluator, test_group),
+                        0,
+                    ),
+                    "errors": sum(c["error"] for c in calls),
+                    "batch_calls": sum(c["batch"] for c in calls),
+                    "input_tokens": sum(c["input_tokens"] for c in calls),
+                    "output_tokens": sum(c["output_tokens"] for c in calls),
+                    "cached_tokens": sum(c["cached_tokens"] for c in calls),
+                    "total_latency_s": round(sum(latencies), 3),
+                    "mean_latency_s": (
+                        round(sum(latencies) / len(latencies), 3) if latencies else None
+                    ),
+                    "cost_usd": round(sum(c["cost_usd"] for c in calls), 6),
+                },
+            )
+        return rows
+
+
+def merge_summary_rows(row_sets: list[list[dict[str, Any]]]) -> list[dict[str, Any]]:
+    """Combine summary rows of several runs (e.g. shards) per (evaluator, test_group).
+
+    Rows read back from CSV hold strings; counts and totals are summed and the
+    mean latency is recomputed from the totals.
+    """
+    totals = defaultdict(lambda: defaultdict(float))
+    for rows in row_sets:
+        for row in rows:
+            total = totals[(row["evaluator"], row["test_group"])]
+            for column in (
+                "calls",
+                "heuristic_decisions",
+                "errors",
+                "batch_calls",
+                "input_tokens",
+                "output_tokens",
+                "cached_tokens",
+                "total_latency_s",
+                "cost_usd",
+            ):
+                total[column] += float(row.get(column) or 0)
+
+    merged = []
+    for (evaluator, test_group), total in sorted(totals.items()):
+        interactive_calls = total["calls"] - total["batch_calls"]
+        merged.append(
+            {
+                "evaluator": evaluator,
+                "test_group": test_group,
+                **{
+                    column: int(total[column])
+                    for column in (
+                        "calls",
+                        "heuristic_decisions",
+                        "errors",
+                        "batch_calls",
+                        "input_tokens",
+                        "output_tokens",
+                        "cached_tokens",
+                    )
+                },
+                "total_latency_s": round(total["total_latency_s"], 3),
+                "mean_latency_s": (
+                    round(total["total_latency_s"] / interactive_calls, 3)
+                    if interactive_calls
+                    else None
+                ),
+                "cost_usd": round(total["cost_usd"], 6),
+            },
+        )
+    return merged
+
+
+# Process-wide tracker shared by all judges
+judge_usage = JudgeUsageTracker()
@@ -1,16 +1,191 @@
+import contextvars
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel
 
-from gnw_evals.utils.models import HAIKU
+from gnw_evals.evaluators.clarification_classifier import ClarificationClassifier
+from gnw_evals.evaluators.judge_backends import JudgeBackend, get_default_backend
+from gnw_evals.evaluators.judge_usage import judge_usage
+from gnw_evals.evaluators.utils import deterministic_answer_score
+from gnw_evals.utils.live_metrics import run_metrics
+from gnw_evals.utils.tracing import tracer
+
+CLARIFICATION_JUDGE_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "user",
+            """
+        You are evaluating whether an AI agent is asking for clarification instead of completing a task.
+
+        ORIGINAL QUERY: {query}
+
+        AGENT RESPONSE: {response}
+
+        Does the agent response indicate that it's asking for clarification, more information, or unable to proceed due to ambiguity in the original query?
+
+        Signs of clarification requests:
+        - Asking questions back to the user
+        - Requesting more specific information
+        - Indicating multiple possible interpretations
+        - Asking to choose between options
+        - Expressing uncertainty about what the user wants
+
+        Return true if this is a clarification request, false if the agent attempted to complete the task.
+        """,
+        ),
+    ],
+)
+
+JUDGE_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "user",
+            """
+            You are evaluating if an AI-generated insight captures the essence of an expected answer.
+
+            EXPECTED ANSWER: {expected_answer}
+
+            ACTUAL INSIGHT: {actual_answer}
+
+            Your task is to:
+            1. Detect the answer type
+            2. Apply the appropriate comparison logic
+            3. Return a score (0 or 1)
+
+            ## Answer Type Detection & Scoring Rules
+
+            **BOOLEAN** (true/false, yes/no questions):
+            - Expected answer contains: "TRUE", "FALSE", "True", "False", "true", "false", "yes", "no", "Yes", "No"
+            - Scoring: Exact semantic match required
+            - **First, extract the boolean value from the actual answer** (usually at the start: "True", "False", "yes", "no")
+            - **Then compare**: TRUE matches with yes/true/affirmative, FALSE matches with no/false/negative
+            - Examples: 
+              - Expected "TRUE" vs Actual "true" → MATCH (1)
+              - Expected "TRUE" vs Actual "yes" → MATCH (1)
+              - Expected "TRUE" vs Actual "False." → NO MATCH (0) [opposite values]
+              - Expected "TRUE" vs Actual "no" → NO MATCH (0) [opposite values]
+              - Expected "FALSE" vs Actual "TRUE" → NO MATCH (0) [opposite values]
+              - Expected "FALSE" vs Actual "false" → MATCH (1)
+              - Expected "TRUE" vs Actual "The statement is correct" → MATCH (1) [affirms without explicit FALSE]
+            - **CRITICAL**: If the actual answer contains "False", "false", "no", or "No", it CANNOT match "TRUE". Vice versa.                
+
+            **NUMERIC** (numbers with optional units):
+            - Expected answer contains numbers: "198.4 hectares", "0.20%", "211 kha", "924,000 km²"
+            - **Extraction rule**: Identify THE main answer number (usually stated as "total", "X hectares were", or the first/most prominent number directly answering the question)
+            - **Tolerance formula**: Calculate |actual - expected| / expected
+              - If result <= 0.05 (5%), then MATCH (1)
+              - If result > 0.05 (5%), then NO MATCH (0)
+            - Examples of MATCH (within 5% tolerance):
+              - Expected "198.4 hectares" vs Actual "200 hectares" → MATCH (1) [0.8% difference]
+              - Expected "0.20%" vs Actual "0.19%" → MATCH (1) [5% difference]
+              - Expected "211 kha" vs Actual "220 kha" → MATCH (1) [4.3% difference]
+              - Expected "200 kha" vs Actual "200,000 hectares" → MATCH (1) [same value, different units]
+            - Examples of NO MATCH (exceeds 5% tolerance):
+              - Expected "198.4 hectares" vs Actual "232 hectares" → NO MATCH (0) [16.9% difference]
+              - Expected "211 kha" vs Actual "235 kha" → NO MATCH (0) [11.4% difference]
+              - Expected "100 hectares" vs Actual "120 hectares" → NO MATCH (0) [20% difference]
+            - For percentages, compare the percentage values directly
+            - **When multiple numbers present**: Use the number that directly answers the question, not breakdown/detail numbers
+              - Example: "A total of 231.97 hectares were affected. Short vegetation had 176.36 ha..." → Use 231.97, not 176.36
+
+            **YEAR** (4-digit years):
+            - Expected answer is a year: "2015", "2023"
+            - Scoring: Exact match required
+            - Examples:
+              - Expected "2015" vs Actual "2015" → MATCH (1)
+              - Expected "2015" vs Actual "2016" → NO MATCH (0)
+
+            **NAMED_ENTITY** (countries, regions, places, land cover types):
+            - Expected answer is a proper noun or descriptive term: "Brazil", "South Dakota" 
+            - Scoring: Semantic similarity - the actual answer should clearly identify the same entity or category
+            - Examples:
+              - Expected "Brazil" vs Actual "Brazil had the most" → MATCH (1)
+              - Expected "South Dakota" vs Actual "S Dakota" → MATCH (1)
+              - Expected "Brazil" vs Actual "Australia" → NO MATCH (0)
+
+            ## Instructions
+
+            1. First, identify which answer_eval_type the expected answer belongs to
+            2. Apply the appropriate scoring rule from above
+            3. Return:
+               - score: 1 if it matches according to the rules, 0 if it does not
+               - answer_eval_type: one of "boolean", "numeric", "year", "named_entity"
+
+            Be strict with the rules above, especially for boolean, numeric, and year types.
+
+            IMPORTANT: Respond with ONLY "1" if the insight adequately captures the expected answer, or "0" if it does not.
+            """,
+        ),
+    ],
+)
+
+
+class ClarificationJudgment(BaseModel):
+    """Structured output of the clarification judge."""
+
+    is_clarification: bool
+    explanation: str
+
 
+class Score(BaseModel):
+    """Structured output of the answer judge."""
 
-def llm_judge_clarification(agent_state: dict, query: str) -> dict:
-    """Use LLM to judge if the agent is asking for clarification instead of selecting an AOI."""
+    score: int
+    answer_eval_type: str  # "boolean", "numeric", "named_entity", "year"
 
-    class ClarificationJudgment(BaseModel):
-        is_clarification: bool
-        explanation: str
 
+def _invoke_judge(
+    prompt: ChatPromptTemplate,
+    inputs: dict,
+    schema: type[BaseModel],
+    evaluator: str,
+    backend: JudgeBackend | None = None,
+    sample: int | None = None,
+) -> BaseModel:
+    """Invoke the judge backend with structured output and record its usage."""
+    backend = backend or get_default_backend()
+
+    start = time.perf_counter()
+    run_metrics.judge_started()
+    try:
+        with tracer.span(f"judge:{evaluator}", "judge", model=backend.model):
+            parsed, usage = backend.invoke(prompt, inputs, schema, sample)
+    except Exception:
+        judge_usage.record(
+            evaluator,
+            backend.model,
+            latency_s=time.perf_counter() - start,
+            error=True,
+        )
+        raise
+    finally:
+        run_metrics.judge_finished()
+    judge_usage.record(
+        evaluator,
+        backend.model,
+        latency_s=time.perf_counter() - start,
+        **usage,
+    )
+    return parsed
+
+
+def llm_judge_clarification(
+    agent_state: dict,
+    query: str,
+    evaluator: str = "clarification",
+    backend: JudgeBackend | None = None,
+    classifier: ClarificationClassifier | None = None,
+) -> dict:
+    """Use LLM to judge if the agent is asking for clarification instead of selecting an AOI.
+
+    If a heuristic classifier is given, clear cases are decided locally and
+    only uncertain responses are sent to the LLM judge. Once the judge budget
+    is exceeded, the heuristic decides at a 0.5 cut-off if it was enabled;
+    otherwise clarification is not detected, as with the "skip" action.
+    """
     # Get the final answer/response from the agent
     charts_data = agent_state.get("charts_data", [])
     final_response = ""
@@ -45,143 +220,149 @@ def llm_judge_clarification(agent_state: dict, query: str) -> dict:
     if not final_response:
         return {"is_clarification": False, "explanation": "No response to evaluate"}
 
-    CLARIFICATION_JUDGE_PROMPT = ChatPromptTemplate.from_messages(
-        [
-            (
-                "user",
-                """
-            You are evaluating whether an AI agent is asking for clarification instead of completing a task.
-
-            ORIGINAL QUERY: {query}
-
-            AGENT RESPONSE: {response}
-
-            Does the agent response indicate that it's asking for clarification, more information, or unable to proceed due to ambiguity in the original query?
-
-            Signs of clarification requests:
-            - Asking questions back to the user
-            - Requesting more specific information
-            - Indicating multiple possible interpretations
-            - Asking to choose between options
-            - Expressing uncertainty about what the user wants
-
-            Return true if this is a clarification request, false if the agent attempted to complete the task.
-            """,
-            ),
-        ],
-    )
-
-    judge_chain = CLARIFICATION_JUDGE_PROMPT | HAIKU.with_structured_output(
-        ClarificationJudgment,
-    )
+    if classifier is not None:
+        probability = classifier.probability(final_response)
+        verdict = classifier.decide(probability)
+        if verdict is not None:
+            judge_usage.record_heuristic(evaluator)
+            return {
+                "is_clarification": verdict,
+                "explanation": f"Heuristic pre-classifier (p={probability:.2f})",
+            }
+
+    if judge_usage.budget_exceeded:
+        # The heuristic isn't calibrated, so it only stands in for the judge
+        # when the run opted into it
+        if judge_usage.budget_action == "deterministic" and classifier is not None:
+            probability = classifier.probability(final_response)
+            judge_usage.record_heuristic(evaluator)
+            return {
+                "is_clarification": probability >= 0.5,
+                "explanation": f"Judge budget exceeded, heuristic verdict (p={probability:.2f})",
+            }
+        return {"is_clarification": False, "explanation": "Judge budget exceeded"}
 
     try:
-        result = judge_chain.invoke({"query": query, "response": final_response})
+        result = _invoke_judge(
+            CLARIFICATION_JUDGE_PROMPT,
+            {"query": query, "response": final_response},
+            ClarificationJudgment,
+            evaluator,
+            backend,
+        )
         return result.model_dump()
     except Exception:
         return {"is_clarification": False, "explanation": "LLM call failed"}
 
 
-def llm_judge(expected_answer: str, actual_answer: str):
-    """Use LLM to judge if an actual answer captures the essence of an expected answer."""
-
-    class Score(BaseModel):
-        score: int
-        answer_eval_type: str  # "boolean", "numeric", "named_entity", "year"
-
-    JUDGE_PROMPT = ChatPromptTemplate.from_messages(
-        [
-            (
-                "user",
-                """
-                You are evaluating if an AI-generated insight captures the essence of an expected answer.
-
-                EXPECTED ANSWER: {expected_answer}
-
-                ACTUAL INSIGHT: {actual_answer}
-
-                Your task is to:
-                1. Detect the answer type
-                2. Apply the appropriate comparison logic
-                3. Return a score (0 or 1)
-
-                ## Answer Type Detection & Scoring Rules
-
-                **BOOLEAN** (true/false, yes/no questions):
-                - Expected answer contains: "TRUE", "FALSE", "True", "False", "true", "false", "yes", "no", "Yes", "No"
-                - Scoring: Exact semantic match required
-                - **First, extract the boolean value from the actual answer** (usually at the start: "True", "False", "yes", "no")
-                - **Then compare**: TRUE matches with yes/true/affirmative, FALSE matches with no/false/negative
-                - Examples: 
-                  - Expected "TRUE" vs Actual "true" → MATCH (1)
-                  - Expected "TRUE" vs Actual "yes" → MATCH (1)
-                  - Expected "TRUE" vs Actual "False." → NO MATCH (0) [opposite values]
-                  - Expected "TRUE" vs Actual "no" → NO MATCH (0) [opposite values]
-                  - Expected "FALSE" vs Actual "TRUE" → NO MATCH (0) [opposite values]
-                  - Expected "FALSE" vs Actual "false" → MATCH (1)
-                  - Expected "TRUE" vs Actual "The statement is correct" → MATCH (1) [affirms without explicit FALSE]
-                - **CRITICAL**: If the actual answer contains "False", "false", "no", or "No", it CANNOT match "TRUE". Vice versa.                
-
-                **NUMERIC** (numbers with optional units):
-                - Expected answer contains numbers: "198.4 hectares", "0.20%", "211 kha", "924,000 km²"
-                - **Extraction rule**: Identify THE main answer number (usually stated as "total", "X hectares were", or the first/most prominent number directly answering the question)
-                - **Tolerance formula**: Calculate |actual - expected| / expected
-                  - If result <= 0.05 (5%), then MATCH (1)
-                  - If result > 0.05 (5%), then NO MATCH (0)
-                - Examples of MATCH (within 5% tolerance):
-                  - Expected "198.4 hectares" vs Actual "200 hectares" → MATCH (1) [0.8% difference]
-                  - Expected "0.20%" vs Actual "0.19%" → MATCH (1) [5% difference]
-                  - Expected "211 kha" vs Actual "220 kha" → MATCH (1) [4.3% difference]
-                  - Expected "200 kha" vs Actual "200,000 hectares" → MATCH (1) [same value, different units]
-                - Examples of NO MATCH (exceeds 5% tolerance):
-                  - Expected "198.4 hectares" vs Actual "232 hectares" → NO MATCH (0) [16.9% difference]
-                  - Expected "211 kha" vs Actual "235 kha" → NO MATCH (0) [11.4% difference]
-                  - Expected "100 hectares" vs Actual "120 hectares" → NO MATCH (0) [20% difference]
-                - For percentages, compare the percentage values directly
-                - **When multiple numbers present**: Use the number that directly answers the question, not breakdown/detail numbers
-                  - Example: "A total of 231.97 hectares were affected. Short vegetation had 176.36 ha..." → Use 231.97, not 176.36
-
-                **YEAR** (4-digit years):
-                - Expected answer is a year: "2015", "2023"
-                - Scoring: Exact match required
-                - Examples:
-                  - Expected "2015" vs Actual "2015" → MATCH (1)
-                  - Expected "2015" vs Actual "2016" → NO MATCH (0)
-
-                **NAMED_ENTITY** (countries, regions, places, land cover types):
-                - Expected answer is a proper noun or descriptive term: "Brazil", "South Dakota" 
-                - Scoring: Semantic similarity - the actual answer should clearly identify the same entity or category
-                - Examples:
-                  - Expected "Brazil" vs Actual "Brazil had the most" → MATCH (1)
-                  - Expected "South Dakota" vs Actual "S Dakota" → MATCH (1)
-                  - Expected "Brazil" vs Actual "Australia" → NO MATCH (0)
-
-                ## Instructions
-
-                1. First, identify which answer_eval_type the expected answer belongs to
-                2. Apply the appropriate scoring rule from above
-                3. Return:
-                   - score: 1 if it matches according to the rules, 0 if it does not
-                   - answer_eval_type: one of "boolean", "numeric", "year", "named_entity"
-
-                Be strict with the rules above, especially for boolean, numeric, and year types.
-
-                IMPORTANT: Respond with ONLY "1" if the insight adequately captures the expected answer, or "0" if it does not.
-                """,
-            ),
-        ],
-    )
-
-    judge_chain = JUDGE_PROMPT | HAIKU.with_structured_output(Score)
-
-    llm_judgement = judge_chain.invoke(
+def llm_judge(
+    expected_answer: str,
+    actual_answer: str,
+    evaluator: str = "answer",
+    backend: JudgeBackend | None = None,
+):
+    """Use LLM to judge if an actual answer captures the essence of an expected answer.
+
+    Once the judge budget is exceeded the answer is scored with the
+    deterministic fallback, or left unscored (None) if the budget action is "skip".
+    """
+    if judge_usage.budget_exceeded:
+        if judge_usage.budget_action == "deterministic":
+            return deterministic_answer_score(expected_answer, actual_answer)
+        return None
+
+    llm_judgement = _invoke_judge(
+        JUDGE_PROMPT,
         {
             "expected_answer": expected_answer,
             "actual_answer": actual_answer,
         },
+        Score,
+        evaluator,
+        backend,
     )
 
     # Currently not doing anything with other structured output
     # llm_judgement.answer_eval_type
 
     return llm_judgement.score
+
+
+def llm_judge_self_consistent(
+    expected_answer: str,
+    actual_answer: str,
+    samples: int,
+    evaluator: str = "answer",
+    backend: JudgeBackend | None = None,
+) -> tuple[int | None, float | None]:
+    """Judge an answer by majority vote over several sampled judge verdicts.
+
+    Votes are drawn concurrently in waves. Each wave is only as large as the
+    number of votes that could still decide the majority, and voting stops as
+    soon as the leading score can no longer be overtaken by the remaining
+    samples, so clear-cut answers cost about half of ``samples`` calls.
+    Failed votes are dropped; a tie is scored 0.
+
+    Args:
+        expected_answer: Expected answer text
+        actual_answer: Actual answer text
+        samples: Maximum number of votes (an odd number avoids ties)
+        evaluator: Evaluator name for usage accounting
+        backend: Judge backend (default Anthropic)
+
+    Returns:
+        Majority score and its confidence (share of drawn votes that agree
+        with it). The confidence is None when the answer was scored without
+        votes because the judge budget was exceeded.
+
+    """
+    inputs = {"expected_answer": expected_answer, "actual_answer": actual_answer}
+    votes = Counter()
+    drawn = 0
+    last_error = None
+
+    while drawn < samples:
+        counts = [*sorted(votes.values(), reverse=True), 0, 0]
+        lead = counts[0] - counts[1]
+        remaining = samples - drawn
+        if lead > remaining:
+            break
+        if judge_usage.budget_exceeded:
+            break
+
+        # Smallest wave that could decide the vote if it all goes to the leader
+        wave = min((remaining - lead) // 2 + 1, remaining)
+        with ThreadPoolExecutor(max_workers=wave) as executor:
+            # Votes run in the test's context, so their usage and spans are
+            # attributed to its test group and trace track
+            futures = [
+                executor.submit(
+                    contextvars.copy_context().run,
+                    _invoke_judge,
+                    JUDGE_PROMPT,
+                    inputs,
+                    Score,
+                    evaluator,
+                    backend,
+                    sample,
+                )
+                for sample in range(drawn, drawn + wave)
+            ]
+            for future in futures:
+                try:
+                    votes[future.result().score] += 1
+                except Exception as e:
+                    last_error = e
+        drawn += wave
+
+    if not votes:
+        if last_error is not None:
+            raise last_error
+        # Budget exceeded before the first vote
+        return llm_judge(expected_answer, actual_answer, evaluator, backend), None
+
+    ranked = votes.most_common(2)
+    score, count = ranked[0]
+    if len(ranked) > 1 and ranked[1][1] == count:
+        score = 0
+    return score, round(count / votes.total(), 3)
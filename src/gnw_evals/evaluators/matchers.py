@@ -0,0 +1,166 @@
+"""Expectation matchers compiled once per test case.
+
+Expected values are normalized when a test suite is loaded instead of on
+every evaluation: AOI IDs and semicolon multi-values become frozen sets and
+dates are parsed, so evaluating an agent response is a set lookup. Compiling
+in strict mode (as the loader does) rejects unparseable expected dates before
+any API calls are made.
+"""
+
+from functools import lru_cache
+from typing import NamedTuple
+
+from gnw_evals.evaluators.utils import (
+    normalize_date,
+    normalize_gadm_id,
+    normalize_value,
+)
+
+# Suites repeat the same few dates and values on many rows
+cached_normalize_date = lru_cache(maxsize=4096)(normalize_date)
+
+
+def split_values(value) -> frozenset[str]:
+    """Split a semicolon separated expected value into a set of normalized values."""
+    return frozenset(
+        v for v in (normalize_value(part) for part in str(value or "").split(";")) if v
+    )
+
+
+class AOIMatcher(NamedTuple):
+    """Expected AOI IDs, normalized for GADM and for other sources."""
+
+    gadm_ids: frozenset[str] = frozenset()
+    other_ids: frozenset[str] = frozenset()
+
+    @classmethod
+    def compile(cls, expected_aoi_ids: list[str] | tuple[str, ...]) -> "AOIMatcher":
+        """Compile a list of expected AOI IDs."""
+        return cls(
+            frozenset(normalize_gadm_id(i) for i in expected_aoi_ids),
+            frozenset(i.lower() for i in expected_aoi_ids),
+        )
+
+    def matches(self, actual_ids: list[str], source: str) -> bool:
+        """Whether the selected AOIs are exactly the expected ones."""
+        if source == "gadm":
+            return {normalize_gadm_id(i) for i in actual_ids} == self.gadm_ids
+        return {i.lower() for i in actual_ids} == self.other_ids
+
+
+class ValueMatcher(NamedTuple):
+    """Accepted values of a field; any one of them is a match."""
+
+    values: frozenset[str] = frozenset()
+
+    @classmethod
+    def compile(cls, expected, multi_value: bool = True) -> "ValueMatcher":
+        """Compile an expected value, splitting semicolon multi-values."""
+        if multi_value:
+            return cls(split_values(expected))
+        value = normalize_value(expected)
+        return cls(frozenset([value] if value else []))
+
+    def __bool__(self) -> bool:
+        """Whether any value is expected."""
+        return bool(self.values)
+
+    def matches(self, actual) -> bool:
+        """Whether the actual value is one of the expected values."""
+        return normalize_value(actual) in self.values
+
+
+class DateRangeMatcher(NamedTuple):
+    """Expected start and end dates in YYYY-MM-DD form ("" if not given)."""
+
+    start: str = ""
+    end: str = ""
+
+    @classmethod
+    def compile(
+        cls,
+        expected_start_date: str | None,
+        expected_end_date: str | None,
+        strict: bool = False,
+    ) -> "DateRangeMatcher":
+        """Parse the expected dates.
+
+        Args:
+            expected_start_date: Expected start date in any supported format
+            expected_end_date: Expected end date in any supported format
+            strict: Raise ValueError for dates that can't be parsed instead
+                of treating them as missing
+
+        """
+        start = cached_normalize_date(expected_start_date)
+        end = cached_normalize_date(expected_end_date)
+        if strict:
+            for name, value, parsed in (
+                ("expected_start_date", expected_start_date, start),
+                ("expected_end_date", expected_end_date, end),
+            ):
+                if normalize_value(value) and not parsed:
+                    raise ValueError(f"Unparseable {name} '{value}'")
+        return cls(start, end)
+
+    def __bool__(self) -> bool:
+        """Whether both dates are expected."""
+        return bool(self.start and self.end)
+
+    def matches(
+        self,
+        actual_start_date: str | None,
+        actual_end_date: str | None,
+    ) -> bool:
+        """Whether the actual date range equals the expected one."""
+        return (
+            normalize_date(actual_start_date) == self.start
+            and normalize_date(actual_end_date) == self.end
+        )
+
+
+class ExpectationMatchers(NamedTuple):
+    """All compiled expectations of one test case."""
+
+    aoi: AOIMatcher = AOIMatcher()
+    subregion: ValueMatcher = ValueMatcher()
+    dataset_id: ValueMatcher = ValueMatcher()
+    context_layer: ValueMatcher = ValueMatcher()
+    dates: DateRangeMatcher = DateRangeMatcher()
+
+    @classmethod
+    def compile(cls, expected_data, strict: bool = False) -> "ExpectationMatchers":
+        """Compile the expectations of an ExpectedData (see DateRangeMatcher for strict)."""
+        return _compile_expectations(
+            tuple(expected_data.expected_aoi_ids),
+            expected_data.expected_subregion,
+            expected_data.expected_dataset_id,
+            expected_data.expected_context_layer,
+            expected_data.expected_start_date,
+            expected_data.expected_end_date,
+            strict,
+        )
+
+
+@lru_cache(maxsize=16384)
+def _compile_expectations(
+    expected_aoi_ids: tuple[str, ...],
+    expected_subregion: str,
+    expected_dataset_id: str,
+    expected_context_layer: str,
+    expected_start_date: str,
+    expected_end_date: str,
+    strict: bool,
+) -> ExpectationMatchers:
+    """Compile expectations; matchers are immutable, so rows with equal values share them."""
+    return ExpectationMatchers(
+        AOIMatcher.compile(expected_aoi_ids),
+        ValueMatcher.compile(expected_subregion, multi_value=False),
+        ValueMatcher.compile(expected_dataset_id),
+        ValueMatcher.compile(expected_context_layer),
+        DateRangeMatcher.compile(
+            expected_start_date,
+            expected_end_date,
+            strict=strict,
+        ),
+    )
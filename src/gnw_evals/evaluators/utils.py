@@ -1,7 +1,26 @@
 """Utility functions for evaluators."""
 
+import re
 from datetime import datetime
 
+BOOLEAN_WORDS = {"true": True, "yes": True, "false": False, "no": False}
+NUMBER_PATTERN = re.compile(r"-?\d[\d,]*(?:\.\d+)?|-?\.\d+")
+
+# GADM admin level of each subregion name (see expected_subregion in README)
+SUBREGION_LEVELS = {
+    "country": 0,
+    "state": 1,
+    "state-province": 1,
+    "province": 1,
+    "district": 2,
+    "district-county": 2,
+    "county": 2,
+    "municipality": 3,
+    "locality": 4,
+    "neighbourhood": 5,
+    "neighborhood": 5,
+}
+
 
 def normalize_gadm_id(gadm_id: str) -> str:
     """Normalize GADM ID for comparison."""
@@ -64,3 +83,49 @@ def normalize_date(date_str: str | None) -> str:
 
     # Could not parse - treat as missing/invalid
     return ""
+
+
+def _parse_numbers(text: str) -> list[float]:
+    """Extract all numbers from text, ignoring thousands separators."""
+    return [float(n.replace(",", "")) for n in NUMBER_PATTERN.findall(text)]
+
+
+def deterministic_answer_score(expected_answer: str, actual_answer: str) -> int:
+    """Score an answer with rules mirroring the LLM judge prompt, without an LLM.
+
+    Used as a fallback once the judge budget is exhausted. Applies the same
+    answer types as the judge:
+    - BOOLEAN: the first true/false/yes/no word in the answer must agree
+    - YEAR: the expected year must appear in the answer
+    - NUMERIC: any number in the answer within 5% of the expected number
+    - NAMED_ENTITY: case-insensitive containment of the expected answer
+
+    Unit conversions ("200 kha" vs "200,000 hectares") are not handled, so
+    this is stricter than the judge for numeric answers.
+
+    Returns:
+        1 if the answer matches, otherwise 0
+
+    """
+    expected = expected_answer.strip().lower().rstrip(".")
+    actual = actual_answer.lower()
+
+    if expected in BOOLEAN_WORDS:
+        words = re.findall(r"\b(true|false|yes|no)\b", actual)
+        return int(bool(words) and BOOLEAN_WORDS[words[0]] == BOOLEAN_WORDS[expected])
+
+    if re.fullmatch(r"\d{4}", expected):
+        return int(expected in re.findall(r"\b\d{4}\b", actual))
+
+    expected_numbers = _parse_numbers(expected)
+    if expected_numbers:
+        target = expected_numbers[0]
+        for number in _parse_numbers(actual):
+            if target == 0:
+                if number == 0:
+                    return 1
+            elif abs(number - target) / abs(target) <= 0.05:
+                return 1
+        return 0
+
+    return int(expected in actual)
@@ -1,5 +1,6 @@
 """Test runners for E2E testing framework."""
 
 from .api import APITestRunner
+from .archive import ArchiveTestRunner
 
-__all__ = ["APITestRunner"]
+__all__ = ["APITestRunner", "ArchiveTestRunner"]
@@ -1,112 +1,311 @@
 """API test runner for E2E testing framework."""
 
+import asyncio
 import json
-from datetime import datetime
+import time
+from collections import Counter
+from typing import Any
 from uuid import uuid4
 
 import httpx
 from langchain_core.load import loads
 
+from gnw_evals.data_handlers.aoi_index import AOIIndex
+from gnw_evals.data_handlers.sharding import normalize_query
+from gnw_evals.data_handlers.state_archive import StateArchive
+from gnw_evals.evaluators.clarification_classifier import ClarificationClassifier
+from gnw_evals.evaluators.judge_backends import JudgeBackend
+from gnw_evals.evaluators.judge_batch import JudgeBatchQueue
+from gnw_evals.evaluators.judge_usage import current_test_group
 from gnw_evals.runners.base import BaseTestRunner
 from gnw_evals.utils.eval_types import ExpectedData, TestResult
+from gnw_evals.utils.tracing import tracer
 
 
 class APITestRunner(BaseTestRunner):
     """Test runner for API endpoint execution."""
 
-    def __init__(self, api_base_url: str, api_token: str | None = None):
+    def __init__(
+        self,
+        api_base_url: str,
+        api_token: str | None = None,
+        judge_queue: JudgeBatchQueue | None = None,
+        judge_backend: JudgeBackend | None = None,
+        clarification_classifier: ClarificationClassifier | None = None,
+        judge_samples: int = 1,
+        dedupe_queries: bool = False,
+        aoi_index: AOIIndex | None = None,
+        state_archive: StateArchive | None = None,
+    ):
         """Initialize with API configuration."""
         self.api_base_url = api_base_url
         self.api_token = api_token
+        self.judge_queue = judge_queue
+        self.judge_backend = judge_backend
+        self.clarification_classifier = clarification_classifier
+        self.judge_samples = judge_samples
+        self.dedupe_queries = dedupe_queries
+        self.aoi_index = aoi_index
+        self.state_archive = state_archive
+        # Archived state sha256 per thread, for rescoring without the agent
+        # (this and the node timings are dropped once the thread's rows read them)
+        self._state_digests: dict[str, str] = {}
+        # Seconds spent in each agent node per thread, for latency budgets
+        self._node_seconds: dict[str, dict[str, float]] = {}
+        # Agent runs per normalized query, shared by all rows with that query
+        self._agent_runs: dict[str, asyncio.Future] = {}
+        # Registered rows per normalized query that have not read its agent run
+        self._pending_rows: Counter[str] = Counter()
+        self.agent_calls = 0
+        self.agent_calls_saved = 0
 
-    async def run_test(self, query: str, expected_data: ExpectedData) -> TestResult:
-        """Run a single agent test using API endpoint.
+    async def _run_agent(
+        self,
+        query: str,
+        skip_chat: bool = False,
+        decode: bool = True,
+    ) -> tuple[str, str | None, str | None, dict[str, Any]]:
+        """Run the agent on a query and fetch its final state.
 
         Args:
-            query: User query to test
-            expected_data: Expected test results for evaluation
+            query: User query to send
+            skip_chat: Only fetch the thread state without sending the query
+            decode: Decode the state into messages (otherwise it is returned
+                serialized, e.g. when only the requests are timed)
 
         Returns:
-            TestResult with evaluation scores and metadata
+            Thread ID, trace ID, trace URL and final agent state
 
         """
         thread_id = str(uuid4())
+        trace_id = None
         trace_url = None
+        node_seconds = None
+        state_digest = None
 
-        try:
-            # Collect all streaming responses to ensure conversation completes
-            responses = []
-            trace_id = None
-
-            # Prepare request payload
-            payload = {
-                "query": query,
-                "user_persona": "Researcher",
-                "thread_id": thread_id,
-                "metadata": {"langfuse_tags": ["simple_e2e_test"]},
-                "user_id": "test_user",
-            }
-
-            headers = {}
-            if self.api_token:
-                headers["Authorization"] = f"Bearer {self.api_token}"
-
-            # Use httpx async client for streaming
-            async with httpx.AsyncClient(timeout=240.0) as client:
-                if not expected_data.thread_id:
+        # Prepare request payload
+        payload = {
+            "query": query,
+            "user_persona": "Researcher",
+            "thread_id": thread_id,
+            "metadata": {"langfuse_tags": ["simple_e2e_test"]},
+            "user_id": "test_user",
+        }
+
+        headers = {}
+        if self.api_token:
+            headers["Authorization"] = f"Bearer {self.api_token}"
+
+        # Connection phases are traced through httpx's trace extension
+        extensions = {"trace": tracer.httpx_hook()} if tracer.enabled else None
+
+        # Use httpx async client for streaming
+        async with httpx.AsyncClient(timeout=240.0) as client:
+            if not skip_chat:
+                # Collect all streaming responses to ensure conversation completes
+                responses = []
+                with tracer.span("stream", "http"):
                     async with client.stream(
                         "POST",
                         f"{self.api_base_url}/api/chat",
                         json=payload,
                         headers=headers,
+                        extensions=extensions,
                     ) as response:
                         response.raise_for_status()
+                        node_seconds = await self._read_stream(
+                            response,
+                            responses,
+                        )
 
-                        async for line in response.aiter_lines():
-                            if line.strip():
-                                stream_data = json.loads(line)
-                                responses.append(stream_data)
+                for stream_data in responses:
+                    # Capture trace ID from stream
+                    if stream_data.get("node") == "trace_info":
+                        update_data = json.loads(stream_data.get("update", "{}"))
+                        trace_id = update_data.get("trace_id")
+                        trace_url = update_data.get("trace_url")
 
-                                # Capture trace ID from stream
-                                if stream_data.get("node") == "trace_info":
-                                    update_data = json.loads(
-                                        stream_data.get("update", "{}"),
-                                    )
-                                    trace_id = update_data.get("trace_id")
-                                    trace_url = update_data.get("trace_url")
-
-                # Get final agent state using the state endpoint
+            # Get final agent state using the state endpoint
+            with tracer.span("state_fetch", "http"):
                 state_response = await client.get(
                     f"{self.api_base_url}/api/threads/{thread_id}/state",
                     headers=headers,
+                    extensions=extensions,
                 )
                 state_response.raise_for_status()
                 response_data = state_response.json()
-                agent_state = response_data.get("state", {})
-                agent_state = loads(agent_state)
-
-            # Run evaluations
-            evaluations = self._run_evaluations(agent_state, expected_data, query)
-            overall_score = self._calculate_overall_score(evaluations, expected_data)
-
-            kwargs = expected_data.to_dict()
-            kwargs.update(evaluations)
-            kwargs.pop("thread_id", None)
-            kwargs.pop("trace_id", None)
-            kwargs.pop("trace_url", None)
-            kwargs.pop("query", None)
-            kwargs.pop("overall_score", None)
-            kwargs.pop("execution_time", None)
-
-            return TestResult(
-                thread_id=thread_id,
-                trace_id=trace_id,
-                trace_url=trace_url,
-                query=query,
-                overall_score=overall_score,
-                execution_time=datetime.now().isoformat(),
-                **kwargs,
+            agent_state = response_data.get("state", {})
+            if self.state_archive is not None:
+                with tracer.span("archive_state"):
+                    state_digest = await asyncio.to_thread(
+                        self.state_archive.put,
+                        agent_state,
+                    )
+            if decode:
+                with tracer.span("decode"):
+                    agent_state = loads(agent_state)
+
+        # Kept only for runs that finished, until their rows have read them
+        if node_seconds is not None:
+            self._node_seconds[thread_id] = node_seconds
+        if state_digest is not None:
+            self._state_digests[thread_id] = state_digest
+        return thread_id, trace_id, trace_url, agent_state
+
+    async def _read_stream(
+        self,
+        response: httpx.Response,
+        responses: list[dict[str, Any]],
+    ) -> dict[str, float]:
+        """Collect the streamed node updates of an agent run.
+
+        The time up to each update is attributed to the node that sent it
+        (and recorded as a span of that node when tracing).
+
+        Returns:
+            Seconds spent in each node
+
+        """
+        node_seconds: dict[str, float] = {}
+        last = time.perf_counter()
+        async for line in response.aiter_lines():
+            if line.strip():
+                stream_data = json.loads(line)
+                responses.append(stream_data)
+                now = time.perf_counter()
+                node = stream_data.get("node") or "unknown"
+                node_seconds[node] = node_seconds.get(node, 0.0) + now - last
+                tracer.add_span(f"node:{node}", last, now, "agent")
+                last = now
+        return {node: round(seconds, 3) for node, seconds in node_seconds.items()}
+
+    def register_test(self, query: str, expected_data: ExpectedData) -> None:
+        """Announce a queued test, so a shared agent run is kept until it has run.
+
+        With query dedupe, an agent run (and its decoded state) is dropped
+        once every registered row of its query has read it, so memory does
+        not grow with the suite. A row of the query that is registered after
+        that gets a new agent run.
+        """
+        if self.dedupe_queries and not expected_data.thread_id:
+            self._pending_rows[normalize_query(query)] += 1
+
+    def _pop_run_details(
+        self,
+        thread_id: str,
+    ) -> tuple[str | None, dict[str, float] | None]:
+        """Drop and return the archived state digest and node timings of a thread."""
+        return (
+            self._state_digests.pop(thread_id, None),
+            self._node_seconds.pop(thread_id, None),
+        )
+
+    def _forget_agent_run(self, agent_run: asyncio.Future) -> None:
+        """Drop the details of a shared agent run once it is done."""
+        if not agent_run.cancelled() and agent_run.exception() is None:
+            self._pop_run_details(agent_run.result()[0])
+
+    def _release_agent_run(self, key: str) -> None:
+        """Drop a shared agent run once no registered row is waiting for it."""
+        self._pending_rows[key] -= 1
+        if self._pending_rows[key] <= 0:
+            del self._pending_rows[key]
+            agent_run = self._agent_runs.pop(key, None)
+            if agent_run is not None:
+                agent_run.add_done_callback(self._forget_agent_run)
+
+    async def _get_agent_run(
+        self,
+        query: str,
+        expected_data: ExpectedData,
+    ) -> tuple[
+        str,
+        str | None,
+        str | None,
+        dict[str, Any],
+        str | None,
+        dict[str, float] | None,
+    ]:
+        """Return the agent run for a test, shared by rows with the same query.
+
+        With query dedupe the first row of a query starts the agent run and
+        later rows await the same run, until the last registered row of the
+        query has read it; rows pinned to a thread_id always get their own.
+
+        Returns:
+            Thread ID, trace ID, trace URL, final agent state, archived state
+            digest and node timings (dropped from the runner once read)
+
+        """
+        if not self.dedupe_queries or expected_data.thread_id:
+            self.agent_calls += 1
+            agent_run = await self._run_agent(
+                query,
+                skip_chat=bool(expected_data.thread_id),
+            )
+            return *agent_run, *self._pop_run_details(agent_run[0])
+
+        key = normalize_query(query)
+        agent_run = self._agent_runs.get(key)
+        if agent_run is None:
+            self.agent_calls += 1
+            agent_run = asyncio.ensure_future(self._run_agent(query))
+            self._agent_runs[key] = agent_run
+        else:
+            self.agent_calls_saved += 1
+        try:
+            # Shielded so one cancelled test doesn't cancel the run for the others
+            thread_id, *run = await asyncio.shield(agent_run)
+            # Read before the release, which drops them after the last row
+            return (
+                thread_id,
+                *run,
+                self._state_digests.get(thread_id),
+                self._node_seconds.get(thread_id),
+            )
+        finally:
+            self._release_agent_run(key)
+
+    async def run_test(self, query: str, expected_data: ExpectedData) -> TestResult:
+        """Run a single agent test using API endpoint.
+
+        Args:
+            query: User query to test
+            expected_data: Expected test results for evaluation
+
+        Returns:
+            TestResult with evaluation scores and metadata
+
+        """
+        thread_id = str(uuid4())
+        trace_url = None
+        # Attribute judge usage of this test to its test group
+        current_test_group.set(expected_data.test_group)
+
+        try:
+            (
+                thread_id,
+                trace_id,
+                trace_url,
+                agent_state,
+                state_sha256,
+                node_seconds,
+            ) = await self._get_agent_run(query, expected_data)
+
+            # Run evaluations in a worker thread so blocking judge calls
+            # don't stall the other tests running on the event loop
+            result = await asyncio.to_thread(
+                self._create_evaluation_result,
+                thread_id,
+                trace_id,
+                trace_url,
+                query,
+                expected_data,
+                agent_state,
             )
+            result.state_sha256 = state_sha256
+            result.node_seconds = node_seconds
+            return result
 
         except Exception as e:
             print(f"Error: {e}")
@@ -116,4 +315,5 @@ class APITestRunner(BaseTestRunner):
                 query,
                 expected_data,
                 str(e),
+                type(e).__name__,
             )
@@ -0,0 +1,217 @@
+"""Archive test runner for rescoring runs offline.
+
+Re-evaluates the agent states archived by an earlier run (see
+``data_handlers.state_archive``) instead of calling the agent, so changes to
+the evaluators or to the overall scoring can be measured on the exact same
+agent responses. Rescoring is CPU bound, so it is spread over processes.
+"""
+
+import asyncio
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from langchain_core.load import loads
+
+from gnw_evals.data_handlers.aoi_index import AOIIndex
+from gnw_evals.data_handlers.state_archive import StateArchive
+from gnw_evals.evaluators.clarification_classifier import ClarificationClassifier
+from gnw_evals.evaluators.judge_backends import JudgeBackend, create_judge_backend
+from gnw_evals.runners.base import BaseTestRunner
+from gnw_evals.utils.eval_types import SCORE_FIELDS, ExpectedData, TestResult
+
+# Fields of the original result that rescoring keeps as they were
+RUN_FIELDS = {
+    "thread_id",
+    "trace_id",
+    "trace_url",
+    "test_id",
+    "execution_time",
+    "duration_seconds",
+    "node_seconds",
+    "state_sha256",
+    "source",
+}
+
+# Result chunks per worker process, so slow chunks don't leave processes idle
+CHUNKS_PER_WORKER = 4
+
+
+class ArchiveTestRunner(BaseTestRunner):
+    """Test runner that evaluates archived agent states instead of the agent."""
+
+    def __init__(
+        self,
+        state_archive: StateArchive,
+        state_by_thread: dict[str, str],
+        judge_backend: JudgeBackend | None = None,
+        clarification_classifier: ClarificationClassifier | None = None,
+        aoi_index: AOIIndex | None = None,
+    ):
+        """Initialize with the archive of an earlier run.
+
+        Args:
+            state_archive: Archive holding the agent states
+            state_by_thread: Archived state sha256 per thread_id
+            judge_backend: Judge backend for the evaluators (optional)
+            clarification_classifier: Clarification heuristic (optional)
+            aoi_index: AOI reference index (optional)
+
+        """
+        self.state_archive = state_archive
+        self.state_by_thread = state_by_thread
+        self.judge_backend = judge_backend
+        self.clarification_classifier = clarification_classifier
+        self.aoi_index = aoi_index
+
+    async def run_test(self, query: str, expected_data: ExpectedData) -> TestResult:
+        """Evaluate the archived agent state of a test's thread.
+
+        Args:
+            query: User query of the test
+            expected_data: Expected test results, with the thread_id of the
+                original run
+
+        Returns:
+            TestResult with evaluation scores and metadata
+
+        """
+        thread_id = expected_data.thread_id or ""
+        state_sha256 = self.state_by_thread.get(thread_id)
+        if state_sha256 is None or state_sha256 not in self.state_archive:
+            return self._create_empty_evaluation_result(
+                thread_id,
+                "",
+                query,
+                expected_data,
+                "No archived agent state",
+                "MissingState",
+            )
+
+        try:
+            agent_state = loads(self.state_archive.get(state_sha256))
+            return self._create_evaluation_result(
+                thread_id,
+                None,
+                None,
+                query,
+                expected_data,
+                agent_state,
+            )
+        except Exception as e:
+            print(f"Error: {e}")
+            return self._create_empty_evaluation_result(
+                thread_id,
+                "",
+                query,
+                expected_data,
+                str(e),
+                type(e).__name__,
+            )
+
+    async def rescore(self, result: TestResult) -> TestResult:
+        """Re-evaluate one result of an earlier run, keeping its run fields."""
+        expected_data = ExpectedData(
+            **result.model_dump(include=set(ExpectedData.model_fields)),
+        )
+        rescored = await self.run_test(result.query, expected_data)
+        return result.model_copy(update=rescored.model_dump(exclude=RUN_FIELDS))
+
+
+def _rescore_chunk(
+    states_dir: str,
+    results: list[TestResult],
+    judge_backend: str,
+    judge_cache: str | None,
+    clarification_thresholds: tuple[float, float] | None,
+    aoi_index: str | None,
+) -> list[TestResult]:
+    """Rescore a chunk of results (runs in a worker process)."""
+    runner = ArchiveTestRunner(
+        StateArchive(states_dir),
+        {r.thread_id: r.state_sha256 for r in results if r.state_sha256},
+        judge_backend=create_judge_backend(judge_backend, judge_cache),
+        clarification_classifier=(
+            ClarificationClassifier(*clarification_thresholds)
+            if clarification_thresholds
+            else None
+        ),
+        aoi_index=AOIIndex.load(aoi_index) if aoi_index else None,
+    )
+
+    async def rescore_all() -> list[TestResult]:
+        return [await runner.rescore(result) for result in results]
+
+    return asyncio.run(rescore_all())
+
+
+def rescore_results(
+    results: list[TestResult],
+    states_dir: str | Path,
+    judge_backend: str = "anthropic",
+    judge_cache: str | None = None,
+    clarification_thresholds: tuple[float, float] | None = None,
+    aoi_index: str | None = None,
+    num_workers: int = 1,
+) -> list[TestResult]:
+    """Rescore the results of an earlier run from its archived agent states.
+
+    Args:
+        results: Results of the earlier run (e.g. from ``load_results_csv``)
+        states_dir: Directory of the run's state archive
+        judge_backend: Judge backend spec (see ``create_judge_backend``)
+        judge_cache: Judge cache file verdicts are appended to (optional)
+        clarification_thresholds: Clarification heuristic thresholds, or
+            None to send every clarification check to the judge
+        aoi_index: Path of an AOI reference index (optional)
+        num_workers: Worker processes (1 rescores in this process)
+
+    Returns:
+        Rescored results in the order of ``results``
+
+    """
+    args = (judge_backend, judge_cache, clarification_thresholds, aoi_index)
+    if num_workers == 1 or len(results) <= 1:
+        return _rescore_chunk(str(states_dir), results, *args)
+
+    chunk_size = math.ceil(len(results) / (num_workers * CHUNKS_PER_WORKER))
+    # Spawned rather than forked, as the parent may be running threads
+    with ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as pool:
+        futures = [
+            pool.submit(
+                _rescore_chunk,
+                str(states_dir),
+                results[start : start + chunk_size],
+                *args,
+            )
+            for start in range(0, len(results), chunk_size)
+        ]
+        return [result for future in futures for result in future.result()]
+
+
+def score_diff(
+    before: list[TestResult],
+    after: list[TestResult],
+) -> list[dict[str, Any]]:
+    """Return one row per changed score of each test, in test order."""
+    rows = []
+    for old, new in zip(before, after, strict=True):
+        for field in SCORE_FIELDS:
+            old_score, new_score = getattr(old, field), getattr(new, field)
+            if old_score != new_score:
+                rows.append(
+                    {
+                        "query": old.query,
+                        "test_id": old.test_id,
+                        "thread_id": old.thread_id,
+                        "score": field,
+                        "before": old_score,
+                        "after": new_score,
+                    },
+                )
+    return rows
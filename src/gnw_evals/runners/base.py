@@ -4,18 +4,37 @@ from abc import ABC, abstractmethod
 from datetime import datetime
 from typing import Any
 
+from gnw_evals.data_handlers.aoi_index import AOIIndex
 from gnw_evals.evaluators import (
     evaluate_aoi_selection,
     evaluate_data_pull,
     evaluate_dataset_selection,
     evaluate_final_answer,
 )
+from gnw_evals.evaluators.clarification_classifier import ClarificationClassifier
+from gnw_evals.evaluators.judge_backends import JudgeBackend
+from gnw_evals.evaluators.judge_batch import JudgeBatchQueue
+from gnw_evals.evaluators.matchers import ExpectationMatchers
 from gnw_evals.utils.eval_types import ExpectedData, TestResult
+from gnw_evals.utils.tracing import tracer
 
 
 class BaseTestRunner(ABC):
     """Abstract base class for test runners."""
 
+    # When set, answer judging is deferred to a batch phase after the run
+    judge_queue: JudgeBatchQueue | None = None
+    # Judge backend injected into the evaluators (None uses the Anthropic default)
+    judge_backend: JudgeBackend | None = None
+    # Decides clear clarification cases without a judge call when set
+    clarification_classifier: ClarificationClassifier | None = None
+    # Self-consistency votes per answer judgement (1 is a single greedy verdict)
+    judge_samples: int = 1
+    # Run the agent once per unique query and evaluate every row against it
+    dedupe_queries: bool = False
+    # Known AOI IDs for hierarchy-aware AOI evaluation (optional)
+    aoi_index: AOIIndex | None = None
+
     @abstractmethod
     async def run_test(self, query: str, expected_data: ExpectedData) -> TestResult:
         """Run a single E2E test.
@@ -30,6 +49,9 @@ class BaseTestRunner(ABC):
         """
         pass
 
+    def register_test(self, query: str, expected_data: ExpectedData) -> None:
+        """Announce a test queued to run (a no-op unless the runner shares work)."""
+
     def _create_empty_evaluation_result(
         self,
         thread_id: str,
@@ -37,6 +59,7 @@ class BaseTestRunner(ABC):
         query: str,
         expected_data: ExpectedData,
         error: str,
+        error_type: str | None = None,
     ) -> TestResult:
         """Create empty evaluation result for error cases."""
         kwargs = expected_data.to_dict()
@@ -83,6 +106,8 @@ class BaseTestRunner(ABC):
             # Answer evaluation fields
             charts_answer_score=None,
             agent_answer_score=None,
+            charts_answer_confidence=None,
+            agent_answer_confidence=None,
             actual_charts_answer=None,
             actual_agent_answer=None,
             # Clarification evaluation fields
@@ -91,6 +116,39 @@ class BaseTestRunner(ABC):
             **kwargs,
             # Error
             error=error,
+            error_type=error_type,
+        )
+
+    def _create_evaluation_result(
+        self,
+        thread_id: str,
+        trace_id: str | None,
+        trace_url: str | None,
+        query: str,
+        expected_data: ExpectedData,
+        agent_state: dict[str, Any],
+    ) -> TestResult:
+        """Evaluate an agent state and build the scored test result."""
+        evaluations = self._run_evaluations(agent_state, expected_data, query)
+        overall_score = self._calculate_overall_score(evaluations, expected_data)
+
+        kwargs = expected_data.to_dict()
+        kwargs.update(evaluations)
+        kwargs.pop("thread_id", None)
+        kwargs.pop("trace_id", None)
+        kwargs.pop("trace_url", None)
+        kwargs.pop("query", None)
+        kwargs.pop("overall_score", None)
+        kwargs.pop("execution_time", None)
+
+        return TestResult(
+            thread_id=thread_id,
+            trace_id=trace_id,
+            trace_url=trace_url,
+            query=query,
+            overall_score=overall_score,
+            execution_time=datetime.now().isoformat(),
+            **kwargs,
         )
 
     def _run_evaluations(
@@ -100,32 +158,51 @@ class BaseTestRunner(ABC):
         query: str = "",
     ) -> dict[str, Any]:
         """Run all evaluation functions on agent state."""
-        aoi_eval = evaluate_aoi_selection(
-            agent_state,
-            expected_data.expected_aoi_ids,
-            expected_data.expected_subregion,
-            expected_data.expected_clarification,
-            query,
-        )
-        dataset_eval = evaluate_dataset_selection(
-            agent_state,
-            expected_data.expected_dataset_id,
-            expected_data.expected_context_layer,
-            expected_data.expected_clarification,
-            query,
-        )
-        data_eval = evaluate_data_pull(
-            agent_state,
-            expected_start_date=expected_data.expected_start_date,
-            expected_end_date=expected_data.expected_end_date,
-            expected_clarification=expected_data.expected_clarification,
-            query=query,
-        )
-        answer_eval = evaluate_final_answer(
-            agent_state,
-            expected_data.expected_answer,
-            expected_data.expected_clarification,
-        )
+        # Compiled by the loader; test cases built elsewhere are compiled here
+        matchers = expected_data.matchers or ExpectationMatchers.compile(expected_data)
+        with tracer.span("evaluate_aoi_selection"):
+            aoi_eval = evaluate_aoi_selection(
+                agent_state,
+                expected_data.expected_aoi_ids,
+                expected_data.expected_subregion,
+                expected_data.expected_clarification,
+                query,
+                judge_backend=self.judge_backend,
+                clarification_classifier=self.clarification_classifier,
+                matchers=matchers,
+                aoi_index=self.aoi_index,
+            )
+        with tracer.span("evaluate_dataset_selection"):
+            dataset_eval = evaluate_dataset_selection(
+                agent_state,
+                expected_data.expected_dataset_id,
+                expected_data.expected_context_layer,
+                expected_data.expected_clarification,
+                query,
+                judge_backend=self.judge_backend,
+                clarification_classifier=self.clarification_classifier,
+                matchers=matchers,
+            )
+        with tracer.span("evaluate_data_pull"):
+            data_eval = evaluate_data_pull(
+                agent_state,
+                expected_start_date=expected_data.expected_start_date,
+                expected_end_date=expected_data.expected_end_date,
+                expected_clarification=expected_data.expected_clarification,
+                query=query,
+                judge_backend=self.judge_backend,
+                clarification_classifier=self.clarification_classifier,
+                matchers=matchers,
+            )
+        with tracer.span("evaluate_final_answer"):
+            answer_eval = evaluate_final_answer(
+                agent_state,
+                expected_data.expected_answer,
+                expected_data.expected_clarification,
+                judge_queue=self.judge_queue,
+                judge_backend=self.judge_backend,
+                judge_samples=self.judge_samples,
+            )
 
         return {
             **aoi_eval,
@@ -0,0 +1,254 @@
+"""Open-loop load generation against the agent API.
+
+The regular runners are closed-loop: a fixed number of workers each wait for
+their test before starting the next, so when the agent slows down fewer
+requests are sent and the slowdown is hidden. Here conversations are started
+at a target arrival rate (constant, ramp or step profile) regardless of how
+many are still running, with queries drawn from the test suite.
+
+Latency is measured from each request's intended start time rather than from
+when it was actually sent (coordinated-omission correction), so time spent
+waiting on an in-flight cap or a stalled event loop is counted as latency
+instead of silently dropped. The uncorrected service time is kept alongside.
+"""
+
+import asyncio
+import math
+import random
+import time
+from typing import Any
+
+import numpy as np
+
+from gnw_evals.runners.api import APITestRunner
+from gnw_evals.utils.eval_types import ExpectedData
+
+PROFILES = ["constant", "ramp", "step"]
+
+# Latency percentiles reported over the whole run
+LOAD_PERCENTILES = [50, 90, 99, 99.9]
+
+
+def arrival_rate(
+    profile: str,
+    t: float,
+    rate: float,
+    peak_rate: float,
+    duration: float,
+    steps: int,
+) -> float:
+    """Target arrivals per second at ``t`` seconds into the run.
+
+    Args:
+        profile: "constant" (``rate`` throughout), "ramp" (linear from
+            ``rate`` to ``peak_rate``) or "step" (``steps`` equal steps from
+            ``rate`` to ``peak_rate``)
+        t: Seconds since the start of the run
+        rate: Starting (or constant) arrival rate
+        peak_rate: Final arrival rate of ramp and step profiles
+        duration: Length of the run in seconds
+        steps: Number of rate steps of the step profile
+
+    Returns:
+        Arrival rate in requests per second
+
+    """
+    if profile == "constant":
+        return rate
+    progress = min(t / duration, 1.0)
+    if profile == "ramp":
+        return rate + (peak_rate - rate) * progress
+    if profile == "step":
+        step = min(math.floor(progress * steps), steps - 1)
+        return rate + (peak_rate - rate) * step / max(steps - 1, 1)
+    raise ValueError(f"Unknown load profile: {profile}")
+
+
+def arrival_times(
+    profile: str,
+    rate: float,
+    duration: float,
+    peak_rate: float | None = None,
+    steps: int = 4,
+    poisson: bool = True,
+    seed: int = 0,
+) -> list[float]:
+    """Return the intended start times of all requests, in seconds from start.
+
+    Gaps are exponential (a Poisson process, like independent users) or
+    uniform, at the profile's rate at the time of the previous arrival.
+    """
+    peak_rate = rate if peak_rate is None else peak_rate
+    rng = random.Random(seed)
+    times = []
+    t = 0.0
+    while True:
+        current = arrival_rate(profile, t, rate, peak_rate, duration, steps)
+        t += rng.expovariate(current) if poisson else 1.0 / current
+        if t >= duration:
+            return times
+        times.append(t)
+
+
+async def _send(
+    runner: APITestRunner,
+    test_case: ExpectedData,
+    intended: float,
+    origin: float,
+    evaluate: bool,
+    in_flight: asyncio.Semaphore,
+) -> dict[str, Any]:
+    """Send one conversation and time it from its intended start."""
+    async with in_flight:
+        sent = time.perf_counter()
+        error_type = None
+        node_seconds = None
+        try:
+            if evaluate:
+                result = await runner.run_test(test_case.query, test_case)
+                error_type = result.error_type
+                node_seconds = result.node_seconds
+            else:
+                # Decoding the state is harness work that would delay the
+                # other in-flight requests, and nothing reads it here
+                thread_id, *_ = await runner._run_agent(test_case.query, decode=False)
+                node_seconds = runner._node_seconds.pop(thread_id, None)
+        except Exception as e:
+            error_type = type(e).__name__
+        done = time.perf_counter()
+    return {
+        "intended_s": round(intended - origin, 4),
+        "sent_s": round(sent - origin, 4),
+        "latency_s": round(done - intended, 4),
+        "service_s": round(done - sent, 4),
+        "dispatch_lag_s": round(sent - intended, 4),
+        "test_group": test_case.test_group,
+        "query": test_case.query,
+        "error_type": error_type,
+        "node_seconds": node_seconds,
+    }
+
+
+async def run_load(
+    runner: APITestRunner,
+    test_cases: list[ExpectedData],
+    arrivals: list[float],
+    evaluate: bool = False,
+    max_in_flight: int | None = None,
+    seed: int = 0,
+) -> list[dict[str, Any]]:
+    """Start a conversation at every arrival time and wait for all of them.
+
+    Args:
+        runner: API runner the conversations are sent with
+        test_cases: Suite the queries are drawn from (shuffled, cycled)
+        arrivals: Intended start times in seconds, from ``arrival_times``
+        evaluate: Also evaluate every response (otherwise only the chat and
+            state requests are timed)
+        max_in_flight: Cap on concurrent conversations (None for no cap);
+            requests over the cap wait, and the wait counts as latency
+        seed: Random seed of the query order
+
+    Returns:
+        One record per request, in arrival order
+
+    """
+    order = list(test_cases)
+    random.Random(seed).shuffle(order)
+    in_flight = asyncio.Semaphore(max_in_flight or len(arrivals) or 1)
+    origin = time.perf_counter()
+    tasks = []
+    for i, offset in enumerate(arrivals):
+        intended = origin + offset
+        delay = intended - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(
+            asyncio.create_task(
+                _send(
+                    runner,
+                    order[i % len(order)],
+                    intended,
+                    origin,
+                    evaluate,
+                    in_flight,
+                ),
+            ),
+        )
+    return list(await asyncio.gather(*tasks))
+
+
+def _percentiles(values: np.ndarray) -> dict[str, float | None]:
+    """Latency percentiles and max of a sample, in seconds."""
+    if not len(values):
+        return {**{f"p{p:g}": None for p in LOAD_PERCENTILES}, "max": None}
+    quantiles = np.percentile(values, LOAD_PERCENTILES)
+    return {
+        **{
+            f"p{p:g}": round(float(q), 4)
+            for p, q in zip(LOAD_PERCENTILES, quantiles, strict=True)
+        },
+        "max": round(float(values.max()), 4),
+    }
+
+
+def summarize_load(
+    records: list[dict[str, Any]],
+    duration: float,
+    window: float = 10.0,
+) -> dict[str, Any]:
+    """Summarize a load run over all requests and per time window.
+
+    Args:
+        records: Request records from ``run_load``
+        duration: Intended length of the run in seconds
+        window: Seconds per timeline window (by intended start time)
+
+    Returns:
+        Dict with request, error and throughput counts, corrected and
+        service latency percentiles, and a timeline of offered and achieved
+        rates and latency per window
+
+    """
+    if not records:
+        return {"requests": 0}
+
+    intended = np.array([r["intended_s"] for r in records])
+    latency = np.array([r["latency_s"] for r in records])
+    service = np.array([r["service_s"] for r in records])
+    lag = np.array([r["dispatch_lag_s"] for r in records])
+    failed = np.array([r["error_type"] is not None for r in records])
+    finished = intended + latency
+
+    timeline = []
+    for start in np.arange(0.0, duration, window):
+        in_window = (intended >= start) & (intended < start + window)
+        span = min(window, duration - start)
+        done = (finished >= start) & (finished < start + window)
+        timeline.append(
+            {
+                "start_s": float(start),
+                "offered_per_s": round(int(in_window.sum()) / span, 3),
+                "completed_per_s": round(int((done & ~failed).sum()) / span, 3),
+                "error_rate": round(float(failed[in_window].mean()), 4)
+                if in_window.any()
+                else None,
+                **{
+                    f"latency_{k}": v
+                    for k, v in _percentiles(latency[in_window]).items()
+                    if k in {"p50", "p99"}
+                },
+            },
+        )
+
+    return {
+        "requests": len(records),
+        "errors": int(failed.sum()),
+        "error_rate": round(float(failed.mean()), 4),
+        "offered_per_s": round(len(records) / duration, 3),
+        "completed_per_s": round(int((~failed).sum()) / float(finished.max()), 3),
+        "latency_seconds": _percentiles(latency[~failed]),
+        "service_seconds": _percentiles(service[~failed]),
+        "dispatch_lag_seconds": _percentiles(lag),
+        "timeline": timeline,
+    }
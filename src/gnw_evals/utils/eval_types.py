@@ -2,7 +2,21 @@
 
 from typing import Any
 
-from pydantic import BaseModel, ConfigDict, field_validator
+from pydantic import BaseModel, ConfigDict, PrivateAttr, field_validator
+
+# Score columns of a result, compared across runs and rescores
+SCORE_FIELDS = [
+    "overall_score",
+    "aoi_id_match_score",
+    "subregion_match_score",
+    "dataset_id_match_score",
+    "context_layer_match_score",
+    "data_pull_exists_score",
+    "date_match_score",
+    "charts_answer_score",
+    "agent_answer_score",
+    "clarification_requested_score",
+]
 
 
 class TestResult(BaseModel):
@@ -14,8 +28,16 @@ class TestResult(BaseModel):
     trace_id: str | None = None
     trace_url: str | None = None
     query: str
+    # Stable hash of the normalized query and expected_* values, keying sharding,
+    # shard merges, the run history and run diffs
+    test_id: str | None = None
     overall_score: float
     execution_time: str
+    duration_seconds: float | None = None
+    # Seconds the agent spent in each node, from the streamed node updates
+    node_seconds: dict[str, float] | None = None
+    # sha256 of the archived raw agent state (see data_handlers.state_archive)
+    state_sha256: str | None = None
 
     # AOI evaluation fields - separate binary scores (0/1/None)
     aoi_id_match_score: float | None = None
@@ -27,6 +49,8 @@ class TestResult(BaseModel):
     actual_subregion: str | None = None
     match_aoi_id: bool = False
     match_subregion: bool | None = None
+    # Hierarchy relation per expected AOI, only set with an AOI reference index
+    aoi_relation: str | None = None
 
     # Dataset evaluation fields - separate binary scores (0/1/None)
     dataset_id_match_score: float | None = None
@@ -48,6 +72,9 @@ class TestResult(BaseModel):
     # Answer evaluation fields
     charts_answer_score: float | None = None
     agent_answer_score: float | None = None
+    # Share of self-consistency votes agreeing with the score (None for single-vote judging)
+    charts_answer_confidence: float | None = None
+    agent_answer_confidence: float | None = None
     actual_charts_answer: str | None = None
     actual_agent_answer: str | None = None
 
@@ -70,6 +97,8 @@ class TestResult(BaseModel):
 
     # Error handling
     error: str | None = None
+    # Exception class of the error, used to group failures in the summary
+    error_type: str | None = None
 
     def to_dict(self) -> dict[str, Any]:
         """Convert to dictionary for CSV export."""
@@ -79,7 +108,8 @@ class TestResult(BaseModel):
 class ExpectedData(BaseModel):
     """Expected test data for evaluation."""
 
-    model_config = ConfigDict(extra="allow")
+    # Native suite formats (JSONL, Parquet) may hold IDs as numbers
+    model_config = ConfigDict(extra="allow", coerce_numbers_to_str=True)
 
     expected_aoi_ids: list[str] = []
     expected_subregion: str = ""
@@ -95,12 +125,24 @@ class ExpectedData(BaseModel):
     status: str = "ready"
     thread_id: str | None = None
 
+    # ExpectationMatchers compiled by the loader (see evaluators.matchers)
+    _matchers: Any = PrivateAttr(default=None)
+
+    @property
+    def matchers(self) -> Any:
+        """Compiled expectation matchers, or None if not compiled yet."""
+        return self._matchers
+
+    @matchers.setter
+    def matchers(self, matchers: Any) -> None:
+        self._matchers = matchers
+
     @field_validator("expected_aoi_ids", mode="before")
     @classmethod
     def split_aoi_ids(cls, v: str | list[str]) -> list[str]:
         """Split string input into a list of strings."""
         if isinstance(v, list):
-            return v
+            return [str(item).strip() for item in v if str(item).strip()]
         if isinstance(v, str):
             # Split by comma and strip whitespace, filter out empty strings
             return [item.strip() for item in v.split(";") if item.strip()]
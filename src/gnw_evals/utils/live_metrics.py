@@ -0,0 +1,278 @@
+"""Live run metrics.
+
+While a run is in progress, ``run_metrics`` tracks tests queued and in
+flight, completions, errors, a rolling window of test latencies and the judge
+calls in flight. The metrics can be scraped from a local endpoint in the
+Prometheus text format (``MetricsServer``) and printed as a compact status
+line (``print_live_status``), so saturation is visible during the run rather
+than only in the CSV written at the end.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latest test durations the rolling latency percentiles are computed over
+LATENCY_WINDOW = 200
+
+# Seconds of completions the completed/sec rate is computed over
+RATE_WINDOW = 30.0
+
+# Rolling latency percentiles reported
+LATENCY_QUANTILES = [0.5, 0.95]
+
+METRIC_PREFIX = "gnw_evals"
+
+
+def _quantile(values: list[float], q: float) -> float:
+    """Nearest-rank quantile of sorted values."""
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class RunMetrics:
+    """Thread-safe counters and gauges of the run in progress."""
+
+    def __init__(self):
+        """Initialize empty metrics."""
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear all metrics and queue gauges, starting the rate clock now."""
+        with self._lock:
+            self.started_at = time.monotonic()
+            self.queued = 0
+            self.in_flight = 0
+            self.started = 0
+            self.completed = 0
+            self.errors = 0
+            self.judge_in_flight = 0
+            self.judge_calls = 0
+            self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+            self._latency_sum = 0.0
+            self._completions: deque[float] = deque()
+            self._queues: dict[str, Callable[[], int]] = {}
+
+    def test_queued(self, count: int = 1) -> None:
+        """Record tests waiting for a worker."""
+        with self._lock:
+            self.queued += count
+
+    def test_started(self) -> None:
+        """Record a test picked up by a worker."""
+        with self._lock:
+            self.queued = max(0, self.queued - 1)
+            self.in_flight += 1
+            self.started += 1
+
+    def test_finished(self, duration: float, error: bool = False) -> None:
+        """Record a finished test with its duration and whether it errored."""
+        now = time.monotonic()
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+            self.errors += error
+            self._latencies.append(duration)
+            self._latency_sum += duration
+            self._completions.append(now)
+            while self._completions[0] < now - RATE_WINDOW:
+                self._completions.popleft()
+
+    def judge_started(self) -> None:
+        """Record a judge call sent to the backend."""
+        with self._lock:
+            self.judge_in_flight += 1
+            self.judge_calls += 1
+
+    def judge_finished(self) -> None:
+        """Record a judge call that returned or failed."""
+        with self._lock:
+            self.judge_in_flight -= 1
+
+    def watch_queue(self, name: str, depth: Callable[[], int]) -> None:
+        """Report the depth of a queue, read whenever metrics are collected."""
+        with self._lock:
+            self._queues[name] = depth
+
+    def snapshot(self) -> dict:
+        """Return a consistent copy of all metrics."""
+        now = time.monotonic()
+        with self._lock:
+            latencies = sorted(self._latencies)
+            window = min(RATE_WINDOW, now - self.started_at)
+            recent = sum(1 for t in self._completions if t >= now - RATE_WINDOW)
+            return {
+                "queued": self.queued,
+                "in_flight": self.in_flight,
+                "started": self.started,
+                "completed": self.completed,
+                "errors": self.errors,
+                "error_rate": self.errors / self.completed if self.completed else 0.0,
+                "completed_per_second": recent / window if window > 0 else 0.0,
+                "latency": {
+                    q: _quantile(latencies, q) if latencies else None
+                    for q in LATENCY_QUANTILES
+                },
+                "latency_sum": self._latency_sum,
+                "judge_in_flight": self.judge_in_flight,
+                "judge_calls": self.judge_calls,
+                "queues": {name: depth() for name, depth in self._queues.items()},
+            }
+
+    def render_prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        s = self.snapshot()
+        p = METRIC_PREFIX
+        lines = []
+
+        def metric(name: str, kind: str, doc: str, samples: list[tuple]) -> None:
+            lines.append(f"# HELP {p}_{name} {doc}")
+            lines.append(f"# TYPE {p}_{name} {kind}")
+            for suffix, labels, value in samples:
+                labels = "{" + labels + "}" if labels else ""
+                lines.append(f"{p}_{name}{suffix}{labels} {value}")
+
+        metric(
+            "tests_queued",
+            "gauge",
+            "Tests waiting for a worker.",
+            [("", "", s["queued"])],
+        )
+        metric("tests_in_flight", "gauge", "Tests running.", [("", "", s["in_flight"])])
+        metric(
+            "tests_started",
+            "counter",
+            "Tests started.",
+            [("_total", "", s["started"])],
+        )
+        metric(
+            "tests_completed",
+            "counter",
+            "Tests completed.",
+            [("_total", "", s["completed"])],
+        )
+        metric(
+            "test_errors",
+            "counter",
+            "Tests that ended with an error.",
+            [("_total", "", s["errors"])],
+        )
+        metric(
+            "tests_completed_per_second",
+            "gauge",
+            f"Tests completed per second over the last {RATE_WINDOW:g}s.",
+            [("", "", round(s["completed_per_second"], 4))],
+        )
+        metric(
+            "test_error_ratio",
+            "gauge",
+            "Share of completed tests that ended with an error.",
+            [("", "", round(s["error_rate"], 4))],
+        )
+        metric(
+            "test_duration_seconds",
+            "summary",
+            f"Test duration over the last {LATENCY_WINDOW} tests.",
+            [
+                *(
+                    ("", f'quantile="{q}"', "NaN" if v is None else round(v, 3))
+                    for q, v in s["latency"].items()
+                ),
+                ("_sum", "", round(s["latency_sum"], 3)),
+                ("_count", "", s["completed"]),
+            ],
+        )
+        metric(
+            "judge_calls_in_flight",
+            "gauge",
+            "Judge calls awaiting a response.",
+            [("", "", s["judge_in_flight"])],
+        )
+        metric(
+            "judge_calls",
+            "counter",
+            "Judge calls sent.",
+            [("_total", "", s["judge_calls"])],
+        )
+        if s["queues"]:
+            metric(
+                "queue_depth",
+                "gauge",
+                "Items waiting in a run queue.",
+                [("", f'queue="{name}"', depth) for name, depth in s["queues"].items()],
+            )
+        return "\n".join(lines) + "\n"
+
+    def status_line(self) -> str:
+        """Return a compact one-line view of the run in progress."""
+        s = self.snapshot()
+        p50, p95 = ("-" if v is None else f"{v:.1f}s" for v in s["latency"].values())
+        queues = "".join(f" | {name} {depth}" for name, depth in s["queues"].items())
+        return (
+            f"[LIVE] {s['completed']} done | {s['in_flight']} in flight | "
+            f"{s['queued']} queued | {s['completed_per_second']:.2f}/s | "
+            f"errors {s['error_rate']:.1%} | p50 {p50} p95 {p95} | "
+            f"judge {s['judge_in_flight']} in flight{queues}"
+        )
+
+
+run_metrics = RunMetrics()
+
+
+class MetricsServer:
+    """Local HTTP endpoint serving ``/metrics`` from a daemon thread."""
+
+    def __init__(self, metrics: RunMetrics, port: int, host: str = "127.0.0.1"):
+        """Initialize the server (not listening until started).
+
+        Args:
+            metrics: Metrics to serve
+            port: Port to listen on (0 picks a free port)
+            host: Interface to listen on, local only by default
+
+        """
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server: ThreadingHTTPServer | None = None
+
+    def start(self) -> None:
+        """Start listening; ``port`` holds the bound port afterwards."""
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        """Stop listening."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+async def print_live_status(metrics: RunMetrics, interval: float) -> None:
+    """Print the status line every ``interval`` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        print(metrics.status_line())
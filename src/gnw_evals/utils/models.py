@@ -3,8 +3,16 @@ from langchain_anthropic import ChatAnthropic
 
 load_dotenv()
 
-HAIKU = ChatAnthropic(
-    model="claude-3-5-haiku-latest",
-    temperature=0,
-    max_tokens=8_192,  # Haiku has a limit of max 8192 tokens
-)
+DEFAULT_JUDGE_MODEL = "claude-3-5-haiku-latest"
+
+
+def create_judge_model(
+    model: str = DEFAULT_JUDGE_MODEL,
+    temperature: float = 0,
+) -> ChatAnthropic:
+    """Create an Anthropic chat model for LLM-as-a-judge calls."""
+    return ChatAnthropic(
+        model=model,
+        temperature=temperature,
+        max_tokens=8_192,  # Haiku has a limit of max 8192 tokens
+    )
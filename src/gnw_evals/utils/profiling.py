@@ -0,0 +1,148 @@
+"""Profiling of the harness itself.
+
+``HarnessProfiler`` samples the stacks of every thread from a background
+thread (stdlib only, no tracing hooks, so the overhead stays flat however
+many tests run) and aggregates them as folded stacks, the input format of
+flamegraph.pl, inferno and speedscope. Samples are wall-clock: threads
+waiting on the network or a lock show up in their waiting frames, next to
+the frames that actually burn CPU (model construction, state decoding,
+judge calls).
+
+With ``tracemalloc`` it also snapshots allocations every N completed tests
+and reports the top allocating lines and their growth since the previous
+snapshot.
+"""
+
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from types import FrameType
+
+from gnw_evals.utils.live_metrics import RunMetrics
+
+# Seconds between stack samples
+SAMPLE_INTERVAL = 0.005
+
+# Frames kept per allocation traceback
+TRACEMALLOC_FRAMES = 1
+
+# Allocating lines listed per snapshot
+TOP_ALLOCATORS = 15
+
+
+def _folded_stack(thread_name: str, frame: FrameType | None) -> str:
+    """Return a stack as "thread;outermost;...;innermost" frame names."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_qualname} ({code.co_filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    names.append(thread_name)
+    return ";".join(name.replace(";", ",") for name in reversed(names))
+
+
+class HarnessProfiler:
+    """Sampling stack profiler with periodic tracemalloc snapshots."""
+
+    def __init__(
+        self,
+        metrics: RunMetrics,
+        snapshot_every: int = 100,
+        interval: float = SAMPLE_INTERVAL,
+    ):
+        """Initialize the profiler (not sampling until started).
+
+        Args:
+            metrics: Run metrics whose completed test count triggers snapshots
+            snapshot_every: Completed tests between allocation snapshots
+                (0 only snapshots at the end)
+            interval: Seconds between stack samples
+
+        """
+        self.metrics = metrics
+        self.snapshot_every = snapshot_every
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self.report: list[str] = []
+        self._previous: tracemalloc.Snapshot | None = None
+        self._next_snapshot = snapshot_every
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start tracemalloc and the sampling thread."""
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        self._thread = threading.Thread(
+            target=self._run,
+            name="harness-profiler",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and take a final allocation snapshot."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._snapshot("end of run")
+        tracemalloc.stop()
+
+    def _run(self) -> None:
+        """Sample until stopped, snapshotting as tests complete."""
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self._sample(own_id)
+            completed = self.metrics.completed
+            if self.snapshot_every and completed >= self._next_snapshot:
+                self._snapshot(f"after {completed} tests")
+                self._next_snapshot = completed + self.snapshot_every
+
+    def _sample(self, own_id: int) -> None:
+        """Record the current stack of every thread but the profiler's."""
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id != own_id:
+                self.stacks[_folded_stack(names.get(thread_id, "thread"), frame)] += 1
+        self.samples += 1
+
+    def _snapshot(self, label: str) -> None:
+        """Add the top allocators and their growth to the report."""
+        if not tracemalloc.is_tracing():
+            return
+        start = time.perf_counter()
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            ],
+        )
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [
+            f"=== {label}: {current / 2**20:.1f} MiB traced, "
+            f"{peak / 2**20:.1f} MiB peak ===",
+            "Top allocators:",
+        ]
+        lines += [
+            f"  {stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  "
+            f"{stat.traceback[0]}"
+            for stat in snapshot.statistics("lineno")[:TOP_ALLOCATORS]
+        ]
+        if self._previous is not None:
+            lines.append("Growth since previous snapshot:")
+            lines += [
+                f"  {stat.size_diff / 1024:+10.1f} KiB {stat.count_diff:+8d} blocks  "
+                f"{stat.traceback[0]}"
+                for stat in snapshot.compare_to(self._previous, "lineno")[
+                    :TOP_ALLOCATORS
+                ]
+            ]
+        lines.append(f"(snapshot took {time.perf_counter() - start:.2f}s)")
+        self.report.extend([*lines, ""])
+        self._previous = snapshot
+
+    def folded(self) -> list[str]:
+        """Return the sampled stacks as folded "stack count" lines."""
+        return [f"{stack} {count}" for stack, count in self.stacks.most_common()]
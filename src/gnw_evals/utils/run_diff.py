@@ -0,0 +1,227 @@
+"""Run-over-run regression diff with bootstrap confidence intervals.
+
+Two result sets are joined by the stable ``test_id`` (query and expected
+values), and per check and per test group the score and
+pass rate deltas get paired bootstrap confidence intervals. The bootstrap is
+vectorized: resamples are drawn as index batches, turned into per-row counts
+with one ``bincount`` and applied to all checks and test groups with matrix
+products, so 10k-row runs are diffed in well under a second.
+"""
+
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from gnw_evals.data_handlers.history import RunHistory
+from gnw_evals.data_handlers.sharding import EXPECTATION_FIELDS, frame_test_ids
+from gnw_evals.utils.eval_types import SCORE_FIELDS
+
+# Overall score at or above which a test counts as passed
+PASS_THRESHOLD = 0.7
+
+# Bootstrap resamples drawn per batch, bounding memory for large runs
+BOOTSTRAP_BATCH = 100
+
+# Checks compared: every score plus the pass rate
+CHECKS = [*SCORE_FIELDS, "pass_rate"]
+
+
+def load_run(run: str, history_path: str | Path | None = None) -> pd.DataFrame:
+    """Load the scores of a run from a detailed/summary CSV or the run history.
+
+    Args:
+        run: Path of a result CSV, or a run ID in the run history store
+        history_path: Run history database for run IDs (optional)
+
+    Returns:
+        Frame with a unique ``test_id`` per test, query, test_group and the
+        scores
+
+    """
+    if Path(run).is_file():
+        df = pd.read_csv(
+            run,
+            usecols=lambda c: c
+            in {"query", "test_id", "test_group", *EXPECTATION_FIELDS, *SCORE_FIELDS},
+        )
+    elif history_path is not None and Path(history_path).is_file():
+        df = RunHistory(history_path).run_results(run)
+        if df.empty:
+            raise ValueError(f"No result file or recorded run named {run!r}")
+    else:
+        raise ValueError(f"No result file named {run!r}")
+
+    for column in ("test_id", "test_group", *SCORE_FIELDS):
+        if column not in df.columns:
+            df[column] = np.nan
+    if set(EXPECTATION_FIELDS) & set(df.columns):
+        # Recomputed, so files from before the current test_id still match
+        df["test_id"] = frame_test_ids(df)
+    else:
+        df["test_id"] = df["test_id"].astype(object).fillna(frame_test_ids(df))
+    df["test_group"] = df["test_group"].fillna("unknown")
+    duplicates = df["test_id"].duplicated()
+    if duplicates.any():
+        print(
+            f"Warning: {run}: {int(duplicates.sum())} rows repeat the query and "
+            "expected values of an earlier row; only the first is compared",
+        )
+        df = df[~duplicates].reset_index(drop=True)
+    df["pass_rate"] = (df["overall_score"] >= PASS_THRESHOLD).where(
+        df["overall_score"].notna(),
+    )
+    return df
+
+
+def bootstrap_mean_ci(
+    deltas: np.ndarray,
+    scopes: list[slice],
+    n_boot: int = 1000,
+    alpha: float = 0.05,
+    seed: int = 0,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return percentile bootstrap intervals of the column means of paired deltas.
+
+    All scopes share the same resamples of the rows, so the counts are drawn
+    once however many test groups there are.
+
+    Args:
+        deltas: Rows x checks matrix of paired differences (NaN where a
+            check was not scored in both runs)
+        scopes: Row ranges to compute intervals for (e.g. all rows and the
+            rows of every test group, with rows sorted by group)
+        n_boot: Bootstrap resamples
+        alpha: Two-sided significance level
+        seed: Random seed, for reproducible intervals
+
+    Returns:
+        Lower and upper interval bounds, scopes x checks (NaN without data)
+
+    """
+    n, k = deltas.shape
+    low = np.full((len(scopes), k), np.nan)
+    high = np.full((len(scopes), k), np.nan)
+    if n == 0:
+        return low, high
+
+    rng = np.random.default_rng(seed)
+    present = ~np.isnan(deltas)
+    # Sums and counts of present values come out of one matrix product
+    values = np.hstack([np.where(present, deltas, 0.0), present.astype(float)])
+
+    means = [[] for _ in scopes]
+    for start in range(0, n_boot, BOOTSTRAP_BATCH):
+        batch = min(BOOTSTRAP_BATCH, n_boot - start)
+        # Count how often each row is drawn in every resample of the batch
+        draws = rng.integers(0, n, size=(batch, n), dtype=np.int32)
+        draws += np.arange(batch, dtype=np.int32)[:, None] * n
+        counts = np.bincount(draws.ravel(), minlength=batch * n)
+        counts = counts.reshape(batch, n).astype(float)
+        for i, scope in enumerate(scopes):
+            sums = counts[:, scope] @ values[scope]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                means[i].append(sums[:, :k] / sums[:, k:])
+
+    for i, scope in enumerate(scopes):
+        scope_means = np.vstack(means[i])
+        scored = present[scope].any(axis=0)
+        if scored.any():
+            low[i, scored], high[i, scored] = np.nanpercentile(
+                scope_means[:, scored],
+                [100 * alpha / 2, 100 * (1 - alpha / 2)],
+                axis=0,
+            )
+    return low, high
+
+
+def _diff_scope(
+    scope: str,
+    a: np.ndarray,
+    b: np.ndarray,
+    low: np.ndarray,
+    high: np.ndarray,
+) -> pd.DataFrame:
+    """Compare the checks of the paired rows of one scope."""
+    deltas = b - a
+    paired = ~np.isnan(deltas)
+    with np.errstate(invalid="ignore"), warnings.catch_warnings():
+        # Checks that were never scored in both runs have empty means
+        warnings.simplefilter("ignore", RuntimeWarning)
+        frame = pd.DataFrame(
+            {
+                "scope": scope,
+                "check": CHECKS,
+                "n": paired.sum(axis=0),
+                "before": np.nanmean(np.where(paired, a, np.nan), axis=0),
+                "after": np.nanmean(np.where(paired, b, np.nan), axis=0),
+                "delta": np.nanmean(deltas, axis=0),
+                "ci_low": low,
+                "ci_high": high,
+            },
+        )
+    frame["significant"] = (frame["ci_low"] > 0) | (frame["ci_high"] < 0)
+    frame["regression"] = frame["significant"] & (frame["delta"] < 0)
+    return frame
+
+
+def diff_runs(
+    before: pd.DataFrame,
+    after: pd.DataFrame,
+    n_boot: int = 1000,
+    alpha: float = 0.05,
+    seed: int = 0,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Diff two runs loaded with ``load_run``.
+
+    Args:
+        before: Baseline run
+        after: Candidate run
+        n_boot: Bootstrap resamples per scope
+        alpha: Two-sided significance level of the intervals
+        seed: Random seed of the bootstrap
+
+    Returns:
+        Per-check deltas (scope "all" and one scope per test group, with
+        bootstrap intervals and significance flags), and the tests that
+        flipped between pass and fail
+
+    """
+    joined = before.merge(after, on="test_id", suffixes=("_before", "_after"))
+    # Rows sorted by group, so every group is a contiguous bootstrap scope
+    joined = joined.sort_values("test_group_after", kind="stable", ignore_index=True)
+    a = joined[[f"{c}_before" for c in CHECKS]].set_axis(CHECKS, axis=1)
+    b = joined[[f"{c}_after" for c in CHECKS]].set_axis(CHECKS, axis=1)
+    groups = joined["test_group_after"]
+
+    names = ["all"]
+    scopes = [slice(0, len(joined))]
+    for group, rows in groups.groupby(groups, sort=True).indices.items():
+        names.append(f"test_group:{group}")
+        scopes.append(slice(rows[0], rows[-1] + 1))
+
+    a_values = a.to_numpy(dtype=float)
+    b_values = b.to_numpy(dtype=float)
+    low, high = bootstrap_mean_ci(b_values - a_values, scopes, n_boot, alpha, seed)
+    checks = pd.concat(
+        [
+            _diff_scope(name, a_values[scope], b_values[scope], low[i], high[i])
+            for i, (name, scope) in enumerate(zip(names, scopes, strict=True))
+        ],
+        ignore_index=True,
+    )
+
+    flipped = a["pass_rate"].notna() & b["pass_rate"].notna()
+    flipped &= a["pass_rate"] != b["pass_rate"]
+    flips = pd.DataFrame(
+        {
+            "test_id": joined["test_id"],
+            "query": joined["query_after"],
+            "test_group": groups,
+            "before": a["overall_score"],
+            "after": b["overall_score"],
+            "flip": np.where(b["pass_rate"] > a["pass_rate"], "fixed", "regressed"),
+        },
+    )[flipped.to_numpy()]
+    return checks, flips.reset_index(drop=True)
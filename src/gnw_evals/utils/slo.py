@@ -0,0 +1,168 @@
+"""Latency SLO gates.
+
+Latency budgets are read from a TOML file and checked against the timings of
+a run: the test durations over all tests and per ``test_group``, and the
+seconds the agent spent in each node (from the streamed node updates)::
+
+    [all]
+    p95 = 120
+
+    [test_group.loss]
+    p50 = 30
+    p95 = 90
+
+    [node.generate_insights]
+    p95 = 20
+    max = 60
+
+Every budget is a p50, p95 or max in seconds. The outcome is recorded in the
+run summary and a breached budget fails the run.
+"""
+
+import tomllib
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from gnw_evals.utils.eval_types import TestResult
+
+# Statistics a budget can be set on
+BUDGET_STATS = ["p50", "p95", "max"]
+
+# TOML sections of budgets per test group and per agent node
+SCOPE_SECTIONS = ["test_group", "node"]
+
+
+def _statistic(values: list[float], stat: str) -> float:
+    """Compute a budgeted statistic of a sample."""
+    if stat == "max":
+        return max(values)
+    return float(np.percentile(values, float(stat[1:])))
+
+
+def _parse_budget(scope: str, budget: Any) -> dict[str, float]:
+    """Validate the budget of one scope."""
+    if not isinstance(budget, dict):
+        raise ValueError(f"Budget of {scope} must be a table")
+    unknown = set(budget) - set(BUDGET_STATS)
+    if unknown:
+        raise ValueError(
+            f"Unknown statistics in the budget of {scope}: {', '.join(sorted(unknown))} "
+            f"(expected {', '.join(BUDGET_STATS)})",
+        )
+    for stat, seconds in budget.items():
+        if isinstance(seconds, bool) or not isinstance(seconds, int | float):
+            raise ValueError(f"Budget {scope}.{stat} must be a number of seconds")
+        if seconds <= 0:
+            raise ValueError(f"Budget {scope}.{stat} must be > 0")
+    return {stat: float(budget[stat]) for stat in BUDGET_STATS if stat in budget}
+
+
+class SLOGate:
+    """Latency budgets per run, test group and agent node."""
+
+    def __init__(self, budgets: dict[str, dict[str, float]]):
+        """Initialize with validated budgets.
+
+        Args:
+            budgets: Budgets per scope ("all", "test_group:<name>" or
+                "node:<name>"), each mapping p50/p95/max to seconds
+
+        """
+        self.budgets = budgets
+        self.checks: list[dict[str, Any]] = []
+
+    @classmethod
+    def load(cls, path: str | Path) -> "SLOGate":
+        """Load budgets from a TOML file.
+
+        Raises:
+            ValueError: If the file holds unknown sections or invalid budgets
+
+        """
+        with open(path, "rb") as f:
+            config = tomllib.load(f)
+
+        budgets = {}
+        for section, value in config.items():
+            if section == "all":
+                budgets["all"] = _parse_budget("all", value)
+            elif section in SCOPE_SECTIONS and isinstance(value, dict):
+                for name, budget in value.items():
+                    scope = f"{section}:{name}"
+                    budgets[scope] = _parse_budget(scope, budget)
+            else:
+                raise ValueError(
+                    f"Unknown SLO section [{section}] (expected all, "
+                    f"{', '.join(f'{s}.<name>' for s in SCOPE_SECTIONS)})",
+                )
+        return cls(budgets)
+
+    def _timings(self, results: list[TestResult], scope: str) -> list[float]:
+        """Return the timings a scope's budget applies to, one per test."""
+        kind, _, name = scope.partition(":")
+        if kind == "node":
+            return [
+                r.node_seconds[name]
+                for r in results
+                if r.node_seconds and name in r.node_seconds
+            ]
+        return [
+            r.duration_seconds
+            for r in results
+            if r.duration_seconds is not None
+            and (kind == "all" or r.test_group == name)
+        ]
+
+    def evaluate(self, results: list[TestResult]) -> dict[str, Any]:
+        """Check every budget against the timings of a run.
+
+        Returns:
+            Dict with ``breached`` and one check per budget (scope, stat,
+            budget and actual seconds, tests measured and whether it was
+            breached); budgets without any timings are not breached
+
+        """
+        self.checks = []
+        for scope, budget in self.budgets.items():
+            timings = self._timings(results, scope)
+            for stat, seconds in budget.items():
+                actual = round(_statistic(timings, stat), 3) if timings else None
+                self.checks.append(
+                    {
+                        "scope": scope,
+                        "stat": stat,
+                        "budget_seconds": seconds,
+                        "actual_seconds": actual,
+                        "tests": len(timings),
+                        "breached": actual is not None and actual > seconds,
+                    },
+                )
+        return {"breached": self.breached, "checks": self.checks}
+
+    @property
+    def breached(self) -> bool:
+        """Whether any budget was breached in the last evaluation."""
+        return any(check["breached"] for check in self.checks)
+
+
+def print_slo_report(report: dict[str, Any]) -> None:
+    """Print the checks of an SLO gate evaluation."""
+    print(f"\n{'=' * 50}")
+    print("LATENCY SLOs")
+    print(f"{'=' * 50}")
+    for check in report["checks"]:
+        actual = check["actual_seconds"]
+        if actual is None:
+            outcome = "no data"
+        else:
+            outcome = "BREACHED" if check["breached"] else "ok"
+        print(
+            f"{check['scope'][:32]:<32} {check['stat']:>4} "
+            f"{'-' if actual is None else f'{actual:.2f}s':>8} / "
+            f"{check['budget_seconds']:.2f}s ({check['tests']} tests) {outcome}",
+        )
+    breached = sum(check["breached"] for check in report["checks"])
+    if breached:
+        print(f"{breached} latency budgets breached")
@@ -0,0 +1,187 @@
+"""Run summary statistics.
+
+Results are turned into one columnar table, and per-check means, None counts,
+pass rates and latency percentiles are computed with grouped aggregations over
+all tests and per ``test_group``, ``status`` and error type. The summary is a
+plain dict, printed to the console and written as ``*_summary.json``.
+"""
+
+import math
+from typing import Any
+
+import pandas as pd
+
+from gnw_evals.utils.eval_types import SCORE_FIELDS, TestResult
+from gnw_evals.utils.run_diff import PASS_THRESHOLD
+
+# Console labels of the component checks (overall_score is reported separately)
+CHECK_LABELS = {
+    "aoi_id_match_score": "AOI ID Match",
+    "subregion_match_score": "Subregion Match",
+    "dataset_id_match_score": "Dataset ID Match",
+    "context_layer_match_score": "Context Layer Match",
+    "data_pull_exists_score": "Data Pull Exists",
+    "date_match_score": "Date Match",
+    "charts_answer_score": "Charts Answer",
+    "agent_answer_score": "Agent Answer",
+    "clarification_requested_score": "Clarification",
+}
+
+# Test duration percentiles reported per group
+LATENCY_PERCENTILES = [0.5, 0.9, 0.99]
+
+# Columns grouped by, with the summary key of their breakdown
+GROUP_COLUMNS = {
+    "test_group": "by_test_group",
+    "status": "by_status",
+    "error_type": "by_error_type",
+}
+
+
+def results_frame(results: list[TestResult]) -> pd.DataFrame:
+    """Build the columnar table of the result fields the summary needs."""
+    columns = [
+        *SCORE_FIELDS,
+        "charts_answer_confidence",
+        "agent_answer_confidence",
+        "duration_seconds",
+        "test_group",
+        "status",
+        "error_type",
+    ]
+    df = pd.DataFrame.from_records(
+        [tuple(getattr(r, column, None) for column in columns) for r in results],
+        columns=columns,
+    )
+    numeric = columns[:-3]
+    df[numeric] = df[numeric].astype(float)
+    df["error_type"] = df["error_type"].fillna("none")
+    df["passed"] = df["overall_score"] >= PASS_THRESHOLD
+    return df
+
+
+def _clean(value: Any) -> Any:
+    """Turn NaN into None and numpy scalars into Python numbers for JSON."""
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def _grouped_stats(df: pd.DataFrame, key: str) -> dict[str, dict[str, Any]]:
+    """Aggregate the checks, pass rate and latency of each value of a column."""
+    grouped = df.groupby(key, sort=True)
+    sizes = grouped.size()
+    means = grouped[SCORE_FIELDS].mean()
+    scored = grouped[SCORE_FIELDS].count()
+    pass_rates = grouped["passed"].mean()
+    latency = grouped["duration_seconds"].quantile(LATENCY_PERCENTILES).unstack()
+    latency_max = grouped["duration_seconds"].max()
+
+    stats = {}
+    for group in sizes.index:
+        stats[str(group)] = {
+            "tests": int(sizes[group]),
+            "average_score": _clean(means.at[group, "overall_score"]),
+            "pass_rate": _clean(pass_rates[group]),
+            "checks": {
+                field: {
+                    "mean": _clean(means.at[group, field]),
+                    "none": int(sizes[group] - scored.at[group, field]),
+                }
+                for field in CHECK_LABELS
+            },
+            "latency_seconds": {
+                **{
+                    f"p{round(q * 100)}": _clean(latency.at[group, q])
+                    for q in LATENCY_PERCENTILES
+                },
+                "max": _clean(latency_max[group]),
+            },
+        }
+    return stats
+
+
+def summarize_results(results: list[TestResult]) -> dict[str, Any]:
+    """Summarize a run over all tests and per test group, status and error type.
+
+    Returns:
+        Dict with the stats of all tests (tests, average_score, pass_rate,
+        passed, per-check mean and None count, latency percentiles and answer
+        judge confidence) and a ``by_test_group``, ``by_status`` and
+        ``by_error_type`` breakdown with the same stats per group
+
+    """
+    if not results:
+        return {"tests": 0}
+
+    df = results_frame(results)
+    summary = _grouped_stats(df.assign(scope="all"), "scope")["all"]
+    summary["passed"] = int(df["passed"].sum())
+
+    confidences = df[["charts_answer_confidence", "agent_answer_confidence"]]
+    confidences = confidences.stack()
+    summary["answer_confidence"] = {
+        "mean": _clean(confidences.mean()) if len(confidences) else None,
+        "split_votes": int((confidences < 1.0).sum()),
+    }
+    for column, name in GROUP_COLUMNS.items():
+        summary[name] = _grouped_stats(df, column)
+    return summary
+
+
+def _format_score(value: float | None) -> str:
+    """Format a mean score, or None if nothing was scored."""
+    return "None" if value is None else f"{value:.2f}"
+
+
+def print_summary(summary: dict[str, Any]) -> None:
+    """Print a run summary built by summarize_results."""
+    if not summary["tests"]:
+        return
+
+    total_tests = summary["tests"]
+    print(f"\n{'=' * 50}")
+    print("SIMPLE E2E TEST SUMMARY")
+    print(f"{'=' * 50}")
+    print(f"Total Tests: {total_tests}")
+    print(f"Average Score: {summary['average_score']:.2f}")
+    print(
+        f"Passed (≥{PASS_THRESHOLD}): {summary['passed']}/{total_tests} ({summary['pass_rate']:.1%})",
+    )
+
+    for field, label in CHECK_LABELS.items():
+        check = summary["checks"][field]
+        print(f"{label}: {_format_score(check['mean'])} ({check['none']} None)")
+
+    confidence = summary["answer_confidence"]
+    if confidence["mean"] is not None:
+        print(
+            f"Answer Judge Confidence: {confidence['mean']:.2f} ({confidence['split_votes']} split votes)",
+        )
+
+    latency = summary["latency_seconds"]
+    if latency["max"] is not None:
+        print(
+            f"Latency: p50 {latency['p50']:.1f}s | p90 {latency['p90']:.1f}s | "
+            f"p99 {latency['p99']:.1f}s | max {latency['max']:.1f}s",
+        )
+
+    for name, title in (
+        ("by_test_group", "Test Group"),
+        ("by_status", "Status"),
+        ("by_error_type", "Error Type"),
+    ):
+        groups = summary[name]
+        if len(groups) < 2 and name != "by_test_group":
+            continue
+        print(f"\n{title:<24} {'Tests':>6} {'Score':>6} {'Pass':>7} {'p90 s':>7}")
+        for group, stats in groups.items():
+            p90 = stats["latency_seconds"]["p90"]
+            print(
+                f"{group[:24]:<24} {stats['tests']:>6} "
+                f"{_format_score(stats['average_score']):>6} "
+                f"{stats['pass_rate']:>7.1%} "
+                f"{'-' if p90 is None else f'{p90:.1f}':>7}",
+            )
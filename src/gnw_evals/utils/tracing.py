@@ -0,0 +1,143 @@
+"""Span tracing of tests in the Chrome trace event format.
+
+When enabled, every test records nested spans (dispatch wait, HTTP connect
+and stream, the time spent in each agent node, state fetch and decode, each
+``evaluate_*`` function and each judge call) on its own track. The spans of
+the whole run are written as one Chrome/Perfetto trace JSON, so opening a
+single file shows where concurrent workers were actually waiting.
+
+Tracks are carried by a ContextVar, so spans recorded in worker threads
+started with ``asyncio.to_thread`` land on the track of their test. Tracing is
+off by default and spans are then no-ops.
+"""
+
+import os
+import threading
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+# Track the spans of the current test are recorded on (0 is the run itself)
+current_track: ContextVar[int] = ContextVar("current_track", default=0)
+
+# httpx/httpcore trace extension events recorded as spans
+HTTP_EVENTS = {
+    "connection.connect_tcp": "http connect",
+    "connection.start_tls": "http tls",
+    "http11.send_request_headers": "http send",
+    "http11.send_request_body": "http send",
+    "http11.receive_response_headers": "http wait",
+    "http2.send_request_headers": "http send",
+    "http2.send_request_body": "http send",
+    "http2.receive_response_headers": "http wait",
+}
+
+
+class Tracer:
+    """Collects spans as Chrome trace "complete" events."""
+
+    def __init__(self):
+        """Initialize a disabled tracer."""
+        self._lock = threading.Lock()
+        self.enabled = False
+        self._events: list[dict[str, Any]] = []
+        self._origin = time.perf_counter()
+
+    def start(self) -> None:
+        """Drop recorded spans and start tracing, with timestamps from now."""
+        with self._lock:
+            self._events = []
+            self._origin = time.perf_counter()
+            self.enabled = True
+        self.name_track(0, "run")
+
+    def stop(self) -> None:
+        """Stop recording spans."""
+        self.enabled = False
+
+    def _us(self, t: float) -> float:
+        """Microseconds since the trace started of a perf_counter time."""
+        return round((t - self._origin) * 1_000_000, 1)
+
+    def name_track(self, track: int, name: str) -> None:
+        """Label a track in the trace viewer."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": os.getpid(),
+                    "tid": track,
+                    "args": {"name": name},
+                },
+            )
+
+    def add_span(
+        self,
+        name: str,
+        start: float,
+        end: float,
+        cat: str = "eval",
+        **args: Any,
+    ) -> None:
+        """Record a span measured with ``time.perf_counter``."""
+        if not self.enabled:
+            return
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": self._us(start),
+            "dur": round((end - start) * 1_000_000, 1),
+            "pid": os.getpid(),
+            "tid": current_track.get(),
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._events.append(event)
+
+    @contextmanager
+    def span(self, name: str, cat: str = "eval", **args: Any) -> Iterator[None]:
+        """Record the enclosed block as a span on the current track."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            args["error"] = type(e).__name__
+            raise
+        finally:
+            self.add_span(name, start, time.perf_counter(), cat, **args)
+
+    def httpx_hook(self) -> Callable[[str, dict], Awaitable[None]]:
+        """Return an httpx ``trace`` extension recording connection spans."""
+        started: dict[str, float] = {}
+
+        async def trace(event: str, info: dict) -> None:
+            step, _, phase = event.rpartition(".")
+            name = HTTP_EVENTS.get(step)
+            if name is None:
+                return
+            if phase == "started":
+                started[step] = time.perf_counter()
+            elif step in started:
+                self.add_span(name, started.pop(step), time.perf_counter(), "http")
+
+        return trace
+
+    @property
+    def events(self) -> list[dict[str, Any]]:
+        """Recorded events, metadata first and spans by start time."""
+        with self._lock:
+            events = list(self._events)
+        return sorted(events, key=lambda e: (e["ph"] != "M", e.get("ts", 0)))
+
+
+tracer = Tracer()
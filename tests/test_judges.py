@@ -0,0 +1,433 @@
+"""Unit tests for judge backends and deferred batch judging.
+
+The batch client is exercised against a local stand-in for the Message
+Batches API served through an httpx mock transport.
+
+Usage
+$ uv run pytest tests/test_judges.py -v
+
+"""
+
+import json
+
+import httpx
+import pytest
+
+from gnw_evals.evaluators import evaluate_aoi_selection, evaluate_final_answer
+from gnw_evals.evaluators.clarification_classifier import (
+    ClarificationClassifier,
+    calibrate_thresholds,
+    load_clarification_verdicts,
+)
+from gnw_evals.evaluators.judge_backends import (
+    FakeJudgeBackend,
+    FakeJudgeError,
+    ReplayJudgeBackend,
+    create_judge_backend,
+)
+from gnw_evals.evaluators.judge_batch import (
+    JudgeBatchQueue,
+    MessageBatchClient,
+    parse_batch_score,
+    run_deferred_judging,
+)
+from gnw_evals.runners.api import APITestRunner
+from gnw_evals.utils.eval_types import TestResult
+
+
+class StandInBatchServer:
+    """Local stand-in for the Message Batches endpoints.
+
+    Scores a request 1 when the expected answer appears in the prompt's
+    actual insight, and reports the batch as in progress for the first
+    ``polls_until_ended`` status checks.
+    """
+
+    def __init__(self, polls_until_ended=2):
+        """Initialize server state."""
+        self.polls_until_ended = polls_until_ended
+        self.polls = 0
+        self.submitted = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        """Route a request to the matching endpoint."""
+        path = request.url.path
+        if request.method == "POST" and path == "/v1/messages/batches":
+            self.submitted = json.loads(request.content)["requests"]
+            return httpx.Response(200, json=self._batch("in_progress"))
+        if path == "/v1/messages/batches/batch_1":
+            self.polls += 1
+            status = "ended" if self.polls >= self.polls_until_ended else "in_progress"
+            return httpx.Response(200, json=self._batch(status))
+        if path == "/v1/messages/batches/batch_1/results":
+            lines = [json.dumps(self._result(r)) for r in self.submitted]
+            return httpx.Response(200, text="\n".join(lines))
+        return httpx.Response(404)
+
+    def _batch(self, status):
+        return {
+            "id": "batch_1",
+            "processing_status": status,
+            "results_url": "http://batch.local/v1/messages/batches/batch_1/results",
+        }
+
+    def _result(self, request):
+        prompt = request["params"]["messages"][0]["content"]
+        expected = prompt.split("EXPECTED ANSWER: ")[1].split("\n")[0]
+        actual = prompt.split("ACTUAL INSIGHT: ")[1].split("\n")[0]
+        if "error" in actual:
+            return {
+                "custom_id": request["custom_id"],
+                "result": {"type": "errored", "error": {"type": "api_error"}},
+            }
+        score = 1 if expected.lower() in actual.lower() else 0
+        return {
+            "custom_id": request["custom_id"],
+            "result": {
+                "type": "succeeded",
+                "message": {
+                    "content": [
+                        {
+                            "type": "tool_use",
+                            "name": "Score",
+                            "input": {
+                                "score": score,
+                                "answer_eval_type": "named_entity",
+                            },
+                        },
+                    ],
+                },
+            },
+        }
+
+
+def _client(server):
+    return MessageBatchClient(
+        api_key="test",
+        base_url="http://batch.local",
+        poll_interval=0,
+        transport=httpx.MockTransport(server.handler),
+    )
+
+
+def test_queue_deduplicates_identical_requests():
+    """Identical expected/actual pairs should share a single batch request."""
+    queue = JudgeBatchQueue()
+
+    first = queue.enqueue("Brazil", "Brazil had the most")
+    second = queue.enqueue("Brazil", "Brazil had the most")
+    third = queue.enqueue("Brazil", "Australia had the most")
+
+    assert first == second
+    assert first != third
+    assert len(queue) == 2
+
+    requests = queue.build_requests("claude-test", 1024, 0)
+    assert {r["custom_id"] for r in requests} == {first, third}
+    assert requests[0]["params"]["tool_choice"] == {"type": "tool", "name": "Score"}
+
+
+def test_answer_evaluator_defers_to_queue():
+    """With a queue, the evaluator should enqueue instead of calling the judge."""
+    queue = JudgeBatchQueue()
+    agent_state = {
+        "charts_data": [{"insight": "Brazil had the most"}],
+        "messages": [],
+    }
+
+    result = evaluate_final_answer(agent_state, "Brazil", judge_queue=queue)
+
+    assert result["charts_answer_score"] is None
+    assert result["agent_answer_score"] is None
+    assert set(result["pending_judgements"]) == {"charts_answer_score"}
+    assert len(queue) == 1
+
+
+@pytest.mark.asyncio
+async def test_deferred_judging_backfills_scores():
+    """Batch verdicts should be written back and overall scores recomputed."""
+    server = StandInBatchServer(polls_until_ended=2)
+    queue = JudgeBatchQueue()
+    runner = APITestRunner(api_base_url="http://test", api_token="test")
+
+    results = []
+    for insight in ["Brazil had the most", "Australia had the most", "error"]:
+        evaluations = evaluate_final_answer(
+            {"charts_data": [{"insight": insight}], "messages": []},
+            "Brazil",
+            judge_queue=queue,
+        )
+        results.append(
+            TestResult(
+                thread_id="t",
+                query="Which country?",
+                overall_score=0.0,
+                execution_time="now",
+                expected_answer="Brazil",
+                **evaluations,
+            ),
+        )
+
+    await run_deferred_judging(results, queue, runner, _client(server))
+
+    assert server.polls == 2, "Should poll until the batch has ended"
+    assert [r.charts_answer_score for r in results] == [1, 0, None]
+    assert [r.overall_score for r in results] == [1.0, 0.0, 0.0]
+    assert all("pending_judgements" not in r.to_dict() for r in results)
+
+
+@pytest.mark.asyncio
+async def test_deferred_judging_times_out_on_stuck_batch():
+    """A batch that never ends should raise TimeoutError after max_wait."""
+    server = StandInBatchServer(polls_until_ended=float("inf"))
+    queue = JudgeBatchQueue()
+    runner = APITestRunner(api_base_url="http://test", api_token="test")
+    evaluations = evaluate_final_answer(
+        {"charts_data": [{"insight": "Brazil had the most"}], "messages": []},
+        "Brazil",
+        judge_queue=queue,
+    )
+    results = [
+        TestResult(
+            thread_id="t",
+            query="Which country?",
+            overall_score=0.0,
+            execution_time="now",
+            expected_answer="Brazil",
+            **evaluations,
+        ),
+    ]
+    client = MessageBatchClient(
+        api_key="test",
+        base_url="http://batch.local",
+        poll_interval=0.01,
+        max_wait=0.05,
+        transport=httpx.MockTransport(server.handler),
+    )
+
+    with pytest.raises(TimeoutError, match="batch_1"):
+        await run_deferred_judging(results, queue, runner, client)
+
+    assert server.polls > 0, "Should poll until the deadline"
+    assert results[0].charts_answer_score is None
+
+
+def test_parse_batch_score_non_success():
+    """Errored or expired batch entries should yield no score."""
+    assert parse_batch_score(None) is None
+    assert parse_batch_score({"type": "expired"}) is None
+
+
+# ============================================================================
+# UNIT TESTS FOR JUDGE BACKENDS
+# ============================================================================
+
+
+def test_fake_backend_is_deterministic():
+    """The fake backend should give the same verdict for the same request."""
+    backend = FakeJudgeBackend(pass_rate=0.5, seed=3)
+
+    agent_state = {"charts_data": [{"insight": "Brazil had the most"}], "messages": []}
+    first = evaluate_final_answer(agent_state, "Brazil", judge_backend=backend)
+    second = evaluate_final_answer(agent_state, "Brazil", judge_backend=backend)
+
+    assert first["charts_answer_score"] in (0, 1)
+    assert first["charts_answer_score"] == second["charts_answer_score"]
+
+    always_pass = FakeJudgeBackend(pass_rate=1.0)
+    result = evaluate_final_answer(agent_state, "Brazil", judge_backend=always_pass)
+    assert result["charts_answer_score"] == 1
+
+
+def test_fake_backend_injects_errors():
+    """An error rate of 1 should make every fake judge call fail."""
+    backend = FakeJudgeBackend(error_rate=1.0)
+    agent_state = {"charts_data": [{"insight": "Brazil"}], "messages": []}
+
+    with pytest.raises(FakeJudgeError):
+        evaluate_final_answer(agent_state, "Brazil", judge_backend=backend)
+
+
+def test_clarification_judge_uses_injected_backend():
+    """The clarification judge in the AOI evaluator should use the injected backend."""
+    agent_state = {
+        "aoi_selection": {},
+        "messages": [
+            type("obj", (object,), {"content": "Which region do you mean?"})(),
+        ],
+    }
+
+    result = evaluate_aoi_selection(
+        agent_state,
+        expected_aoi_ids=["BRA"],
+        expected_subregion="",
+        expected_clarification=True,
+        query="Show me data",
+        judge_backend=FakeJudgeBackend(pass_rate=1.0),
+    )
+
+    assert result["clarification_requested_score"] == 1.0
+
+
+def test_recorded_verdicts_can_be_replayed(tmp_path):
+    """Verdicts recorded to a judge cache should be replayed without the original backend."""
+    cache_path = tmp_path / "judge_cache.jsonl"
+    recording = create_judge_backend("fake:pass_rate=1", cache_path=str(cache_path))
+    agent_state = {"charts_data": [{"insight": "Brazil"}], "messages": []}
+
+    recorded = evaluate_final_answer(agent_state, "Brazil", judge_backend=recording)
+    replay = create_judge_backend(f"replay:{cache_path}")
+    replayed = evaluate_final_answer(agent_state, "Brazil", judge_backend=replay)
+
+    assert isinstance(replay, ReplayJudgeBackend)
+    assert replayed["charts_answer_score"] == recorded["charts_answer_score"] == 1
+
+    with pytest.raises(KeyError):
+        evaluate_final_answer(agent_state, "Australia", judge_backend=replay)
+
+
+def test_create_judge_backend_parses_spec():
+    """Backend specs should configure the fake backend and reject unknown kinds."""
+    backend = create_judge_backend(
+        "fake:latency=0.25,jitter=0.05,error_rate=0.1,seed=7",
+    )
+
+    assert isinstance(backend, FakeJudgeBackend)
+    assert backend.latency == 0.25
+    assert backend.error_rate == 0.1
+    assert backend.seed == 7
+
+    with pytest.raises(ValueError):
+        create_judge_backend("openai")
+
+
+def test_self_consistency_stops_early_on_unanimous_votes():
+    """Unanimous votes should stop after a majority instead of drawing every sample."""
+    from gnw_evals.evaluators.judge_usage import judge_usage
+    from gnw_evals.evaluators.llm_judges import llm_judge_self_consistent
+
+    judge_usage.reset()
+    score, confidence = llm_judge_self_consistent(
+        "Brazil",
+        "Brazil",
+        samples=5,
+        backend=FakeJudgeBackend(pass_rate=1.0),
+    )
+
+    assert (score, confidence) == (1, 1.0)
+    assert len(judge_usage.calls) == 3
+
+
+def test_self_consistency_reports_split_votes():
+    """Split votes should give the majority score with the share of agreeing votes."""
+    from gnw_evals.evaluators.llm_judges import llm_judge_self_consistent
+
+    backend = FakeJudgeBackend(pass_rate=0.5, seed=0)
+    agent_state = {"charts_data": [{"insight": "About 200 hectares"}], "messages": []}
+    result = evaluate_final_answer(
+        agent_state,
+        "198.4 hectares",
+        judge_backend=backend,
+        judge_samples=7,
+    )
+
+    score, confidence = llm_judge_self_consistent(
+        "198.4 hectares",
+        "About 200 hectares",
+        samples=7,
+        backend=backend,
+    )
+    assert result["charts_answer_score"] == score
+    assert result["charts_answer_confidence"] == confidence
+    assert 0.5 <= confidence < 1.0
+    assert result["agent_answer_confidence"] is None
+
+
+# ============================================================================
+# UNIT TESTS FOR CLARIFICATION HEURISTIC
+# ============================================================================
+
+
+def test_clarification_classifier_decides_clear_cases():
+    """Obvious questions and errors are decided, long analyses are deferred."""
+    classifier = ClarificationClassifier()
+
+    question = (
+        "There are multiple locations named Springfield. Which one do you mean?\n"
+        "1. Springfield, Illinois\n2. Springfield, Missouri"
+    )
+    assert classifier.classify(question) is True
+    assert classifier.classify("Error: request timed out") is False
+    assert (
+        classifier.classify("Tree cover loss in Brazil was 1.2 Mha in 2023.") is False
+    )
+
+    analysis = (
+        "Tree cover loss in Brazil peaked in 2016. " * 15 + "Would you like more?"
+    )
+    assert classifier.classify(analysis) is None
+
+    with pytest.raises(ValueError):
+        ClarificationClassifier(0.9, 0.1)
+
+
+def test_clarification_heuristic_skips_judge_call():
+    """Decided cases must not reach the judge backend and are counted as saved calls."""
+    from gnw_evals.evaluators.judge_usage import judge_usage
+
+    judge_usage.reset()
+    agent_state = {
+        "aoi_selection": {},
+        "messages": [
+            type("obj", (object,), {"content": "Could you clarify which region?"})(),
+        ],
+    }
+
+    # A failing backend proves the verdict came from the heuristic
+    result = evaluate_aoi_selection(
+        agent_state,
+        expected_aoi_ids=["BRA"],
+        expected_subregion="",
+        expected_clarification=True,
+        query="Show me data",
+        judge_backend=FakeJudgeBackend(error_rate=1.0),
+        clarification_classifier=ClarificationClassifier(),
+    )
+
+    assert result["clarification_requested_score"] == 1.0
+    assert judge_usage.calls == []
+    assert judge_usage.summary_rows()[0]["heuristic_decisions"] == 1
+
+
+def test_calibrate_thresholds_from_judge_cache(tmp_path):
+    """Calibration should read LLM verdicts from a judge cache and recommend thresholds."""
+    responses = {
+        "Which country do you mean?": True,
+        "Could you clarify the time period?": True,
+        "Did you mean Georgia the country or the state?": True,
+        "Tree cover loss in Brazil was 1.2 Mha in 2023.": False,
+        "Error: something went wrong": False,
+        "Deforestation alerts rose 12% compared to last year.": False,
+    }
+    cache_path = tmp_path / "judge_cache.jsonl"
+    entries = [
+        {
+            "key": str(i),
+            "schema": "ClarificationJudgment",
+            "model": "claude-3-5-haiku-latest",
+            "inputs": {"response": response},
+            "output": {"is_clarification": verdict, "explanation": ""},
+        }
+        for i, (response, verdict) in enumerate(responses.items())
+    ]
+    # Fake verdicts are not ground truth and must be ignored
+    entries.append({**entries[0], "key": "fake", "model": "fake"})
+    cache_path.write_text("\n".join(json.dumps(e) for e in entries) + "\n")
+
+    verdicts = load_clarification_verdicts(cache_path)
+    report = calibrate_thresholds(verdicts, min_accuracy=1.0)
+
+    assert report["samples"] == 6
+    assert report["positives"] == 3
+    assert report["current"]["accuracy"] == 1.0
+    assert report["recommended"]["coverage"] == 1.0
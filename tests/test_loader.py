@@ -0,0 +1,574 @@
+"""Unit tests for test suite loading and the remote test file cache.
+
+Usage
+$ uv run pytest tests/test_loader.py -v
+
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from gnw_evals.data_handlers import (
+    AOIIndex,
+    CSVLoader,
+    RemoteFileCache,
+    Shard,
+    SuiteLoader,
+    compute_test_id,
+    detect_suite_format,
+)
+
+SHEET_URL = "https://sheets.example.com/export?format=csv"
+SHEET_CSV = (
+    "query,expected_aoi_ids,test_group,status\n"
+    "Tree cover loss in Brazil,BRA,loss,ready\n"
+    "Alerts in Peru,PER,alerts,done\n"
+)
+
+
+class StandInSheetServer:
+    """Serves a CSV export with an ETag and honours If-None-Match."""
+
+    def __init__(self, body: str):
+        """Initialize with the sheet body."""
+        self.body = body
+        self.requests: list[httpx.Request] = []
+
+    @property
+    def etag(self) -> str:
+        """ETag of the current body."""
+        return f'"{hash(self.body)}"'
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        """Return 304 for a matching ETag, otherwise the full body."""
+        self.requests.append(request)
+        if request.headers.get("If-None-Match") == self.etag:
+            return httpx.Response(304)
+        return httpx.Response(200, text=self.body, headers={"ETag": self.etag})
+
+
+def make_cache(tmp_path, server, offline=False) -> RemoteFileCache:
+    """Create a cache in tmp_path backed by the stand-in server."""
+    return RemoteFileCache(
+        tmp_path / "cache",
+        offline=offline,
+        transport=httpx.MockTransport(server.handle),
+    )
+
+
+def test_cache_revalidates_with_etag(tmp_path):
+    """A cached sheet should be revalidated with a conditional request."""
+    server = StandInSheetServer(SHEET_CSV)
+
+    content, first = make_cache(tmp_path, server).fetch(SHEET_URL)
+    _, second = make_cache(tmp_path, server).fetch(SHEET_URL)
+
+    assert content.decode() == SHEET_CSV
+    assert first["source"] == "network"
+    assert second["source"] == "revalidated"
+    assert second["sha256"] == first["sha256"]
+    assert server.requests[1].headers["If-None-Match"] == server.etag
+
+    # A changed sheet is downloaded again and gets a new hash
+    server.body += "Fires in Chile,CHL,fires,ready\n"
+    _, third = make_cache(tmp_path, server).fetch(SHEET_URL)
+    assert third["source"] == "network"
+    assert third["sha256"] != first["sha256"]
+
+
+def test_cache_offline_mode(tmp_path):
+    """Offline mode should use the cached copy without any request."""
+    server = StandInSheetServer(SHEET_CSV)
+
+    with pytest.raises(FileNotFoundError):
+        make_cache(tmp_path, server, offline=True).fetch(SHEET_URL)
+
+    make_cache(tmp_path, server).fetch(SHEET_URL)
+    content, info = make_cache(tmp_path, server, offline=True).fetch(SHEET_URL)
+
+    assert content.decode() == SHEET_CSV
+    assert info["source"] == "cache"
+    assert len(server.requests) == 1
+
+
+def test_loader_records_suite_hash(tmp_path):
+    """The loader should load cached sheets and record the suite hash."""
+    server = StandInSheetServer(SHEET_CSV)
+    loader = CSVLoader(cache=make_cache(tmp_path, server))
+
+    test_cases = loader.load_test_data(SHEET_URL, sample_size=-1)
+
+    assert [t.expected_aoi_ids for t in test_cases] == [["BRA"], ["PER"]]
+    assert len(loader.suite_info["sha256"]) == 64
+    assert loader.suite_info["etag"] == server.etag
+
+
+def test_loader_cleans_values_and_fills_defaults(tmp_path):
+    """Values should be stripped, null strings blanked and missing fields defaulted."""
+    csv_path = tmp_path / "suite.csv"
+    csv_path.write_text(
+        "query,expected_answer,expected_clarification,notes\n"
+        " Loss in Brazil ,  198.4 hectares ,TRUE,null\n"
+        "Alerts in Peru,None,false, keep me \n",
+    )
+
+    loader = CSVLoader(passthrough_columns=["notes"])
+    test_cases = loader.load_test_data(str(csv_path), sample_size=-1)
+
+    first, second = test_cases
+    assert first.query == "Loss in Brazil"
+    assert first.expected_answer == "198.4 hectares"
+    assert first.expected_clarification is True
+    assert first.notes == ""
+    assert second.expected_answer == ""
+    assert second.notes == "keep me"
+    # Columns missing from the sheet fall back to model defaults
+    assert second.expected_aoi_ids == []
+    assert second.test_group == "unknown"
+
+
+def test_loader_projects_columns_and_filters_before_cleanup(tmp_path):
+    """Only needed columns should be read, and stats should report rows read vs kept."""
+    csv_path = tmp_path / "suite.csv"
+    csv_path.write_text(
+        "query,test_group,status,owner,notes\n"
+        "Loss in Brazil, loss ,Ready,ana,a\n"
+        "Alerts in Peru,alerts,ready,ben,b\n"
+        "Fires in Chile,loss,done,cy,c\n",
+    )
+
+    loader = CSVLoader(passthrough_columns=["owner"])
+    test_cases = loader.load_test_data(
+        str(csv_path),
+        sample_size=-1,
+        test_group_filter="loss",
+        status_filter=["ready"],
+    )
+
+    assert [t.query for t in test_cases] == ["Loss in Brazil"]
+    assert test_cases[0].owner == "ana"
+    assert "notes" not in test_cases[0].model_extra
+    assert loader.load_stats == {
+        "rows_read": 3,
+        "rows_kept": 1,
+        "columns_read": 4,
+        "columns_total": 5,
+    }
+
+
+async def test_streaming_matches_eager_load(tmp_path, monkeypatch):
+    """Streamed test cases should equal the eager load, even with tiny read chunks."""
+    csv_path = tmp_path / "suite.csv"
+    csv_path.write_text(
+        "query,expected_answer,test_group\n"
+        'Loss in Brazil,"Brazil lost 1.2 Mha,\nmostly in Pará",loss\n'
+        'Alerts in Peru,"He said ""no""",alerts\n'
+        "Fires in Chile,2023,loss\n"
+        "Loss in Peru,None,loss",
+        encoding="utf-8",
+    )
+    # Split the file mid-record, mid-quote and mid-character
+    monkeypatch.setattr("gnw_evals.data_handlers.suite_loader.STREAM_CHUNK_BYTES", 7)
+
+    eager_loader = CSVLoader()
+    eager = eager_loader.load_test_data(str(csv_path), sample_size=-1)
+    stream_loader = CSVLoader()
+    streamed = [
+        test_case
+        async for test_case in stream_loader.iter_test_data(
+            str(csv_path),
+            sample_size=-1,
+            chunk_rows=2,
+        )
+    ]
+
+    assert streamed == eager
+    assert streamed[0].expected_answer == "Brazil lost 1.2 Mha,\nmostly in Pará"
+    assert stream_loader.suite_info["sha256"] == eager_loader.suite_info["sha256"]
+
+    # Filters, offset and sample size apply across chunks
+    subset = [
+        test_case.query
+        async for test_case in CSVLoader().iter_test_data(
+            str(csv_path),
+            sample_size=2,
+            test_group_filter="loss",
+            offset=1,
+            chunk_rows=1,
+        )
+    ]
+    assert subset == ["Fires in Chile", "Loss in Peru"]
+
+
+SUITE_RECORDS = [
+    {
+        "query": " Loss in Brazil ",
+        "expected_aoi_ids": ["BRA", 76],
+        "expected_dataset_id": 4,
+        "expected_clarification": True,
+        "test_group": "loss",
+        "owner": "ana",
+    },
+    {
+        "query": "Alerts in Peru",
+        "expected_aoi_ids": "PER;PER.1_1",
+        "expected_answer": None,
+        "test_group": "alerts",
+        "status": "done",
+    },
+    {"query": "Fires in Chile", "test_group": "loss", "expected_answer": "null"},
+]
+
+
+def test_detect_suite_format():
+    """Formats should be detected from the extension of paths and URLs."""
+    assert detect_suite_format("data/suite.csv") == "csv"
+    assert detect_suite_format("data/suite.JSONL") == "jsonl"
+    assert detect_suite_format("https://example.com/suite.parquet?v=2") == "parquet"
+    assert detect_suite_format(SHEET_URL) == "csv"
+
+
+def test_jsonl_suite_keeps_native_types(tmp_path):
+    """JSONL suites should keep lists and booleans and fall back to defaults."""
+    suite_path = tmp_path / "suite.jsonl"
+    suite_path.write_text(
+        "\n".join(json.dumps({**r, "notes": "x"}) for r in SUITE_RECORDS) + "\n",
+    )
+
+    loader = SuiteLoader(passthrough_columns=["owner"])
+    test_cases = loader.load_test_data(
+        str(suite_path),
+        sample_size=-1,
+        status_filter=["ready"],
+    )
+
+    first, second = test_cases
+    assert first.query == "Loss in Brazil"
+    assert first.expected_aoi_ids == ["BRA", "76"]
+    assert first.expected_dataset_id == "4"
+    assert first.expected_clarification is True
+    assert first.owner == "ana"
+    assert "notes" not in first.model_extra
+    # Missing and null values use the model defaults
+    assert second.query == "Fires in Chile"
+    assert second.expected_aoi_ids == []
+    assert second.expected_answer == ""
+    assert second.expected_clarification is False
+    assert loader.load_stats["rows_read"] == 3
+    assert loader.load_stats["columns_read"] == 8
+
+
+async def test_jsonl_streaming_matches_eager_load(tmp_path, monkeypatch):
+    """Streamed JSONL suites should equal the eager load."""
+    suite_path = tmp_path / "suite.jsonl"
+    suite_path.write_text("\n".join(json.dumps(r) for r in SUITE_RECORDS))
+    monkeypatch.setattr("gnw_evals.data_handlers.suite_loader.STREAM_CHUNK_BYTES", 5)
+
+    eager = SuiteLoader().load_test_data(str(suite_path), sample_size=-1)
+    streamed = [
+        test_case
+        async for test_case in SuiteLoader().iter_test_data(
+            str(suite_path),
+            sample_size=-1,
+            chunk_rows=2,
+        )
+    ]
+
+    assert streamed == eager
+    assert streamed[1].expected_aoi_ids == ["PER", "PER.1_1"]
+
+
+def test_parquet_suite_reads_needed_columns(tmp_path):
+    """Parquet suites should keep native types and only read the needed columns."""
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    table = pa.table(
+        {
+            "query": ["Loss in Brazil", "Alerts in Peru"],
+            "expected_aoi_ids": [["BRA", "BRA.1_1"], None],
+            "expected_clarification": [False, True],
+            "notes": ["a", "b"],
+        },
+    )
+    suite_path = tmp_path / "suite.parquet"
+    pq.write_table(table, suite_path)
+
+    loader = SuiteLoader()
+    test_cases = loader.load_test_data(str(suite_path), sample_size=-1)
+
+    assert [t.expected_aoi_ids for t in test_cases] == [["BRA", "BRA.1_1"], []]
+    assert [t.expected_clarification for t in test_cases] == [False, True]
+    assert "notes" not in test_cases[0].model_extra
+    assert loader.load_stats["columns_read"] == 3
+    assert loader.load_stats["columns_total"] == 4
+
+
+def test_multiple_sources_are_tagged_and_deduplicated(tmp_path):
+    """Several test files should load as one suite with source tags and no duplicates."""
+    server = StandInSheetServer(SHEET_CSV)
+    other_sheet = SHEET_URL.replace("format=csv", "format=csv&gid=7")
+    jsonl_path = tmp_path / "extra.jsonl"
+    jsonl_path.write_text(
+        json.dumps({"query": "Fires in Chile", "expected_aoi_ids": ["CHL"]}) + "\n",
+    )
+
+    loader = SuiteLoader(cache=make_cache(tmp_path, server))
+    test_cases = loader.load_test_data(
+        f"{SHEET_URL}, {other_sheet}, {jsonl_path}",
+        sample_size=-1,
+    )
+
+    # Both tabs serve the same rows, so the second one only adds duplicates
+    assert [(t.query, t.source) for t in test_cases] == [
+        ("Tree cover loss in Brazil", SHEET_URL),
+        ("Alerts in Peru", SHEET_URL),
+        ("Fires in Chile", str(jsonl_path)),
+    ]
+    assert loader.load_stats == {"rows_read": 5, "rows_kept": 3, "duplicates": 2}
+    assert len(loader.suite_info["sources"]) == 3
+    assert len(server.requests) == 2
+
+    sampled = SuiteLoader(cache=make_cache(tmp_path, server)).load_test_data(
+        f"{SHEET_URL},{jsonl_path}",
+        sample_size=1,
+        random_seed=0,
+        offset=2,
+    )
+    assert [t.query for t in sampled] == ["Fires in Chile"]
+
+
+def test_loader_compiles_matchers_and_rejects_bad_dates(tmp_path):
+    """Expectations should be compiled at load time and bad dates rejected."""
+    csv_path = tmp_path / "suite.csv"
+    csv_path.write_text(
+        "query,expected_dataset_id,expected_start_date,expected_end_date\n"
+        "Loss in Brazil,0;1,1/1/2020,2023\n",
+    )
+
+    (test_case,) = SuiteLoader().load_test_data(str(csv_path), sample_size=-1)
+    assert test_case.matchers.dataset_id.values == {"0", "1"}
+    assert test_case.matchers.dates.start == "2020-01-01"
+    assert test_case.matchers.dates.matches("2020-01-01", "2023-01-01")
+
+    csv_path.write_text(
+        "query,expected_start_date,expected_end_date\n"
+        "Loss in Brazil,2020-13-45,2023\n"
+        "Alerts in Peru,2020,soon\n",
+    )
+    with pytest.raises(ValueError, match="2 test cases") as error:
+        SuiteLoader().load_test_data(str(csv_path), sample_size=-1)
+    assert "expected_end_date 'soon'" in str(error.value)
+
+
+AOI_INDEX_CSV = (
+    "src_id,source,name\n"
+    "BRA,gadm,Brazil\n"
+    "BRA.26_1,gadm,São Paulo\n"
+    "BRA.26.1_1,gadm,Adamantina\n"
+    "BRA.5_1,gadm,Bahia\n"
+    "PER,gadm,Peru\n"
+    "12345,kba,Some KBA\n"
+)
+
+
+def test_aoi_index_hierarchy_and_suggestions(tmp_path):
+    """The AOI index should know the GADM hierarchy and suggest typo fixes."""
+    index_path = tmp_path / "aois.csv"
+    index_path.write_text(AOI_INDEX_CSV)
+    index = AOIIndex.load(index_path)
+
+    assert len(index) == 6
+    assert "bra.26_1" in index and "12345" in index and "BRA.27_1" not in index
+    assert index.children("BRA") == ["bra.26", "bra.5"]
+    assert index.relation("BRA.26_1", "BRA.26.1_1") == "child"
+    assert index.relation("BRA.26_1", "BRA") == "parent"
+    assert index.relation("BRA.26_1", "PER") == "unrelated"
+    assert index.relation("BRA.26_1", "XYZ") == "unknown"
+    assert index.best_relation("BRA.26_1", ["PER", "BRA"]) == "parent"
+    assert index.validate(["BRA.6_1", "PER"]) == [
+        "unknown AOI ID 'BRA.6_1' (did you mean BRA.26_1, BRA.5_1, BRA?)",
+    ]
+    assert index.validate_subregion(["BRA.26_1"], "state") is not None
+    assert index.validate_subregion(["BRA"], "state-province") is None
+
+
+def test_loader_rejects_ids_missing_from_aoi_index(tmp_path):
+    """Expected AOI IDs missing from the AOI index should fail the load."""
+    index_path = tmp_path / "aois.txt"
+    index_path.write_text("BRA\nBRA.26_1\nPER\n")
+    csv_path = tmp_path / "suite.csv"
+    csv_path.write_text(
+        "query,expected_aoi_ids\nLoss in São Paulo,BRA.26_1\nLoss in Peru,PRE\n",
+    )
+
+    loader = SuiteLoader(aoi_index=AOIIndex.load(index_path))
+    with pytest.raises(ValueError, match="1 expected AOI IDs") as error:
+        loader.load_test_data(str(csv_path), sample_size=-1)
+    assert "unknown AOI ID 'PRE' (did you mean PER?)" in str(error.value)
+
+
+def test_aoi_evaluator_reports_relation_with_index(tmp_path):
+    """Subregion aliases should match with or without an index; relations need one."""
+    from gnw_evals.evaluators import evaluate_aoi_selection
+
+    index_path = tmp_path / "aois.csv"
+    index_path.write_text(AOI_INDEX_CSV)
+    agent_state = {
+        "aoi_selection": {
+            "aois": [{"src_id": "BRA.26.1_1", "source": "gadm"}],
+        },
+        "subregion": "state-province",
+    }
+
+    result = evaluate_aoi_selection(
+        agent_state,
+        ["BRA.26_1", "PER"],
+        "state",
+        aoi_index=AOIIndex.load(index_path),
+    )
+    assert result["aoi_id_match_score"] == 0.0
+    assert result["subregion_match_score"] == 1.0
+    assert result["aoi_relation"] == "child;unrelated"
+
+    # The subregion score doesn't depend on whether an index was given
+    without_index = evaluate_aoi_selection(agent_state, ["BRA.26_1", "PER"], "state")
+    assert without_index["subregion_match_score"] == 1.0
+    assert without_index["aoi_relation"] is None
+
+
+def write_suite(path, queries):
+    """Write a CSV suite with the given queries."""
+    path.write_text("query,test_group\n" + "".join(f"{q},loss\n" for q in queries))
+
+
+def test_shards_are_disjoint_and_stable(tmp_path):
+    """Shards should partition the suite and keep their tests as rows are added."""
+    queries = [f"Tree cover loss in region {i}" for i in range(60)]
+    suite_path = tmp_path / "suite.csv"
+    write_suite(suite_path, queries)
+
+    def load_shards(count):
+        return [
+            {
+                t.query
+                for t in SuiteLoader(shard=Shard(i, count)).load_test_data(
+                    str(suite_path),
+                    sample_size=-1,
+                )
+            }
+            for i in range(count)
+        ]
+
+    shards = load_shards(3)
+    assert set().union(*shards) == set(queries)
+    assert sum(len(s) for s in shards) == len(queries)
+    assert all(len(s) > 10 for s in shards)
+
+    # New rows don't move existing tests to another shard
+    write_suite(suite_path, [*queries, *(f"Alerts in region {i}" for i in range(20))])
+    for before, after in zip(shards, load_shards(3), strict=True):
+        assert before <= after
+
+    assert compute_test_id(" Tree  cover loss ") == compute_test_id("tree cover loss")
+    assert str(Shard.parse("2/3")) == "2/3"
+    with pytest.raises(ValueError):
+        Shard.parse("4/3")
+
+
+def test_test_ids_tell_apart_rows_repeating_a_query(tmp_path):
+    """Rows repeating a query with other expectations should get their own ID."""
+    import pandas as pd
+
+    from gnw_evals.data_handlers.sharding import frame_test_ids
+
+    suite_path = tmp_path / "suite.csv"
+    suite_path.write_text(
+        "query,expected_aoi_ids,expected_answer,expected_clarification\n"
+        "Tree cover loss in Brazil,BRA; COL,1.2 Mha,FALSE\n"
+        "Tree cover loss in Brazil,BRA,1.2 Mha,false\n"
+        "Tree cover loss in Brazil,BRA,,TRUE\n"
+        "Tree cover loss  in brazil,BRA,,true\n",
+    )
+    test_cases = SuiteLoader().load_test_data(str(suite_path), sample_size=-1)
+    ids = [compute_test_id(t.query, t.model_dump()) for t in test_cases]
+
+    assert len(set(ids)) == 3
+    assert ids[2] == ids[3]
+    # Raw sheet rows (as sharded) get the same IDs as the loaded test cases
+    raw = pd.read_csv(suite_path, dtype=str, keep_default_na=False)
+    assert frame_test_ids(raw).tolist() == ids
+
+    # Every row lands in exactly one shard
+    sharded = [
+        SuiteLoader(shard=Shard(i, 2)).load_test_data(str(suite_path), sample_size=-1)
+        for i in range(2)
+    ]
+    assert sum(len(s) for s in sharded) == 4
+
+
+async def test_weighted_shards_balance_durations(tmp_path):
+    """With historical durations, shards should get similar expected run times."""
+    queries = [f"query {i}" for i in range(12)]
+    suite_path = tmp_path / "suite.csv"
+    write_suite(suite_path, queries)
+    # Two slow tests and many fast ones
+    durations = {compute_test_id(q): 1.0 for q in queries}
+    durations[compute_test_id("query 0")] = 10.0
+    durations[compute_test_id("query 1")] = 10.0
+
+    loads = []
+    for i in range(2):
+        shard = Shard(i, 2, durations)
+        streamed = [
+            t.query
+            async for t in SuiteLoader(shard=shard).iter_test_data(
+                str(suite_path),
+                sample_size=-1,
+            )
+        ]
+        loads.append(sum(durations[compute_test_id(q)] for q in streamed))
+
+    assert loads == [15.0, 15.0]
+
+
+async def test_streaming_scheduler_bounds_pending_tests():
+    """Tests should start before the source is exhausted, with bounded buffering."""
+    from gnw_evals.core import run_streaming_tests
+    from gnw_evals.runners.base import BaseTestRunner
+    from gnw_evals.utils.eval_types import ExpectedData, TestResult
+
+    produced = []
+    running = 0
+    max_running = 0
+    started_before_source_done = False
+
+    async def source():
+        for i in range(20):
+            produced.append(i)
+            yield ExpectedData(query=f"query {i}")
+
+    class StubRunner(BaseTestRunner):
+        async def run_test(self, query, expected_data):
+            nonlocal running, max_running, started_before_source_done
+            running += 1
+            max_running = max(max_running, running)
+            started_before_source_done |= len(produced) < 20
+            # Workers never run more than the buffer ahead of the source
+            assert len(produced) <= int(query.split()[1]) + 1 + 2 * 3
+            await asyncio.sleep(0)
+            running -= 1
+            return TestResult(
+                thread_id=query,
+                query=query,
+                overall_score=1.0,
+                execution_time="",
+            )
+
+    results = await run_streaming_tests(StubRunner(), source(), num_workers=3)
+
+    assert [r.query for r in results] == [f"query {i}" for i in range(20)]
+    assert max_running <= 3
+    assert started_before_source_done
@@ -5,14 +5,18 @@ $ uv run pytest tests/test_run_evals.py -v
 
 """
 
+import asyncio
 import json
+import tracemalloc
 from dataclasses import dataclass
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
 from gnw_evals.core import run_csv_tests
-from gnw_evals.utils.eval_types import ExpectedData
+from gnw_evals.data_handlers import Shard
+from gnw_evals.utils.eval_types import ExpectedData, TestResult
+from gnw_evals.utils.slo import SLOGate
 
 
 class MockStreamContextManager:
@@ -134,12 +138,39 @@ class TestConfig:
     api_token: str = "test_token"
     sample_size: int = 3
     test_file: str = "gnw-eval-sets-gold.csv"
+    offline: bool = False
+    stream: bool = False
+    test_file_cache_dir: str = ".cache/test_files"
     test_group_filter: str | None = None
     status_filter: list[str] | None = None
+    passthrough_columns: list[str] | None = None
     output_filename: str = "test_results.csv"
     num_workers: int = 1
     random_seed: int = 0
     offset: int = 0
+    judge_mode: str = "inline"
+    batch_poll_interval: float = 0.01
+    batch_timeout: float = 7200.0
+    judge_budget_tokens: int | None = None
+    judge_budget_usd: float | None = None
+    judge_budget_action: str = "deterministic"
+    judge_backend: str = "fake"
+    judge_cache: str | None = None
+    judge_samples: int = 1
+    clarification_heuristic: bool = False
+    clarification_thresholds: tuple[float, float] = (0.15, 0.85)
+    shard: Shard | None = None
+    dedupe_queries: bool = False
+    archive_states: bool = False
+    aoi_index: str | None = None
+    record_history: bool = False
+    history_db: str | None = None
+    metrics_port: int | None = None
+    live_status_interval: float = 0.0
+    trace: bool = False
+    profile: bool = False
+    profile_snapshot_every: int = 100
+    slo_gate: SLOGate | None = None
 
 
 @pytest.fixture
@@ -155,8 +186,8 @@ async def test_run_csv_tests_with_mocked_data(
     mock_config,
 ):
     """Test run_csv_tests with mocked CSV loader and API calls."""
-    # Mock the CSVLoader
-    with patch("gnw_evals.core.CSVLoader") as mock_loader_class:
+    # Mock the SuiteLoader
+    with patch("gnw_evals.core.SuiteLoader") as mock_loader_class:
         mock_loader = MagicMock()
         mock_loader.load_test_data.return_value = mock_test_cases
         mock_loader_class.return_value = mock_loader
@@ -255,7 +286,7 @@ async def test_run_csv_tests_with_mocked_data(
                             "clarification_requested_score",
                         ), "Should have clarification_requested_score field"
 
-                        # Check that CSVLoader was called correctly
+                        # Check that SuiteLoader was called correctly
                         mock_loader.load_test_data.assert_called_once_with(
                             mock_config.test_file,
                             mock_config.sample_size,
@@ -280,7 +311,7 @@ async def test_run_csv_tests_with_multiple_workers(
     """Test run_csv_tests with multiple workers (parallel execution)."""
     mock_config.num_workers = 2
 
-    with patch("gnw_evals.core.CSVLoader") as mock_loader_class:
+    with patch("gnw_evals.core.SuiteLoader") as mock_loader_class:
         mock_loader = MagicMock()
         mock_loader.load_test_data.return_value = mock_test_cases
         mock_loader_class.return_value = mock_loader
@@ -340,7 +371,7 @@ async def test_run_csv_tests_with_multiple_workers(
 @pytest.mark.asyncio
 async def test_run_csv_tests_with_api_error(mock_test_cases, mock_config):
     """Test run_csv_tests handles API errors gracefully."""
-    with patch("gnw_evals.core.CSVLoader") as mock_loader_class:
+    with patch("gnw_evals.core.SuiteLoader") as mock_loader_class:
         mock_loader = MagicMock()
         mock_loader.load_test_data.return_value = mock_test_cases[
             :1
@@ -386,7 +417,7 @@ async def test_run_csv_tests_with_api_error(mock_test_cases, mock_config):
 @pytest.mark.asyncio
 async def test_run_csv_tests_with_empty_data(mock_config):
     """Test run_csv_tests with empty test data."""
-    with patch("gnw_evals.core.CSVLoader") as mock_loader_class:
+    with patch("gnw_evals.core.SuiteLoader") as mock_loader_class:
         mock_loader = MagicMock()
         mock_loader.load_test_data.return_value = []  # Empty list
         mock_loader_class.return_value = mock_loader
@@ -406,6 +437,57 @@ async def test_run_csv_tests_with_empty_data(mock_config):
             )
 
 
+@pytest.mark.asyncio
+async def test_run_csv_tests_exports_results_when_judging_fails(
+    mock_test_cases,
+    mock_config,
+):
+    """A failing deferred judge batch should not lose the agent results."""
+    mock_config.judge_mode = "batch"
+    mock_config.judge_backend = "anthropic"
+    mock_config.metrics_port = 0
+    mock_config.live_status_interval = 0.01
+    mock_config.trace = True
+    mock_config.profile = True
+
+    async def fake_test(runner, test_case, test_index, total_tests, queued_at=None):
+        return TestResult(
+            thread_id=f"thread-{test_index}",
+            query=test_case.query,
+            overall_score=0.5,
+            execution_time="2024-01-01T00:00:00",
+        )
+
+    with (
+        patch("gnw_evals.core.SuiteLoader") as mock_loader_class,
+        patch("gnw_evals.core.ResultExporter") as mock_exporter_class,
+        patch("gnw_evals.core.MetricsServer") as mock_server_class,
+        patch("gnw_evals.core.run_single_test", side_effect=fake_test),
+        patch(
+            "gnw_evals.core.run_deferred_judging",
+            side_effect=TimeoutError("batch did not finish"),
+        ),
+    ):
+        mock_loader_class.return_value.load_test_data.return_value = mock_test_cases
+        mock_exporter = mock_exporter_class.return_value
+
+        with pytest.raises(TimeoutError):
+            await run_csv_tests(mock_config)
+        # Live metrics are torn down with the run
+        mock_server_class.return_value.stop.assert_called_once()
+        await asyncio.sleep(0)
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+
+    saved = mock_exporter.save_results_to_csv.call_args[0][0]
+    assert [r.thread_id for r in saved] == ["thread-0", "thread-1", "thread-2"]
+    metadata = mock_exporter.save_run_metadata.call_args[0][0]
+    assert metadata["aborted_by"] == "TimeoutError"
+    mock_exporter.save_to_history.assert_not_called()
+    mock_exporter.save_trace.assert_called_once()
+    mock_exporter.save_profile.assert_called_once()
+    assert not tracemalloc.is_tracing()
+
+
 # ============================================================================
 # UNIT TESTS FOR MISSING EXPECTED VALUES
 # ============================================================================
@@ -1014,3 +1096,771 @@ def test_evaluate_data_pull_with_date_format_mismatch():
         "Invalid expected dates should result in None score (not evaluated)"
     )
     assert result_invalid["date_success"] is None
+
+
+# ============================================================================
+# UNIT TESTS FOR JUDGE USAGE ACCOUNTING AND BUDGETS
+# ============================================================================
+
+
+def test_judge_usage_aggregates_per_evaluator_and_test_group():
+    """Test that judge usage is aggregated per evaluator and test group with costs."""
+    from gnw_evals.evaluators.judge_usage import JudgeUsageTracker, current_test_group
+
+    tracker = JudgeUsageTracker()
+    current_test_group.set("gold")
+    tracker.record("answer", "claude-3-5-haiku-latest", 1_000_000, 0, 0, 1.0)
+    tracker.record("answer", "claude-3-5-haiku-latest", 0, 1_000_000, 0, 3.0)
+    tracker.record("aoi", "claude-3-5-haiku-latest", 100, 10, 0, 0.5, test_group="x")
+
+    rows = {(r["evaluator"], r["test_group"]): r for r in tracker.summary_rows()}
+
+    assert rows[("answer", "gold")]["calls"] == 2
+    assert rows[("answer", "gold")]["mean_latency_s"] == 2.0
+    # $0.80 per million input tokens + $4.00 per million output tokens
+    assert rows[("answer", "gold")]["cost_usd"] == 4.8
+    assert rows[("aoi", "x")]["input_tokens"] == 100
+    assert tracker.total_tokens == 2_000_110
+
+
+def test_parse_judge_budget():
+    """Test that judge budgets parse as tokens or dollars."""
+    from gnw_evals.evaluators.judge_usage import parse_judge_budget
+
+    assert parse_judge_budget("500000") == (500000, None)
+    assert parse_judge_budget("$2.50") == (None, 2.5)
+    assert parse_judge_budget("3usd") == (None, 3.0)
+
+
+def test_llm_judge_degrades_when_budget_exceeded():
+    """Test that answer judging falls back to deterministic scoring or skips once over budget."""
+    from gnw_evals.evaluators import llm_judges
+    from gnw_evals.evaluators.clarification_classifier import ClarificationClassifier
+    from gnw_evals.evaluators.judge_usage import judge_usage
+
+    judge_usage.reset()
+    judge_usage.configure_budget(budget_tokens=10)
+    judge_usage.record("answer", "claude-3-5-haiku-latest", 10, 5)
+
+    try:
+        with patch.object(
+            llm_judges,
+            "_invoke_judge",
+            side_effect=AssertionError("Judge should not be called"),
+        ):
+            assert llm_judges.llm_judge("198.4 hectares", "About 200 hectares") == 1
+            assert llm_judges.llm_judge("TRUE", "No, it did not") == 0
+
+            # Clarification only falls back to the heuristic if it was enabled
+            agent_state = {
+                "charts_data": [{"insight": "Which Springfield do you mean?"}],
+            }
+            result = llm_judges.llm_judge_clarification(agent_state, "Springfield")
+            assert result == {
+                "is_clarification": False,
+                "explanation": "Judge budget exceeded",
+            }
+            result = llm_judges.llm_judge_clarification(
+                agent_state,
+                "Springfield",
+                classifier=ClarificationClassifier(0.0, 1.0),
+            )
+            assert "heuristic verdict" in result["explanation"]
+            assert sum(judge_usage.heuristic_decisions.values()) == 1
+
+            judge_usage.configure_budget(budget_tokens=10, action="skip")
+            assert llm_judges.llm_judge("Brazil", "Brazil") is None
+    finally:
+        judge_usage.reset()
+
+
+def test_deterministic_answer_score():
+    """Test the rule-based answer scorer used as a budget fallback."""
+    from gnw_evals.evaluators.utils import deterministic_answer_score
+
+    assert deterministic_answer_score("TRUE", "Yes, the statement is true.") == 1
+    assert deterministic_answer_score("TRUE", "False.") == 0
+    assert deterministic_answer_score("2015", "The year was 2015") == 1
+    assert deterministic_answer_score("2015", "The year was 2016") == 0
+    assert deterministic_answer_score("211 kha", "220 kha") == 1
+    assert deterministic_answer_score("211 kha", "235 kha") == 0
+    assert deterministic_answer_score("Brazil", "Brazil had the most") == 1
+    assert deterministic_answer_score("Brazil", "Australia") == 0
+
+
+def test_merge_combines_shard_results(tmp_path, monkeypatch):
+    """Test that merge dedupes shard results and re-aggregates judge usage."""
+    from click.testing import CliRunner
+
+    from gnw_evals.core import run_evals
+    from gnw_evals.data_handlers import ResultExporter, load_results_csv
+    from gnw_evals.data_handlers import result_exporter as result_exporter_module
+    from gnw_evals.utils.eval_types import TestResult
+
+    monkeypatch.setattr(result_exporter_module, "OUTPUT_DIR", tmp_path)
+
+    def shard_result(query, score, expected_answer=""):
+        return TestResult(
+            thread_id=query,
+            query=query,
+            test_id=query[:4],
+            expected_answer=expected_answer,
+            overall_score=score,
+            execution_time="2025-01-01T00:00:00",
+            duration_seconds=1.5,
+            expected_aoi_ids=["BRA"],
+            expected_clarification=True,
+            aoi_id_match_score=score,
+        )
+
+    # The second shard repeats "aaaa" and has "bbbb" with another expectation
+    shards = (
+        ("1/2", [("aaaa", ""), ("bbbb", "")]),
+        ("2/2", [("cccc", ""), ("aaaa", ""), ("bbbb", "Brazil")]),
+    )
+    for shard, rows in shards:
+        exporter = ResultExporter()
+        base = f"shard{shard[0]}"
+        exporter.save_results_to_csv(
+            [shard_result(q, 1.0, answer) for q, answer in rows],
+            base,
+        )
+        exporter.save_judge_usage(
+            [
+                {
+                    "evaluator": "answer",
+                    "test_group": "loss",
+                    "calls": 2,
+                    "heuristic_decisions": 0,
+                    "errors": 0,
+                    "batch_calls": 0,
+                    "input_tokens": 100,
+                    "output_tokens": 10,
+                    "cached_tokens": 0,
+                    "total_latency_s": 1.0,
+                    "mean_latency_s": 0.5,
+                    "cost_usd": 0.001,
+                },
+            ],
+            base,
+        )
+        exporter.save_run_metadata({"shard": shard, "suite": {"sha256": "x"}}, base)
+
+    round_trip = load_results_csv(next(tmp_path.glob("shard1_*_detailed.csv")))
+    assert round_trip[0].expected_aoi_ids == ["BRA"]
+    assert round_trip[0].expected_clarification is True
+    assert round_trip[0].subregion_match_score is None
+
+    result = CliRunner().invoke(
+        run_evals,
+        [
+            "merge",
+            *sorted(str(p) for p in tmp_path.glob("shard*_detailed.csv")),
+            "--output-filename",
+            "merged",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "dropped 1 tests" in result.output
+    merged = load_results_csv(next(tmp_path.glob("merged_*_detailed.csv")))
+    assert [r.query for r in merged] == ["aaaa", "bbbb", "cccc", "bbbb"]
+    assert len({r.test_id for r in merged}) == 4
+    with open(next(tmp_path.glob("merged_*_judge_usage.csv"))) as f:
+        usage = f.read().splitlines()
+    assert usage[1].startswith("answer,loss,4,0,0,0,200,20,0,2.0,0.5,")
+    metadata = json.loads(next(tmp_path.glob("merged_*_run.json")).read_text())
+    assert metadata["shards"] == ["1/2", "2/2"]
+    assert metadata["suite"] == {"sha256": "x"}
+
+
+@pytest.mark.asyncio
+async def test_dedupe_queries_shares_agent_runs():
+    """Test that rows with the same query share one agent run."""
+    import asyncio
+
+    from gnw_evals.runners.api import APITestRunner
+
+    runner = APITestRunner(api_base_url="http://test", dedupe_queries=True)
+    agent_queries = []
+
+    async def fake_run_agent(query, skip_chat=False):
+        agent_queries.append(query)
+        thread_id = f"thread-{len(agent_queries)}"
+        await asyncio.sleep(0.01)
+        runner._node_seconds[thread_id] = {"agent": 0.01}
+        runner._state_digests[thread_id] = thread_id
+        return thread_id, None, None, {"messages": []}
+
+    rows = [
+        ("Tree cover loss in Brazil", ExpectedData(test_group="aoi")),
+        ("tree cover  loss in Brazil", ExpectedData(test_group="answer")),
+        ("Alerts in Peru", ExpectedData()),
+        ("Tree cover loss in Brazil", ExpectedData(thread_id="existing")),
+    ]
+    with (
+        patch.object(runner, "_run_agent", side_effect=fake_run_agent),
+        patch.object(runner, "_run_evaluations", return_value={}),
+    ):
+        results = await asyncio.gather(
+            *(runner.run_test(query, expected) for query, expected in rows),
+        )
+
+    # Rows pinned to a thread always get their own run
+    assert len(agent_queries) == 3
+    assert runner.agent_calls == 3
+    assert runner.agent_calls_saved == 1
+    assert results[0].thread_id == results[1].thread_id
+    assert results[1].test_group == "answer"
+    assert len({r.thread_id for r in results}) == 3
+    assert all(r.node_seconds == {"agent": 0.01} for r in results)
+    assert all(r.state_sha256 == r.thread_id for r in results)
+    # Agent runs and their details are released once no row waits for them
+    await asyncio.sleep(0)
+    assert runner._agent_runs == {}
+    assert runner._node_seconds == {} and runner._state_digests == {}
+
+    # Registered rows share a run even when they run one after another, and
+    # the run is released after the last of them
+    agent_queries.clear()
+    for query, expected in rows[:2]:
+        runner.register_test(query, expected)
+    with (
+        patch.object(runner, "_run_agent", side_effect=fake_run_agent),
+        patch.object(runner, "_run_evaluations", return_value={}),
+    ):
+        first = await runner.run_test(*rows[0])
+        assert len(runner._agent_runs) == 1
+        second = await runner.run_test(*rows[1])
+
+    assert len(agent_queries) == 1
+    assert first.thread_id == second.thread_id
+    assert second.node_seconds == {"agent": 0.01}
+    await asyncio.sleep(0)
+    assert runner._agent_runs == {}
+    assert runner._node_seconds == {}
+    assert not runner._pending_rows
+
+
+def test_dataset_selection_accepts_any_semicolon_value():
+    """Test that semicolon multi-values for dataset and context layer match any value."""
+    from gnw_evals.evaluators import evaluate_dataset_selection
+    from gnw_evals.evaluators.matchers import ExpectationMatchers
+
+    agent_state = {"dataset": {"dataset_id": 1, "context_layer": "natural_lands"}}
+    result = evaluate_dataset_selection(agent_state, "0; 1", "driver;natural_lands")
+    assert result["dataset_id_match_score"] == 1.0
+    assert result["context_layer_match_score"] == 1.0
+
+    # Precompiled matchers take precedence over the raw values
+    matchers = ExpectationMatchers.compile(
+        ExpectedData(expected_dataset_id="4", expected_context_layer="driver"),
+    )
+    result = evaluate_dataset_selection(agent_state, "0;1", "", matchers=matchers)
+    assert result["dataset_id_match_score"] == 0.0
+    assert result["context_layer_match_score"] == 0.0
+
+
+def test_rescore_reevaluates_archived_states(tmp_path, monkeypatch):
+    """Test that rescore re-evaluates archived agent states and diffs the scores."""
+    from click.testing import CliRunner
+
+    from gnw_evals.core import run_evals
+    from gnw_evals.data_handlers import (
+        ResultExporter,
+        StateArchive,
+        load_results_csv,
+    )
+    from gnw_evals.data_handlers import result_exporter as result_exporter_module
+    from gnw_evals.utils.eval_types import TestResult
+
+    monkeypatch.setattr(result_exporter_module, "OUTPUT_DIR", tmp_path)
+
+    exporter = ResultExporter()
+    archive = StateArchive(exporter.states_dir("run"))
+    state = json.dumps(
+        {"aoi_selection": {"aois": [{"src_id": "BRA.1_1", "source": "gadm"}]}},
+    )
+    state_sha256 = archive.put(state)
+    assert archive.put(state) == state_sha256
+    assert archive.get(state_sha256) == state
+
+    results = [
+        TestResult(
+            thread_id=f"thread-{i}",
+            query=query,
+            overall_score=0.0,
+            execution_time="2025-01-01T00:00:00",
+            state_sha256=sha,
+            expected_aoi_ids=["BRA.1"],
+            aoi_id_match_score=0.0,
+        )
+        for i, (query, sha) in enumerate(
+            [("Loss in Acre", state_sha256), ("Loss in Peru", None)],
+        )
+    ]
+    exporter.save_results_to_csv(results, "run")
+    detailed_file = next(tmp_path.glob("run_*_detailed.csv"))
+
+    result = CliRunner().invoke(
+        run_evals,
+        [
+            "rescore",
+            str(detailed_file),
+            "--num-workers",
+            "2",
+            "--judge-backend",
+            "fake",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "1 tests have no archived agent state" in result.output
+    rescored = load_results_csv(next(tmp_path.glob("run_*_rescored_*_detailed.csv")))
+    assert [r.thread_id for r in rescored] == ["thread-0", "thread-1"]
+    assert rescored[0].aoi_id_match_score == 1.0
+    assert rescored[0].state_sha256 == state_sha256
+    with open(next(tmp_path.glob("run_*_rescored_*_score_diff.csv"))) as f:
+        diff = f.read().splitlines()
+    assert "Loss in Acre,,thread-0,aoi_id_match_score,0.0,1.0" in diff
+
+
+def test_run_history_returns_score_series(tmp_path, monkeypatch):
+    """Test that runs are recorded in the history store and queried per test."""
+    from gnw_evals.data_handlers import ResultExporter, RunHistory
+    from gnw_evals.data_handlers import result_exporter as result_exporter_module
+    from gnw_evals.utils.eval_types import TestResult
+
+    monkeypatch.setattr(result_exporter_module, "OUTPUT_DIR", tmp_path)
+
+    def run_results(scores):
+        return [
+            TestResult(
+                thread_id=query,
+                query=query,
+                test_id=query[:4],
+                test_group=group,
+                overall_score=score,
+                aoi_id_match_score=score,
+                execution_time="2025-01-01T00:00:00",
+            )
+            for (query, group), score in zip(
+                [("aaaa", "loss"), ("bbbb", "alerts")],
+                scores,
+                strict=True,
+            )
+        ]
+
+    history = RunHistory(tmp_path / "history.sqlite")
+    for day, scores in enumerate([(1.0, 1.0), (0.0, 1.0), (1.0, 0.5)], start=1):
+        history.record_run(
+            f"run{day}",
+            f"2025-01-0{day}T00:00:00",
+            run_results(scores),
+            {"suite": {"sha256": "x"}},
+            environment="staging" if day < 3 else "production",
+        )
+    # Recording a run again replaces it
+    history.record_run("run1", "2025-01-01T00:00:00", run_results((1.0, 1.0)))
+
+    series = history.score_history(test_ids=["aaaa"])
+    assert series["run_id"].tolist() == ["run1", "run2", "run3"]
+    assert series["overall_score"].tolist() == [1.0, 0.0, 1.0]
+    recent = history.score_history(test_group="alerts", last_runs=2)
+    assert recent["overall_score"].tolist() == [1.0, 0.5]
+    assert len(history.runs(environment="staging")) == 1
+    assert len(history.run_results("run1")) == 2
+
+    exporter = ResultExporter()
+    run_id = exporter.save_to_history(run_results((1.0, 1.0)), {}, "nightly")
+    assert run_id.startswith("nightly_")
+    default_history = RunHistory(tmp_path / "history.sqlite")
+    assert run_id in default_history.runs()["run_id"].tolist()
+
+    # Recording is opt-in so local runs stay out of the shared store
+    from gnw_evals.core import run_evals
+
+    option = next(p for p in run_evals.params if p.name == "record_history")
+    assert option.default is False
+
+
+def test_diff_flags_significant_regressions(tmp_path, monkeypatch):
+    """Test that diff pairs tests by test_id and exits 1 on significant regressions."""
+    import pandas as pd
+    from click.testing import CliRunner
+
+    from gnw_evals.core import run_evals
+    from gnw_evals.data_handlers import result_exporter as result_exporter_module
+
+    monkeypatch.setattr(result_exporter_module, "OUTPUT_DIR", tmp_path)
+
+    queries = [f"query {i}" for i in range(200)]
+    groups = ["loss" if i % 2 else "alerts" for i in range(200)]
+    baseline = pd.DataFrame(
+        {"query": queries, "test_group": groups, "overall_score": 1.0},
+    )
+    # Candidate rows are shuffled and only the alerts group regresses
+    candidate = baseline.assign(
+        overall_score=[
+            0.0 if g == "alerts" and i % 4 else 1.0 for i, g in enumerate(groups)
+        ],
+        date_match_score=None,
+    ).iloc[::-1]
+    baseline.to_csv(tmp_path / "a.csv", index=False)
+    candidate.to_csv(tmp_path / "b.csv", index=False)
+
+    result = CliRunner().invoke(
+        run_evals,
+        ["diff", str(tmp_path / "a.csv"), str(tmp_path / "b.csv")],
+    )
+    assert result.exit_code == 1, result.output
+    assert "Paired tests: 200" in result.output
+    assert "Significant regressions: overall_score, pass_rate" in result.output
+
+    checks = pd.read_csv(next(tmp_path.glob("diff_*_diff.csv")))
+    loss = checks[
+        (checks["scope"] == "test_group:loss") & (checks["check"] == "pass_rate")
+    ]
+    assert loss["delta"].item() == 0.0 and not loss["significant"].item()
+    alerts = checks[
+        (checks["scope"] == "test_group:alerts") & (checks["check"] == "overall_score")
+    ]
+    assert alerts["delta"].item() == -0.5 and alerts["regression"].item()
+    flips = pd.read_csv(next(tmp_path.glob("diff_*_flips.csv")))
+    assert len(flips) == 50 and set(flips["flip"]) == {"regressed"}
+
+    result = CliRunner().invoke(
+        run_evals,
+        ["diff", str(tmp_path / "a.csv"), str(tmp_path / "a.csv")],
+    )
+    assert result.exit_code == 0, result.output
+
+
+def test_summary_groups_checks_and_latency():
+    """Test that the summary aggregates checks, pass rates and latency per group."""
+    from gnw_evals.utils.eval_types import TestResult
+    from gnw_evals.utils.summary import summarize_results
+
+    results = [
+        TestResult(
+            thread_id=str(i),
+            query=f"query {i}",
+            overall_score=1.0 if i < 6 else 0.0,
+            execution_time="2025-01-01T00:00:00",
+            duration_seconds=float(i + 1),
+            test_group="loss" if i % 2 else "alerts",
+            aoi_id_match_score=None if i % 3 else 1.0,
+            error="timed out" if i == 9 else None,
+            error_type="ReadTimeout" if i == 9 else None,
+        )
+        for i in range(10)
+    ]
+
+    summary = summarize_results(results)
+    assert summary["tests"] == 10
+    assert summary["passed"] == 6
+    assert summary["checks"]["aoi_id_match_score"] == {"mean": 1.0, "none": 6}
+    assert summary["checks"]["date_match_score"] == {"mean": None, "none": 10}
+    assert summary["latency_seconds"]["p50"] == 5.5
+    assert summary["latency_seconds"]["max"] == 10.0
+    assert summary["by_test_group"]["alerts"]["pass_rate"] == 0.6
+    assert summary["by_test_group"]["loss"]["tests"] == 5
+    assert summary["by_error_type"]["ReadTimeout"]["tests"] == 1
+    assert summary["by_status"]["ready"]["tests"] == 10
+    json.dumps(summary)
+
+
+def test_live_metrics_endpoint_serves_run_metrics():
+    """Test that the metrics endpoint reports in-flight tests, latency and judges."""
+    import httpx
+
+    from gnw_evals.utils.live_metrics import MetricsServer, RunMetrics
+
+    metrics = RunMetrics()
+    metrics.test_queued(12)
+    for i in range(10):
+        metrics.test_started()
+        metrics.test_finished(float(i + 1), error=i == 9)
+    metrics.test_started()
+    metrics.judge_started()
+    metrics.watch_queue("stream_buffer", lambda: 3)
+
+    server = MetricsServer(metrics, 0)
+    server.start()
+    try:
+        response = httpx.get(f"http://127.0.0.1:{server.port}/metrics")
+    finally:
+        server.stop()
+
+    assert response.status_code == 200
+    lines = set(response.text.splitlines())
+    assert "gnw_evals_tests_queued 1" in lines
+    assert "gnw_evals_tests_in_flight 1" in lines
+    assert "gnw_evals_tests_completed_total 10" in lines
+    assert "gnw_evals_test_error_ratio 0.1" in lines
+    assert 'gnw_evals_test_duration_seconds{quantile="0.5"} 6.0' in lines
+    assert 'gnw_evals_test_duration_seconds{quantile="0.95"} 10.0' in lines
+    assert "gnw_evals_judge_calls_in_flight 1" in lines
+    assert 'gnw_evals_queue_depth{queue="stream_buffer"} 3' in lines
+    assert "1 in flight" in metrics.status_line()
+
+
+@pytest.mark.asyncio
+async def test_trace_records_nested_spans_per_test(tmp_path, monkeypatch):
+    """Test that a traced test records its evaluator spans on its own track."""
+    import asyncio
+    import time
+
+    from gnw_evals.core import run_single_test
+    from gnw_evals.data_handlers import ResultExporter
+    from gnw_evals.data_handlers import result_exporter as result_exporter_module
+    from gnw_evals.runners.base import BaseTestRunner
+    from gnw_evals.utils.tracing import tracer
+
+    class StateRunner(BaseTestRunner):
+        async def run_test(self, query, expected_data):
+            return await asyncio.to_thread(
+                self._create_evaluation_result,
+                "thread",
+                None,
+                None,
+                query,
+                expected_data,
+                {"messages": []},
+            )
+
+    tracer.start()
+    try:
+        await run_single_test(
+            StateRunner(),
+            ExpectedData(query="forest loss in Brazil", test_group="loss"),
+            4,
+            10,
+            time.perf_counter() - 0.5,
+        )
+    finally:
+        tracer.stop()
+
+    spans = [e for e in tracer.events if e["ph"] == "X"]
+    names = {e["name"] for e in spans}
+    assert {"dispatch_wait", "test", "evaluate_aoi_selection"} <= names
+    assert {"evaluate_final_answer"} <= names
+    assert {e["tid"] for e in spans} == {5}
+    wait = next(e for e in spans if e["name"] == "dispatch_wait")
+    assert wait["dur"] >= 500_000
+    test = next(e for e in spans if e["name"] == "test")
+    assert all(
+        test["ts"] <= e["ts"] and e["ts"] + e["dur"] <= test["ts"] + test["dur"] + 1
+        for e in spans
+        if e["name"].startswith("evaluate_")
+    )
+
+    monkeypatch.setattr(result_exporter_module, "OUTPUT_DIR", tmp_path)
+    ResultExporter().save_trace(tracer.events, "traced")
+    trace_file = next(tmp_path.glob("traced_*_trace.json"))
+    assert json.loads(trace_file.read_text())["traceEvents"]
+
+
+def test_harness_profiler_samples_stacks_and_snapshots_allocations():
+    """Test that the profiler folds sampled stacks and snapshots allocations."""
+    import time
+
+    from gnw_evals.utils.live_metrics import RunMetrics
+    from gnw_evals.utils.profiling import HarnessProfiler
+
+    def busy_harness_work(until):
+        blocks = []
+        while time.perf_counter() < until:
+            blocks.append(bytearray(1024))
+        return blocks
+
+    metrics = RunMetrics()
+    profiler = HarnessProfiler(metrics, snapshot_every=2, interval=0.001)
+    profiler.start()
+    blocks = busy_harness_work(time.perf_counter() + 0.2)
+    for _ in range(2):
+        metrics.test_started()
+        metrics.test_finished(1.0)
+    time.sleep(0.05)
+    profiler.stop()
+
+    assert profiler.samples > 10
+    folded = profiler.folded()
+    busy = [line for line in folded if "busy_harness_work" in line]
+    assert busy
+    stack, count = busy[0].rsplit(" ", 1)
+    assert stack.startswith("MainThread;") and int(count) > 0
+    report = "\n".join(profiler.report)
+    assert "=== after 2 tests" in report
+    assert "=== end of run" in report
+    assert "Growth since previous snapshot" in report
+    assert len(blocks) > 0
+
+
+@pytest.mark.asyncio
+async def test_load_mode_corrects_for_coordinated_omission():
+    """Test that open-loop latency counts the wait behind a saturated agent."""
+    import asyncio
+
+    from gnw_evals.runners.load import (
+        arrival_rate,
+        arrival_times,
+        run_load,
+        summarize_load,
+    )
+
+    assert arrival_rate("ramp", 5.0, 1.0, 3.0, 10.0, 4) == 2.0
+    assert arrival_rate("step", 9.9, 1.0, 4.0, 10.0, 4) == 4.0
+    assert len(arrival_times("constant", 10.0, 2.0, poisson=False)) == 19
+    poisson = arrival_times("constant", 50.0, 20.0, seed=1)
+    assert 900 < len(poisson) < 1100
+
+    class SlowAgent:
+        def __init__(self):
+            self._node_seconds = {}
+            self.decoded = False
+
+        async def _run_agent(self, query, decode=True):
+            self.decoded |= decode
+            await asyncio.sleep(0.05)
+            thread_id = str(len(self._node_seconds))
+            self._node_seconds[thread_id] = {"agent": 0.05}
+            return thread_id, None, None, "{}"
+
+    agent = SlowAgent()
+
+    # 40 req/s against an agent serving 20 req/s, one conversation at a time
+    schedule = arrival_times("constant", 40.0, 0.26, poisson=False)
+    records = await run_load(
+        agent,
+        [ExpectedData(query="q", test_group="loss")],
+        schedule,
+        max_in_flight=1,
+    )
+
+    assert len(records) == 10
+    assert all(0.04 < r["service_s"] < 0.1 for r in records)
+    # Only timed: states aren't decoded and node timings move to the records
+    assert not agent.decoded
+    assert not agent._node_seconds
+    assert records[0]["node_seconds"] == {"agent": 0.05}
+    # Each request waits for the ones before it; closed-loop timing hides this
+    assert records[-1]["latency_s"] > 0.2
+    summary = summarize_load(records, 0.26, window=0.13)
+    assert summary["requests"] == 10
+    assert summary["latency_seconds"]["max"] > 2 * summary["service_seconds"]["max"]
+    assert len(summary["timeline"]) == 2
+    assert summary["timeline"][1]["latency_p99"] > summary["timeline"][0]["latency_p99"]
+
+
+def test_slo_gate_checks_group_and_node_budgets(tmp_path):
+    """Test that latency budgets are checked per test group and agent node."""
+    from gnw_evals.utils.eval_types import TestResult
+
+    config = tmp_path / "slo.toml"
+    config.write_text(
+        """
+[all]
+max = 100
+
+[test_group.loss]
+p50 = 5
+p95 = 10
+
+[node.generate_insights]
+p95 = 3
+
+[node.pick_aoi]
+max = 1
+""",
+    )
+    gate = SLOGate.load(config)
+    results = [
+        TestResult(
+            thread_id=str(i),
+            query=f"query {i}",
+            overall_score=1.0,
+            execution_time="",
+            duration_seconds=float(i + 1),
+            test_group="loss" if i < 10 else "alerts",
+            node_seconds={"generate_insights": 1.0 + i / 4},
+        )
+        for i in range(20)
+    ]
+
+    report = gate.evaluate(results)
+    checks = {(c["scope"], c["stat"]): c for c in report["checks"]}
+    assert not checks[("all", "max")]["breached"]
+    assert checks[("test_group:loss", "p50")]["actual_seconds"] == 5.5
+    assert checks[("test_group:loss", "p50")]["breached"]
+    assert not checks[("test_group:loss", "p95")]["breached"]
+    assert checks[("node:generate_insights", "p95")]["tests"] == 20
+    assert checks[("node:generate_insights", "p95")]["breached"]
+    # No timings of a node: reported, but not a breach
+    assert checks[("node:pick_aoi", "max")]["actual_seconds"] is None
+    assert not checks[("node:pick_aoi", "max")]["breached"]
+    assert report["breached"] and gate.breached
+
+    config.write_text("[node.agent]\np99 = 3\n")
+    with pytest.raises(ValueError, match="p99"):
+        SLOGate.load(config)
+
+
+def test_bench_harness_runs_against_mock_agent(tmp_path, monkeypatch):
+    """Test that the harness benchmark builds a valid config and completes a run."""
+    import threading
+    import warnings
+    from pathlib import Path
+
+    import click
+
+    from gnw_evals.core import build_config
+    from gnw_evals.data_handlers import result_exporter
+
+    uvicorn = pytest.importorskip("uvicorn")
+    pytest.importorskip("langchain_core")
+    monkeypatch.syspath_prepend(str(Path(__file__).parent.parent / "benchmarks"))
+    from bench_harness import _free_port, _run_config, _wait_until_up
+    from bench_loader import generate_suite
+    from mock_agent import create_app
+
+    # Derived fields get the values run_evals would parse them into
+    config = build_config(api_token="token")
+    assert config.slo_gate is None and config.shard is None
+    assert config.clarification_thresholds == (0.15, 0.85)
+    with pytest.raises(click.BadParameter, match="API token"):
+        build_config()
+
+    port = _free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(
+            create_app(node_latency=0.0, state_rows=5),
+            host="127.0.0.1",
+            port=port,
+            log_level="warning",
+        ),
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    # _run_config redirects exports and silences warnings process-wide
+    monkeypatch.setattr(result_exporter, "OUTPUT_DIR", tmp_path)
+    try:
+        _wait_until_up(f"http://127.0.0.1:{port}")
+        suite_path = tmp_path / "suite.csv"
+        generate_suite(4, suite_path)
+        with warnings.catch_warnings():
+            run = _run_config(
+                f"http://127.0.0.1:{port}",
+                str(suite_path),
+                4,
+                2,
+                "fake:latency=0",
+                str(tmp_path),
+            )
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+    assert run["tests"] == 4
+    assert run["errors"] == 0
+    assert run["tests_per_second"] > 0